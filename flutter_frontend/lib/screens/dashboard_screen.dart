@@ -23,6 +23,7 @@ class _DashboardScreenState extends State<DashboardScreen> {
   String errorMessage = '';
   Timer? _timer;
   bool _useFeet = false;
+  bool _aiPrefetched = false;
 
   @override
   void initState() {
@@ -99,6 +100,7 @@ class _DashboardScreenState extends State<DashboardScreen> {
             lastUpdated = DateTime.now();
           });
         }
+        _prefetchAIAnalyses();
       } else {
         if (mounted) {
           setState(() {
@@ -118,6 +120,17 @@ class _DashboardScreenState extends State<DashboardScreen> {
     }
   }
 
+  // One batched Gemini request for all cards instead of one per analysis screen
+  Future<void> _prefetchAIAnalyses() async {
+    if (_aiPrefetched) return;
+    _aiPrefetched = true;
+    try {
+      await ApiService.prefetchSensorAIAnalyses();
+    } catch (e) {
+      _aiPrefetched = false;  // Try again on the next full load
+    }
+  }
+
   Future<void> _pollSensorData() async {
     if (!mounted) return;
 
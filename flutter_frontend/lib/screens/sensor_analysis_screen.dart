@@ -98,6 +98,19 @@ class _SensorAnalysisScreenState extends State<SensorAnalysisScreen> {
     });
     
     try {
+      // Stream the analysis so the panel fills in while Gemini is still generating
+      bool received = false;
+      await for (final text in ApiService.streamSensorAIAnalysis(widget.sensorType)) {
+        if (!mounted) return;  // Stop updating once the screen is closed
+        received = true;
+        setState(() {
+          aiAnalysis = text;
+          isLoadingAI = false;
+        });
+      }
+      if (received) return;
+
+      // Nothing streamed - fall back to the plain request
       final aiData = await ApiService.getSensorAIAnalysis(widget.sensorType);
       
       if (!mounted) return;  // Check again before calling setState
@@ -196,6 +196,81 @@ class ApiService {
     }
   }
   
+  /// Get the greenhouse health score: the newest reading's score and
+  /// sub-scores plus the stored series for [timeRange].
+  static Future<Map<String, dynamic>> getHealthScore({String timeRange = 'hours'}) async {
+    await _ensureInitialized();
+    
+    try {
+      final response = await http.get(Uri.parse('$_baseUrl/health-score?time_range=$timeRange'));
+      
+      if (response.statusCode == 200) {
+        return json.decode(response.body) as Map<String, dynamic>;
+      } else {
+        throw Exception('Failed to load health score: ${response.statusCode}');
+      }
+    } catch (e) {
+      debugPrint('Error fetching health score: $e');
+      rethrow;
+    }
+  }
+  
+  /// Get the fleet overview: per greenhouse the latest key values, worst
+  /// active severity, active alert count and data freshness.
+  static Future<Map<String, dynamic>> getFleetSummary() async {
+    await _ensureInitialized();
+    
+    try {
+      final response = await http.get(Uri.parse('$_baseUrl/fleet/summary'));
+      
+      if (response.statusCode == 200) {
+        return json.decode(response.body) as Map<String, dynamic>;
+      } else {
+        throw Exception('Failed to load fleet summary: ${response.statusCode}');
+      }
+    } catch (e) {
+      debugPrint('Error fetching fleet summary: $e');
+      rethrow;
+    }
+  }
+  
+  /// Get alert state changes recorded after [since] (an event id).
+  /// Returns the decoded body: events, active_alerts, latest_event_id.
+  static Future<Map<String, dynamic>> getAlertEvents(int since) async {
+    await _ensureInitialized();
+    
+    try {
+      final response = await http.get(Uri.parse('$_baseUrl/alerts?since=$since'));
+      
+      if (response.statusCode == 200) {
+        return json.decode(response.body) as Map<String, dynamic>;
+      } else {
+        throw Exception('Failed to load alert events: ${response.statusCode}');
+      }
+    } catch (e) {
+      debugPrint('Error fetching alert events: $e');
+      rethrow;
+    }
+  }
+  
+  /// Newest alert event id on the server, to start polling getAlertEvents from
+  static Future<int> getLatestAlertEventId() async {
+    await _ensureInitialized();
+    
+    try {
+      final response = await http.get(Uri.parse('$_baseUrl/alerts'));
+      // Also present on the 503 sent while APEX data isn't available yet
+      final decoded = json.decode(response.body);
+      if (decoded is Map && decoded['latest_event_id'] is int) {
+        return decoded['latest_event_id'] as int;
+      }
+      throw Exception('Failed to load latest alert event id: ${response.statusCode}');
+    } catch (e) {
+      debugPrint('Error fetching latest alert event id: $e');
+      rethrow;
+    }
+  }
+  
   /// Get alerts from the API
   static Future<List<dynamic>> getAlerts() async {
     await _ensureInitialized();
@@ -241,7 +316,16 @@ class ApiService {
     }
 
     // Native platforms: fetch bytes
-    final res = await http.get(url);
+    var res = await http.get(url);
+    // 202: the report is still being built in the background - poll the job
+    if (res.statusCode == 202) {
+      final job = json.decode(res.body) as Map<String, dynamic>;
+      final downloadUrl = Uri.parse('$_baseUrl${(job['download_url'] as String).replaceFirst('/api', '')}');
+      for (var attempt = 0; attempt < 60 && res.statusCode == 202; attempt++) {
+        await Future.delayed(const Duration(seconds: 2));
+        res = await http.get(downloadUrl);
+      }
+    }
     if (res.statusCode != 200) {
       throw Exception('Failed to export report: HTTP ${res.statusCode}');
     }
@@ -376,6 +460,79 @@ class ApiService {
     }
   }
 
+  /// Generate the AI analyses of every dashboard sensor with one batched
+  /// Gemini request. The backend caches them per sensor, so the analysis
+  /// screens opened afterwards are answered from that cache.
+  static Future<Map<String, dynamic>> prefetchSensorAIAnalyses() async {
+    await _ensureInitialized();
+    
+    try {
+      final response = await http.get(Uri.parse('$_baseUrl/sensor-analysis/ai/batch'));
+      
+      if (response.statusCode == 200) {
+        final decoded = json.decode(response.body) as Map<String, dynamic>;
+        return decoded['analyses'] as Map<String, dynamic>? ?? {};
+      } else {
+        throw Exception('Failed to load batched AI analysis: ${response.statusCode}');
+      }
+    } catch (e) {
+      debugPrint('Error fetching batched AI analysis: $e');
+      rethrow;
+    }
+  }
+
+  /// Stream AI analysis for a sensor as it is generated (Server-Sent Events).
+  /// Emits the accumulated analysis text after every chunk; the stream closes
+  /// when the backend sends its final 'done' event.
+  static Stream<String> streamSensorAIAnalysis(String sensorType) async* {
+    await _ensureInitialized();
+
+    final String apiSensorType = sensorType.toLowerCase()
+        .replaceAll('₂', '2')
+        .replaceAll(' level', '')
+        .replaceAll(' and ', '_&_')
+        .replaceAll(' & ', '_&_');
+
+    debugPrint('Streaming AI analysis for: $sensorType (API format: $apiSensorType)');
+
+    final client = http.Client();
+    try {
+      final request = http.Request(
+        'GET',
+        Uri.parse('$_baseUrl/sensor-analysis/$apiSensorType/ai/stream'),
+      );
+      request.headers['Accept'] = 'text/event-stream';
+      final response = await client.send(request);
+
+      if (response.statusCode != 200) {
+        throw Exception('Failed to stream AI analysis: ${response.statusCode}');
+      }
+
+      final buffer = StringBuffer();
+      String event = 'message';
+      await for (final line in response.stream
+          .transform(utf8.decoder)
+          .transform(const LineSplitter())) {
+        if (line.startsWith('event:')) {
+          event = line.substring(6).trim();
+        } else if (line.startsWith('data:')) {
+          final payload = json.decode(line.substring(5).trim());
+          if (event == 'chunk') {
+            buffer.write(payload['text'] ?? '');
+            yield buffer.toString();
+          } else if (event == 'done') {
+            yield (payload['analysis'] ?? buffer.toString()) as String;
+            return;
+          }
+        } else if (line.isEmpty) {
+          event = 'message';
+        }
+      }
+    } finally {
+      client.close();
+    }
+  }
+
   /// Get thresholds from backend
   static Future<Map<String, dynamic>?> getThresholds() async {
     await _ensureInitialized();
@@ -13,6 +13,8 @@ class NotificationManager {
   Timer? _pollingTimer;
   List<AlertNotification> _notificationHistory = [];
   final List<String> _processedAlertIds = [];
+  // Null until seeded from the server, so old events aren't replayed on start
+  int? _lastEventId;
   
   factory NotificationManager() {
     return _instance;
@@ -50,13 +52,23 @@ class NotificationManager {
   // Check for new alerts from the server
   Future<void> _checkForAlerts() async {
     try {
-      final response = await ApiService.getAlerts();
-      final alerts = response;
+      final lastEventId = _lastEventId;
+      if (lastEventId == null) {
+        // Start from the server's newest event; what happened before is history
+        _lastEventId = await ApiService.getLatestAlertEventId();
+        return;
+      }
+      // Only ask for alert state changes we haven't seen yet
+      final response = await ApiService.getAlertEvents(lastEventId);
+      final events = response['events'] as List<dynamic>? ?? [];
+      _lastEventId = response['latest_event_id'] as int? ?? lastEventId;
       
-      for (var alert in alerts) {
-        // Generate a unique ID for this alert
-        final alertData = alert as Map<String, dynamic>;
-        final alertId = "${alertData['sensor_type']}_${alertData['timestamp']}";
+      for (var event in events) {
+        final alertData = event as Map<String, dynamic>;
+        if (alertData['event'] == 'cleared') {
+          continue;
+        }
+        final alertId = "event_${alertData['id']}";
         
         // Check if we've already processed this alert
         if (!_processedAlertIds.contains(alertId)) {
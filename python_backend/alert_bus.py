@@ -0,0 +1,124 @@
+"""
+Alert event bus for greenhouse monitoring system.
+Alert state changes from every alert engine (the primary greenhouse and
+each site) are published here the moment they are recorded. Each event
+gets a fleet-wide id, is kept in a bounded log (/api/alerts?since=,
+stream backlogs) and is fanned out to:
+- Stream subscribers (one bounded queue per /api/alerts/stream client)
+- Sinks: plain callables such as the stdout logger or the outbound
+  notifier (notifier.py)
+
+publish() never blocks the caller (the APEX poller): a slow subscriber
+loses its oldest queued events, and sinks must hand work to their own
+threads.
+"""
+
+import queue
+import threading
+from collections import deque
+from itertools import islice
+
+SUBSCRIBER_QUEUE_SIZE = 100
+# Events kept for ?since= / Last-Event-ID catch-up
+MAX_EVENTS = 1000
+
+
+class AlertBus:
+    """Fan-out of alert events to stream subscribers and sinks."""
+
+    def __init__(self, max_events=MAX_EVENTS):
+        self._subscribers = set()
+        self._sinks = []
+        self._events = deque(maxlen=max_events)
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def subscribe(self, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        """
+        Register a stream subscriber.
+
+        Returns:
+            queue.Queue: Receives every event published after this call
+        """
+        q = queue.Queue(maxsize=maxsize)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def add_sink(self, sink):
+        """Register a callable invoked with each event (must not block for long)."""
+        with self._lock:
+            self._sinks.append(sink)
+
+    def publish(self, event):
+        """
+        Number and log one event, then deliver it to every subscriber and
+        sink without blocking. Subscribers get events in id order.
+
+        Returns:
+            dict: The event as delivered (a copy with the bus 'id')
+        """
+        with self._lock:
+            event = {**event, "id": self._next_id}
+            self._next_id += 1
+            self._events.append(event)
+            for q in self._subscribers:
+                while True:
+                    try:
+                        q.put_nowait(event)
+                        break
+                    except queue.Full:
+                        # Drop the oldest event for this slow client
+                        try:
+                            q.get_nowait()
+                        except queue.Empty:
+                            pass
+            sinks = list(self._sinks)
+        for sink in sinks:
+            try:
+                sink(event)
+            except Exception as e:
+                print(f"⚠️ Alert sink error: {e}")
+        return event
+
+    @property
+    def latest_event_id(self):
+        with self._lock:
+            return self._next_id - 1
+
+    def events_since(self, since_id, limit=None):
+        """
+        Logged events with id > since_id, oldest first.
+
+        Returns:
+            tuple: (event dicts, id to pass as since_id next time: the last
+                event returned, read under the same lock)
+        """
+        with self._lock:
+            first_id = self._next_id - len(self._events)
+            start = max(0, since_id + 1 - first_id)
+            stop = None if limit is None else start + max(0, limit)
+            events = list(islice(self._events, start, stop))
+            latest_id = events[-1]["id"] if events else self._next_id - 1
+        return events, latest_id
+
+
+def stdout_sink(event):
+    """Log an alert event to the console."""
+    print(f"🔔 Alert {event.get('event')}: {event.get('title')} ({event.get('value')})")
+
+
+def create_alert_bus():
+    """Alert bus with the stdout sink."""
+    bus = AlertBus()
+    bus.add_sink(stdout_sink)
+    return bus
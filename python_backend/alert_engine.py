@@ -0,0 +1,310 @@
+"""
+Stateful alert engine for greenhouse monitoring system.
+Fed by the background APEX poller with every new reading, it keeps the
+alert state of each sensor and records state changes (raised / changed /
+cleared) in an in-memory event log, so clients can ask for only the events
+they haven't seen yet (/api/alerts?since=<event id>).
+
+Flapping is suppressed in two ways:
+- Hysteresis: an active band only clears once the value is back past the
+  threshold by the sensor's deadband (e.g. mq7 > 300 raises, < 275 clears)
+- Debounce: a sensor must show the same new band for N consecutive readings
+  before the transition is recorded
+
+Windowed rules (sustained exceedance, rate of change) are evaluated over
+sliding windows of recent readings kept per (field, window length); each
+new reading updates them in O(1).
+"""
+
+import threading
+import time
+
+from rule_engine import compile_rules, format_alert, ANOMALY_SENSORS, SEVERITY_RANK
+from sliding_window import SlidingWindow
+
+# Deadband per sensor group, in the sensor's own unit
+HYSTERESIS = {
+    "temperature": 0.5,   # °C
+    "humidity": 2.0,      # %
+    "mq135": 25.0,        # ppm
+    "mq2": 25.0,          # ppm
+    "mq7": 25.0,          # ppm
+    # Anomaly scores (anomaly.py), in standard deviations
+    **{f"{name}_anomaly": 0.5 for name, _, _ in ANOMALY_SENSORS},
+    # Position outside the usual band for the hour (diurnal.py), in band widths
+    "light_diurnal": 0.25,
+}
+
+# Consecutive readings required before a transition is recorded
+DEFAULT_DEBOUNCE = 2
+DEBOUNCE = {
+    "flame": 1,  # Fire is never held back
+    "light_diurnal": 20,  # A passing cloud isn't a lighting fault
+}
+# Windowed rules already require the condition over their whole window
+WINDOW_DEBOUNCE = 1
+
+MAX_EVENTS = 1000
+
+
+def _reading_ts(sensor_data):
+    """Numeric reading timestamp (epoch seconds), or None if unavailable."""
+    ts = sensor_data.get("_ts_num", sensor_data.get("timestamp"))
+    try:
+        return float(ts)
+    except (TypeError, ValueError):
+        return None
+
+
+class AlertEngine:
+    """
+    Per-sensor alert state machine plus an indexed, bounded event log.
+
+    Event ids are consecutive integers, so events_since() is a slice into
+    the log rather than a scan.
+    """
+
+    def __init__(self, max_events=MAX_EVENTS, hysteresis=None, debounce=None):
+        self.max_events = max_events
+        self.hysteresis = dict(HYSTERESIS if hysteresis is None else hysteresis)
+        self.debounce = dict(DEBOUNCE if debounce is None else debounce)
+        # group -> {'match': active match or None, 'alert': alert dict,
+        #           'pending': candidate rule id, 'pending_count': int}
+        self._state = {}
+        # (field, window seconds) -> SlidingWindow
+        self._windows = {}
+        self._events = []
+        self._first_id = 1
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+
+    def process_reading(self, sensor_data, thresholds, groups=None):
+        """
+        Update alert state from one derived reading.
+
+        Args:
+            sensor_data (dict): Derived reading (raw + build_derived_from_reading)
+            thresholds (dict): Current thresholds
+            groups (iterable, optional): Only evaluate these sensor groups
+
+        Returns:
+            list: Events recorded for this reading
+        """
+        compiled = compile_rules(thresholds)
+        timestamp = sensor_data.get("timestamp", time.time())
+        reading_ts = _reading_ts(sensor_data)
+        new_events = []
+        with self._lock:
+            for group, entries in compiled.group_entries.items():
+                if groups is not None and group not in groups:
+                    continue
+                state = self._get_state(group)
+                if not self._is_new(state, reading_ts):
+                    continue
+                candidate = self._evaluate_group(group, entries, sensor_data, self._active_id(state))
+                event = self._update(group, state, candidate, compiled.params, timestamp,
+                                     self.debounce.get(group, DEFAULT_DEBOUNCE))
+                if event:
+                    new_events.append(event)
+
+            if compiled.window_table:
+                self._push_windows(compiled.window_table, sensor_data, reading_ts)
+            for field, window, kind, threshold, rule in compiled.window_table:
+                group = rule["group"]
+                if groups is not None and group not in groups and rule["hysteresis"] not in groups:
+                    continue
+                state = self._get_state(group)
+                if not self._is_new(state, reading_ts):
+                    continue
+                candidate = self._evaluate_window(self._windows.get((field, window)), kind, threshold,
+                                                  rule, self._active_id(state) == rule["id"])
+                event = self._update(group, state, candidate, compiled.params, timestamp,
+                                     self.debounce.get(group, WINDOW_DEBOUNCE))
+                if event:
+                    new_events.append(event)
+        return new_events
+
+    def _get_state(self, group):
+        return self._state.setdefault(group, {
+            "match": None, "alert": None, "pending": None, "pending_count": 0, "last_ts": None
+        })
+
+    @staticmethod
+    def _is_new(state, reading_ts):
+        """
+        True (and remember it) if the group hasn't seen this reading yet.
+        The safety fast path and the regular pass both feed the same
+        readings; each group must count a reading only once.
+        """
+        if reading_ts is None:
+            return True
+        if state["last_ts"] is not None and reading_ts <= state["last_ts"]:
+            return False
+        state["last_ts"] = reading_ts
+        return True
+
+    @staticmethod
+    def _active_id(state):
+        return state["match"]["rule"]["id"] if state["match"] else None
+
+    def _update(self, group, state, candidate, params, timestamp, debounce):
+        """Apply one evaluation result to a group's state; return the event, if any."""
+        active_id = self._active_id(state)
+        candidate_id = candidate["rule"]["id"] if candidate else None
+
+        if candidate_id == active_id:
+            state["pending"], state["pending_count"] = None, 0
+            if candidate is not None:
+                # Still in the same band - keep the latest value
+                state["match"] = candidate
+                state["alert"] = format_alert(candidate, params, timestamp)
+            return None
+
+        if state["pending"] == candidate_id:
+            state["pending_count"] += 1
+        else:
+            state["pending"], state["pending_count"] = candidate_id, 1
+        if state["pending_count"] < debounce:
+            return None
+        return self._transition(group, state, candidate, params, timestamp)
+
+    def _evaluate_group(self, group, entries, sensor_data, active_id):
+        """First matching rule in the group, using the clear threshold for the active rule."""
+        deadband = self.hysteresis.get(group, 0.0)
+        for _, field, op, threshold, rule in entries:
+            value = sensor_data.get(field)
+            if value is None:
+                return None
+            if op == "truthy":
+                hit = str(value).lower() in ("true", "yes", "1")
+            else:
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    return None
+                limit = threshold
+                if rule["id"] == active_id:
+                    limit = threshold - deadband if op == ">" else threshold + deadband
+                hit = value > limit if op == ">" else value < limit
+            if hit:
+                if rule.get("value_field"):
+                    value = sensor_data.get(rule["value_field"], 0)
+                return {"rule": rule, "value": value, "threshold": threshold}
+        return None
+
+    def _push_windows(self, window_table, sensor_data, ts):
+        """Add this reading to every window the windowed rules use."""
+        if ts is None:
+            ts = time.time()
+        for field, window, _, _, _ in window_table:
+            value = sensor_data.get(field)
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            key = (field, window)
+            if key not in self._windows:
+                self._windows[key] = SlidingWindow(window)
+            # Several rules can share a window; push() ignores the repeat
+            self._windows[key].push(ts, value)
+
+    def _evaluate_window(self, window, kind, threshold, rule, active):
+        """Match dict if the windowed rule holds, using the clear threshold when active."""
+        # Every kind needs a full window; a rate over a few seconds is just noise
+        if window is None or not window.covers_duration:
+            return None
+        deadband = self.hysteresis.get(rule.get("hysteresis"), 0.0) if active else 0.0
+        if kind == "rate_above":
+            value = window.rate_per_minute()
+            hit = value is not None and value > threshold - deadband
+        elif kind == "sustained_above":
+            value = window.min()
+            hit = value > threshold - deadband
+        elif kind == "sustained_below":
+            value = window.max()
+            hit = value < threshold + deadband
+        else:
+            return None
+        if not hit:
+            return None
+        return {"rule": rule, "value": value, "threshold": threshold}
+
+    def _transition(self, group, state, candidate, params, timestamp):
+        previous = state["match"]
+        if candidate is None:
+            alert = dict(state["alert"] or {})
+            alert.update({"timestamp": timestamp, "message": f"{alert.get('title', group)} cleared", "sound": False})
+            kind = "cleared"
+        else:
+            alert = format_alert(candidate, params, timestamp)
+            kind = "raised" if previous is None else "changed"
+        event = {
+            **alert,
+            "id": self._next_id,
+            "event": kind,
+            "group": group,
+            "previous_rule_id": previous["rule"]["id"] if previous else None,
+            "created_at": time.time(),
+        }
+        state["match"] = candidate
+        state["alert"] = alert if candidate is not None else None
+        state["pending"], state["pending_count"] = None, 0
+        self._append(event)
+        return event
+
+    # ------------------------------------------------------------------
+    # Event log
+    # ------------------------------------------------------------------
+
+    def _append(self, event):
+        self._events.append(event)
+        self._next_id += 1
+        excess = len(self._events) - self.max_events
+        if excess > 0:
+            del self._events[:excess]
+            self._first_id += excess
+
+    @property
+    def latest_event_id(self):
+        return self._next_id - 1
+
+    def events_since(self, since_id, limit=None):
+        """
+        Events with id > since_id, oldest first.
+
+        Args:
+            since_id (int): Last event id the client has seen (0 for all)
+            limit (int, optional): Max events to return
+
+        Returns:
+            tuple: (event dicts, id to pass as since_id next time). The id is
+                the last event returned, read under the same lock, so events
+                recorded meanwhile or cut off by limit are not skipped
+        """
+        with self._lock:
+            start = max(0, since_id + 1 - self._first_id)
+            events = self._events[start:]
+            if limit is not None:
+                events = events[:limit]
+            latest_id = events[-1]["id"] if events else self._next_id - 1
+        return list(events), latest_id
+
+    def active_alerts(self, windowed_only=False):
+        """
+        Currently active alert per sensor / windowed rule, most severe first.
+
+        Args:
+            windowed_only (bool): Only alerts raised by windowed rules
+        """
+        with self._lock:
+            alerts = [
+                dict(s["alert"]) for s in self._state.values()
+                if s["match"] is not None and s["alert"]
+                and (not windowed_only or "window" in s["match"]["rule"])
+            ]
+        alerts.sort(key=lambda a: SEVERITY_RANK.get(a.get("severity"), 0), reverse=True)
+        return alerts
@@ -0,0 +1,166 @@
+"""
+Streaming anomaly scores for greenhouse monitoring system.
+Every ingested reading updates two online models per sensor, O(1) each:
+
+- EWMA / EW variance of the recent level: how far the value is from what
+  the sensor has been reading lately (z-score)
+- Hour-of-day baseline: a slower EWMA mean / variance for each of the 24
+  local hours, so the normal daily cycle (sunrise light, midday heat)
+  isn't scored as unusual once a few days of history exist
+
+The anomaly score is the smaller of the two |z| once the hour's baseline
+has warmed up (unusual against both recent history and this time of day),
+and the recent-level |z| before that. Scores are attached to the reading
+as '<sensor>_anomaly' fields, which the rule engine's anomaly rules alert
+on before the hard limits in thresholds.json are reached.
+"""
+
+import math
+import os
+import threading
+import time
+
+# Anomaly name -> derived reading field
+ANOMALY_FIELDS = {
+    "temperature": "temperature",
+    "humidity": "humidity",
+    "mq135": "mq135_drop",
+    "mq2": "mq2_drop",
+    "mq7": "mq7_drop",
+    "light": "light",
+}
+
+# Smallest standard deviation used per sensor, so a very steady signal
+# doesn't turn a normal small step into a huge z-score
+STD_FLOOR = {
+    "temperature": 0.3,
+    "humidity": 1.0,
+    "mq135": 10.0,
+    "mq2": 10.0,
+    "mq7": 10.0,
+    "light": 50.0,
+}
+
+ANOMALY_ALPHA = float(os.getenv('ANOMALY_ALPHA', '0.05'))
+ANOMALY_HOURLY_ALPHA = float(os.getenv('ANOMALY_HOURLY_ALPHA', '0.02'))
+# Readings before the recent-level model / an hour's baseline is trusted
+ANOMALY_WARMUP = 30
+ANOMALY_HOURLY_WARMUP = 60
+# Score thresholds for the status label (alerting uses thresholds.json 'anomaly.z')
+UNUSUAL_SCORE = 3.0
+ANOMALOUS_SCORE = 4.0
+
+
+def anomaly_name(field):
+    """Anomaly name for a derived field (co2_level follows mq135), or None."""
+    if field == "co2_level":
+        return "mq135"
+    for name, source in ANOMALY_FIELDS.items():
+        if source == field:
+            return name
+    return None
+
+
+def anomaly_label(score):
+    if score is None:
+        return "learning"
+    if score >= ANOMALOUS_SCORE:
+        return "anomalous"
+    if score >= UNUSUAL_SCORE:
+        return "unusual"
+    return "normal"
+
+
+class _Ewm:
+    """Exponentially weighted mean / variance."""
+
+    __slots__ = ("alpha", "count", "mean", "var")
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+
+    def z(self, value, floor):
+        return (value - self.mean) / max(math.sqrt(self.var), floor)
+
+    def update(self, value):
+        if self.count == 0:
+            self.mean = value
+        else:
+            delta = value - self.mean
+            self.mean += self.alpha * delta
+            self.var = (1 - self.alpha) * (self.var + self.alpha * delta * delta)
+        self.count += 1
+
+
+class AnomalyDetector:
+    """Online anomaly models for the sensors in ANOMALY_FIELDS."""
+
+    def __init__(self, alpha=ANOMALY_ALPHA, hourly_alpha=ANOMALY_HOURLY_ALPHA,
+                 warmup=ANOMALY_WARMUP, hourly_warmup=ANOMALY_HOURLY_WARMUP):
+        self.warmup = warmup
+        self.hourly_warmup = hourly_warmup
+        self._recent = {name: _Ewm(alpha) for name in ANOMALY_FIELDS}
+        self._hourly = {name: [_Ewm(hourly_alpha) for _ in range(24)] for name in ANOMALY_FIELDS}
+        self._latest = {}      # name -> details of the newest scored reading
+        self._last_ts = None
+        self._lock = threading.Lock()
+
+    def observe(self, reading):
+        """
+        Score one derived reading (oldest first), then update the models.
+        Readings older than the newest one seen are not scored.
+
+        Returns:
+            dict: '<name>_anomaly' -> score (|z|) for each sensor with a
+                value and a warmed-up model
+        """
+        ts = reading.get("_ts_num", reading.get("timestamp"))
+        try:
+            ts = float(ts)
+        except (TypeError, ValueError):
+            ts = time.time()
+        hour = time.localtime(ts).tm_hour
+        scores = {}
+        with self._lock:
+            if self._last_ts is not None and ts <= self._last_ts:
+                return scores
+            self._last_ts = ts
+            for name, field in ANOMALY_FIELDS.items():
+                value = reading.get(field)
+                if value is None or isinstance(value, bool):
+                    continue
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    continue
+                recent, hourly = self._recent[name], self._hourly[name][hour]
+                floor = STD_FLOOR[name]
+                z_recent = recent.z(value, floor) if recent.count >= self.warmup else None
+                z_hourly = hourly.z(value, floor) if hourly.count >= self.hourly_warmup else None
+                score = None
+                if z_recent is not None:
+                    score = abs(z_recent) if z_hourly is None else min(abs(z_recent), abs(z_hourly))
+                    scores[f"{name}_anomaly"] = round(score, 2)
+                self._latest[name] = {
+                    "score": round(score, 2) if score is not None else None,
+                    "status": anomaly_label(score),
+                    "value": value,
+                    "z_recent": round(z_recent, 2) if z_recent is not None else None,
+                    "z_hourly": round(z_hourly, 2) if z_hourly is not None else None,
+                    "recent_mean": round(recent.mean, 2) if recent.count else None,
+                    "expected_this_hour": round(hourly.mean, 2) if hourly.count >= self.hourly_warmup else None,
+                    "hour": hour,
+                    "timestamp": ts,
+                }
+                recent.update(value)
+                hourly.update(value)
+        return scores
+
+    def details(self, name):
+        """Details of the newest scored reading for one sensor, or None."""
+        with self._lock:
+            details = self._latest.get(name)
+            return dict(details) if details else None
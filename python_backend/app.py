@@ -1,4 +1,4 @@
-from flask import Flask, jsonify, request, send_file
+from flask import Flask, Response, jsonify, request, send_file, stream_with_context
 from flask_cors import CORS
 import random
 import time
@@ -9,13 +9,52 @@ import threading
 import logging
 from datetime import datetime
 from dotenv import load_dotenv
+import copy
 import json
+import queue
+# Load environment variables from .env file (before the local modules below
+# read their settings at import time)
+load_dotenv()
+# Shared threshold rules (alerts, recommendations, PDF alert summary)
+from rule_engine import evaluate_reading, build_alerts, build_alert_summary, thresholds_version, SAFETY_GROUPS
+from alert_engine import AlertEngine
+from alert_bus import create_alert_bus
+from notifier import create_notifier
+# PDF report cache (per data version) and background build pool
+from report_cache import ReportCache, ReportJobs, report_key
+# Local history for day / week / month reports
+from history_store import AlertEventWriter, HistoryStore, period_range, PERIOD_DAYS, READING_COLUMNS
+# Reading normalization shared by the APEX poller and MQTT ingestion
+from reading_normalize import extract_items, normalize_item
+# Deduplicating, time-ordered buffer behind the reading cache
+from reading_buffer import ReadingBuffer, READING_BUFFER_SIZE, REORDER_WINDOW_SECONDS
+# As-of join of the soil stream onto greenhouse readings
+from stream_join import asof_join
+# Optional direct MQTT ingestion (bypasses the APEX round trip)
+from mqtt_ingest import create_mqtt_ingest
+# Staleness / flatline / disagreement / spike checks on ingested readings
+from data_quality import DataQualityMonitor
+# Online anomaly scores (EWMA and hour-of-day baselines) per sensor
+from anomaly import AnomalyDetector, anomaly_name
+# Usual range per sensor and hour of day
+from diurnal import DiurnalProfiles, DIURNAL_FIELDS
+# Holt-Winters forecasts fitted incrementally on the history store
+from forecast import ForecastCache, FORECAST_MAX_HORIZON_MINUTES, first_crossing
+# Per-reading greenhouse health score
+from health_score import score_statuses, health_label
+# Streamed CSV / NDJSON / Parquet export of the history store
+from history_export import EXPORT_FORMATS, export_chunks, parquet_available
+# Trend charts (ReportLab graphics) for PDF reports
+from report_charts import ChartCache, downsample, trend_chart
+# Per-site (multi-greenhouse) configuration and runtime state
+from site_registry import SiteRegistry
+# Continuously maintained per-site overview for /api/fleet/summary
+from fleet_summary import FleetSummary
 # Import the Gemini service
-from gemini_service import get_gemini_analysis, get_gemini_recommendations
+from gemini_service import get_gemini_analysis, get_gemini_analysis_result, get_gemini_batch_analysis, get_gemini_recommendations, get_gemini_status, stream_gemini_analysis, warm_up_gemini
 import requests
 import http.client
 from urllib.parse import urlparse
-import concurrent.futures
 import traceback
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -29,15 +68,10 @@ import io
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Thread pool for async Gemini requests (non-blocking AI)
-_gemini_executor = concurrent.futures.ThreadPoolExecutor(max_workers=3, thread_name_prefix='gemini')
-
-# HTTP connection pool for faster APEX requests
-_apex_connection_pool = {}
-_apex_connection_lock = threading.Lock()
-
-# Load environment variables from .env file
-load_dotenv()
+# HTTP connection pool for faster APEX requests: one kept-alive connection
+# per (thread, host), since an http.client connection can't be shared between
+# threads (the poller, site pollers and request threads all fetch from APEX)
+_apex_connections = threading.local()
 
 # ============================================================================
 # THRESHOLD MANAGEMENT - Persistent storage for editable thresholds
@@ -346,25 +380,44 @@ ORACLE_APEX_URL = os.getenv('ORACLE_APEX_URL', "https://oracleapex.com/ords/g3_d
 # SECONDARY endpoint for soil/plant metrics (moisture, temperature, ec, ph, NPK)
 ORACLE_APEX_SOIL_URL = os.getenv('ORACLE_APEX_SOIL_URL', "https://oracleapex.com/ords/g3_data/groups/data/10")
 
+def _apex_connection_pool():
+    """This thread's host -> connection dict"""
+    pool = getattr(_apex_connections, 'pool', None)
+    if pool is None:
+        pool = _apex_connections.pool = {}
+    return pool
+
 def get_apex_connection(url):
-    """Get or create persistent HTTPS connection to APEX for connection pooling"""
+    """Get or create this thread's persistent HTTPS connection to APEX for connection pooling"""
     parsed = urlparse(url)
     host = parsed.hostname
     
-    with _apex_connection_lock:
-        if host not in _apex_connection_pool:
-            logger.info(f"Creating new APEX connection pool for {host}")
-            _apex_connection_pool[host] = http.client.HTTPSConnection(
-                host, 
-                timeout=5,  # Shorter timeout with persistent connection
-                blocksize=8192  # Larger buffer for faster reads
-            )
-        return _apex_connection_pool[host]
+    pool = _apex_connection_pool()
+    if host not in pool:
+        logger.info(f"Creating new APEX connection for {host} ({threading.current_thread().name})")
+        pool[host] = http.client.HTTPSConnection(
+            host, 
+            timeout=5,  # Shorter timeout with persistent connection
+            blocksize=8192  # Larger buffer for faster reads
+        )
+    return pool[host]
+
+def _drop_apex_connection(host):
+    """Close and forget this thread's connection to host (after an error)"""
+    conn = _apex_connection_pool().pop(host, None)
+    if conn is not None:
+        try:
+            conn.close()
+        except Exception:
+            pass
 
-def fetch_apex_readings(apex_url=None, timeout=10):
+def fetch_apex_readings(apex_url=None, timeout=10, on_item=None):
     """Fetch list of readings from Oracle APEX using http.client (more reliable than requests).
        Returns a list of dict readings or empty list on failure.
        NOW WITH CONNECTION POOLING for 2-3x faster requests!
+       on_item(reading) is called for each reading, oldest first, as soon as the
+       payload is normalized and ordered, before the list is returned (used by
+       the safety fast path, whose alert windows need readings in time order).
     """
     import http.client
     import json
@@ -392,13 +445,7 @@ def fetch_apex_readings(apex_url=None, timeout=10):
         except Exception as conn_err:
             # Connection died, remove from pool and retry
             logger.warning(f"Connection pool error: {conn_err}, creating fresh connection")
-            with _apex_connection_lock:
-                if host in _apex_connection_pool:
-                    try:
-                        _apex_connection_pool[host].close()
-                    except:
-                        pass
-                    del _apex_connection_pool[host]
+            _drop_apex_connection(host)
             
             # Retry with fresh connection
             conn = http.client.HTTPSConnection(host, timeout=timeout)
@@ -421,92 +468,20 @@ def fetch_apex_readings(apex_url=None, timeout=10):
             # Decode JSON
             data = json.loads(data_bytes.decode("utf-8"))
             
-            # normalize possible shapes: {"items": [...]} or [...]
-            if isinstance(data, dict) and "items" in data and isinstance(data["items"], list):
-                items = data["items"]
-            elif isinstance(data, list):
-                items = data
-            elif isinstance(data, dict):
-                # single-object payload -> wrap
-                items = [data]
-            else:
+            # normalize possible shapes: {"items": [...]}, [...] or a single object
+            items = extract_items(data)
+            if not items:
                 return []
             
-            # Ensure each item has a numeric timestamp for sorting
-            # Use APEX timestamp but fix the year to 2025
-            import time
-            from datetime import datetime
-            
-            normalized = []
-            for idx, it in enumerate(items):
-                it_copy = dict(it)
-
-                # Get the original APEX timestamp. Different APEX endpoints use different keys:
-                # - ISO style: "timestamp_reading" -> "2025-10-29T15:21:22.971802Z"
-                # - groups endpoint: "corrected_created_at" -> "30-OCT-2025 15:02:22"
-                # We'll try several common keys and parsing strategies.
-                apex_ts_str = it.get("timestamp_reading", "")
-                if not apex_ts_str:
-                    # try other common fields returned by APEX groups endpoints
-                    apex_ts_str = it.get("corrected_created_at", "") or it.get("created_at", "") or it.get("ts", "") or it.get("time", "")
-
-                if apex_ts_str:
-                    # Normalize whitespace/newlines produced by some HTML/JSON renderings
-                    apex_ts_str_clean = " ".join(str(apex_ts_str).split())
-                    parsed_ok = False
-                    # Try ISO format with microseconds / Z
-                    try:
-                        apex_dt = datetime.strptime(apex_ts_str_clean.replace('Z', ''), "%Y-%m-%dT%H:%M:%S.%f")
-                        it_copy["timestamp"] = apex_dt.timestamp()
-                        parsed_ok = True
-                    except Exception:
-                        pass
-
-                    if not parsed_ok:
-                        # Try ISO without microseconds
-                        try:
-                            apex_dt = datetime.strptime(apex_ts_str_clean.replace('Z', ''), "%Y-%m-%dT%H:%M:%S")
-                            it_copy["timestamp"] = apex_dt.timestamp()
-                            parsed_ok = True
-                        except Exception:
-                            pass
-
-                    if not parsed_ok:
-                        # Try APEX human-readable like '30-OCT-2025 15:02:22' or '30-OCT-2025\n15:02:22'
-                        try:
-                            # Ensure month abbreviation is upper-case (e.g., OCT)
-                            apex_norm = apex_ts_str_clean.upper()
-                            # Remove any commas
-                            apex_norm = apex_norm.replace(',', '')
-                            apex_dt = datetime.strptime(apex_norm, "%d-%b-%Y %H:%M:%S")
-                            it_copy["timestamp"] = apex_dt.timestamp()
-                            parsed_ok = True
-                        except Exception:
-                            pass
-
-                    if not parsed_ok:
-                        # Last resort: try to extract any integer-like epoch in the string
-                        try:
-                            import re
-                            m = re.search(r"(1[0-9]{9}|2[0-9]{9})", apex_ts_str_clean)
-                            if m:
-                                it_copy["timestamp"] = float(m.group(0))
-                                parsed_ok = True
-                        except Exception:
-                            pass
-
-                    if not parsed_ok:
-                        print(f"Failed to parse timestamp '{apex_ts_str}'; using pull-time fallback")
-                        it_copy["timestamp"] = time.time() - (idx * 10)
-                else:
-                    # No timestamp in APEX data, use current time
-                    it_copy["timestamp"] = time.time() - (idx * 10)
-                
-                it_copy["_ts_num"] = it_copy["timestamp"]
-                it_copy["_pull_time"] = time.time()  # Track when we pulled this data
-                normalized.append(it_copy)
+            normalized = [normalize_item(it, idx) for idx, it in enumerate(items)]
             # sort descending by timestamp numeric (newest first)
             normalized.sort(key=lambda x: x.get("_ts_num", 0), reverse=True)
+            if on_item is not None:
+                for it_copy in reversed(normalized):
+                    try:
+                        on_item(it_copy)
+                    except Exception as e:
+                        print(f"⚠️ on_item callback error: {e}")
             
             # Log the timestamps of the first 3 readings to verify we're getting fresh data
             if len(normalized) >= 3:
@@ -528,21 +503,15 @@ def fetch_apex_readings(apex_url=None, timeout=10):
         print(f"fetch_apex_readings error: {e}")
         # If connection error, remove from pool
         try:
-            parsed = urlparse(apex_url or ORACLE_APEX_URL)
-            with _apex_connection_lock:
-                if parsed.hostname in _apex_connection_pool:
-                    try:
-                        _apex_connection_pool[parsed.hostname].close()
-                    except:
-                        pass
-                    del _apex_connection_pool[parsed.hostname]
+            _drop_apex_connection(urlparse(apex_url or ORACLE_APEX_URL).hostname)
         except:
             pass
         return []
 
-def build_derived_from_reading(r):
+def build_derived_from_reading(r, thresholds=None):
     """Build derived fields from a single reading dict r from APEX.
        NO CONVERSIONS - use APEX data exactly as provided.
+       thresholds (e.g. a site's merged thresholds) default to thresholds.json.
     """
     # helper to get numeric safely
     def num(key, default=0.0):
@@ -624,7 +593,7 @@ def build_derived_from_reading(r):
     humidity_val = round(num("humidity", 0.0), 1)
     temp_status = _get_temperature_status(temperature) if temperature is not None else "Unknown"
     humidity_status = _get_humidity_status(humidity_val)
-    soil_status = _get_soil_moisture_status(soil_moisture_value)
+    soil_status = _get_soil_moisture_status(soil_moisture_value, thresholds)
     light_status = _get_light_status(light_intensity)
     air_quality_status = _get_combined_air_quality_status(mq135_drop, co2_level)
     
@@ -725,6 +694,159 @@ _smart_cache = {
 }
 _smart_cache_lock = threading.Lock()
 
+# Stateful alert engine (hysteresis, debounce, event log) fed by the poller
+alert_engine = AlertEngine()
+
+# Alert events are pushed to /api/alerts/stream clients and sinks (stdout, notifier)
+alert_bus = create_alert_bus()
+
+# Outbound notifications (webhook / SMTP / MQTT / file), None if none configured
+notifier = create_notifier()
+if notifier:
+    alert_bus.add_sink(notifier)
+
+# Local reading / alert history for period reports (the database is opened
+# on first use, so importing the app doesn't create it); alert events are
+# written from the AlertEventWriter thread, not the publishing thread
+history_store = HistoryStore()
+alert_bus.add_sink(AlertEventWriter(history_store))
+
+# Every ingestion path merges into this buffer: duplicates (same timestamp
+# and device) are dropped, late readings are slotted in by timestamp
+reading_buffer = ReadingBuffer(
+    max_size=int(os.getenv('READING_BUFFER_SIZE', str(READING_BUFFER_SIZE))),
+    reorder_window=float(os.getenv('REORDER_WINDOW_SECONDS', str(REORDER_WINDOW_SECONDS)))
+)
+
+# Data quality state of the primary reading stream (/api/data-quality)
+data_quality = DataQualityMonitor()
+# Anomaly models of the primary reading stream (scores feed the alert engine)
+anomaly_detector = AnomalyDetector()
+# Hour-of-day baselines of the primary reading stream: readings from before
+# startup are loaded from the history store, later ones counted as ingested
+diurnal_profiles = DiurnalProfiles()
+_DIURNAL_LIVE_FROM = time.time()
+
+def _backfill_diurnal_profiles():
+    try:
+        count = diurnal_profiles.backfill(history_store, end=_DIURNAL_LIVE_FROM)
+        print(f"📈 Diurnal profiles loaded from {count} stored readings")
+    except Exception as e:
+        print(f"⚠️ Diurnal profile backfill error: {e}")
+
+# Soil endpoint readings, joined onto greenhouse readings by timestamp
+soil_buffer = ReadingBuffer(max_size=int(os.getenv('READING_BUFFER_SIZE', str(READING_BUFFER_SIZE))),
+                            reorder_window=float('inf'))
+# Oldest soil reading that may still be paired with a greenhouse reading
+SOIL_JOIN_TOLERANCE_SECONDS = float(os.getenv('SOIL_JOIN_TOLERANCE_SECONDS', '900'))
+
+# Newest reading timestamp already passed to the ingestion hooks
+_last_ingested_ts = None
+# Held by the poller and the MQTT thread from the reading buffer merge until
+# the batch has reached every consumer, so batches are processed in the
+# order they were merged (re-entrant: _process_new_readings takes it too)
+_ingest_lock = threading.RLock()
+# Health score of the newest ingested reading (see _process_new_readings)
+_latest_health = None
+
+def _process_new_readings(new_readings, thresholds=None):
+    """
+    Feed readings the reading buffer accepted as new (newest first; late
+    arrivals included) to the per-reading consumers: the health score, the
+    history store and the alert engine. On the first call the backlog warms
+    the alert engine without notifying (see _run_alert_engine).
+    """
+    global _last_ingested_ts, _latest_health
+    if not new_readings:
+        return
+    # The poller and the MQTT thread both feed readings here; the per-reading
+    # models and the alert engine expect them in order, so a batch is folded
+    # in as a whole
+    with _ingest_lock:
+        first_poll = _last_ingested_ts is None
+        _last_ingested_ts = max(_last_ingested_ts or 0, max(r.get('_ts_num', 0) for r in new_readings))
+        for r in reversed(new_readings):
+            r['_quality'] = data_quality.observe(r)
+        
+        derived = [{**r, **build_derived_from_reading(r)} for r in reversed(new_readings)]
+        for r, current_data in zip(reversed(new_readings), derived):
+            scores = anomaly_detector.observe(current_data)
+            # Compared with the usual band for the hour before the reading joins it
+            scores.update(diurnal_profiles.positions(current_data))
+            r.update(scores)
+            current_data.update(scores)
+            if r.get('_ts_num', 0) >= _DIURNAL_LIVE_FROM:
+                diurnal_profiles.observe(current_data if _has_soil_value(r) else {**current_data, 'soil_moisture': None})
+        scores = []
+        for current_data in derived:
+            if current_data.get('timestamp') is None:
+                continue
+            score, sub_scores = score_statuses(_health_statuses(current_data))
+            scores.append((current_data['timestamp'], score, sub_scores))
+        if scores and (_latest_health is None or scores[-1][0] >= _latest_health['timestamp']):
+            _latest_health = {'timestamp': scores[-1][0], 'score': scores[-1][1], 'sub_scores': scores[-1][2]}
+        try:
+            # Without an aligned soil reading, store no soil value rather than the derived default
+            history_store.add_readings(d if _has_soil_value(r) else {**d, 'soil_moisture': None}
+                                       for r, d in zip(reversed(new_readings), derived))
+            history_store.add_health_scores(scores)
+        except Exception as e:
+            print(f"⚠️ History store error: {e}")
+        
+        if thresholds is None:
+            thresholds = load_thresholds()
+        _run_alert_engine(alert_engine, derived, thresholds, first_poll, alert_bus.publish)
+    
+    latest = reading_buffer.latest()
+    if latest is not None:
+        fleet_summary.update(PRIMARY_SITE_ID, _fleet_reading(latest), alert_engine.active_alerts())
+
+def _run_alert_engine(engine, derived, thresholds, first_poll, publish):
+    """
+    Feed derived readings (oldest first) to an alert engine and publish its
+    events. On the first poll after a restart the backlog is replayed first
+    without publishing, so the sustained / rate windows and debounce counters
+    start warm instead of empty; alerts the backlog left active and the
+    newest reading didn't change are then published once.
+    """
+    warm = {}
+    if first_poll:
+        for current_data in derived[:-1]:
+            try:
+                for event in engine.process_reading(current_data, thresholds):
+                    warm[event['group']] = event
+            except Exception as e:
+                print(f"⚠️ Alert engine error: {e}")
+        derived = derived[-1:]
+    published = set()
+    for current_data in derived:
+        try:
+            for event in engine.process_reading(current_data, thresholds):
+                published.add(event['group'])
+                publish(event)
+        except Exception as e:
+            print(f"⚠️ Alert engine error: {e}")
+    for group, event in warm.items():
+        if event['event'] != 'cleared' and group not in published:
+            publish(event)
+
+def _safety_fast_path(reading, thresholds):
+    """
+    Evaluate fire/gas rules for one reading the moment its poll is parsed,
+    before the rest of the poll cycle (soil fetch, buffer merge, history)
+    completes, and push any alert events straight to the alert bus. Readings
+    must come oldest first: the alert engine ignores a group's readings older
+    than the last one it saw. The regular pass in _process_new_readings then
+    skips these groups for the same reading.
+    """
+    with _ingest_lock:
+        last_ingested = _last_ingested_ts
+    if last_ingested is None or reading.get('_ts_num', 0) <= last_ingested:
+        return
+    current_data = {**reading, **build_derived_from_reading(reading)}
+    for event in alert_engine.process_reading(current_data, thresholds, groups=SAFETY_GROUPS):
+        alert_bus.publish(event)
+
 def continuous_apex_poller():
     """
     Background thread that continuously polls PRIMARY APEX endpoint (greenhouse sensors).
@@ -741,7 +863,12 @@ def continuous_apex_poller():
             print(f"🔍 Polling APEX...")
             
             # PRIMARY fetch: greenhouse sensors (this is the main data source)
-            readings = fetch_apex_readings(ORACLE_APEX_URL, timeout=60)
+            # Fire/gas rules run per reading as it is parsed (safety fast path)
+            thresholds = load_thresholds()
+            readings = fetch_apex_readings(
+                ORACLE_APEX_URL, timeout=60,
+                on_item=lambda reading: _safety_fast_path(reading, thresholds)
+            )
             
             # SECONDARY fetch: soil moisture only (supplement main data)
             soil_readings = None
@@ -751,19 +878,22 @@ def continuous_apex_poller():
                 print(f"⚠️ Soil endpoint poll failed (non-critical): {e}")
             
             if readings:
-                # If we have soil data, merge ONLY moisture into the latest greenhouse reading
-                if soil_readings and len(soil_readings) > 0:
-                    latest_soil = soil_readings[0]
-                    # Add soil moisture to the latest reading
-                    if 'moisture' in latest_soil and latest_soil['moisture'] is not None:
-                        readings[0]['moisture'] = latest_soil['moisture']
-                        readings[0]['sloi_moisture'] = latest_soil['moisture']  # Also set alias
-                        print(f"   ✅ Added soil moisture: {latest_soil['moisture']}%")
-                
-                with _smart_cache_lock:
-                    _smart_cache['data'] = readings
-                    _smart_cache['timestamp'] = datetime.now()
-                print(f"✅ APEX poll successful! Got {len(readings)} readings. Cache updated.")
+                with _ingest_lock:
+                    # APEX returns an overlapping window each poll; only new readings survive the merge
+                    new_readings = reading_buffer.merge(readings)
+                    
+                    # Align ONLY soil moisture with every buffered greenhouse reading
+                    if soil_readings:
+                        soil_buffer.merge(soil_readings)
+                    matched = _attach_soil_moisture(reading_buffer.newest_first(), soil_buffer)
+                    if matched:
+                        print(f"   ✅ Soil moisture aligned for {matched} readings")
+                    
+                    with _smart_cache_lock:
+                        _smart_cache['data'] = reading_buffer.newest_first()
+                        _smart_cache['timestamp'] = datetime.now()
+                    print(f"✅ APEX poll successful! Got {len(readings)} readings ({len(new_readings)} new). Cache updated.")
+                    _process_new_readings(new_readings, thresholds)
             else:
                 print(f"⚠️ APEX poll returned no data. Keeping existing cache.")
                 
@@ -791,6 +921,147 @@ def get_cached_apex_or_fetch():
         print("⏳ Waiting for background poller to fetch first APEX data...")
         return None, 'no_data'
 
+def _ingest_pushed_readings(readings):
+    """
+    MQTT ingestion hook: put pushed readings (newest first) at the front of
+    the reading cache and run the per-reading pipeline right away instead of
+    waiting for them to come back through APEX.
+    
+    Readings are matched to their APEX copies by (timestamp, device) in the
+    reading buffer; mqtt_ingest skips readings without a device timestamp.
+    """
+    with _ingest_lock:
+        fresh = reading_buffer.merge(readings)
+        if not fresh:
+            return
+        # Soil moisture comes from its own endpoint (polled with APEX)
+        _attach_soil_moisture(fresh, soil_buffer)
+        with _smart_cache_lock:
+            _smart_cache['data'] = reading_buffer.newest_first()
+            _smart_cache['timestamp'] = datetime.now()
+        _process_new_readings(fresh)
+
+def _attach_soil_moisture(readings, soil_readings):
+    """
+    Set moisture on each greenhouse reading (newest first) from the latest
+    soil reading in soil_readings (a ReadingBuffer) at or before it, within
+    SOIL_JOIN_TOLERANCE_SECONDS. Readings without a soil reading in range
+    keep what they had.
+    
+    Returns:
+        int: Number of readings that got a soil value
+    """
+    matched = 0
+    for reading, soil in asof_join(readings[::-1], soil_readings.newest_first()[::-1], SOIL_JOIN_TOLERANCE_SECONDS):
+        if soil is not None and soil.get('moisture') is not None:
+            reading['moisture'] = soil['moisture']
+            reading['sloi_moisture'] = soil['moisture']  # Also set alias
+            matched += 1
+    return matched
+
+def _has_soil_value(reading):
+    """True if the raw reading carries a soil moisture value of its own or from the soil join"""
+    return any(reading.get(key) is not None for key in ('moisture', 'sloi_moisture', 'sloi', 'sloiMoisture', 'soil_moisture'))
+
+# Direct MQTT ingestion, started with the poller by start_background_services
+# (None if not configured)
+mqtt_ingest = None
+
+# ============================================================================
+# SITES - Additional greenhouses from sites.json, each with its own pipeline
+# ============================================================================
+
+def _site_poller(site):
+    """
+    Background thread of one active site: the same pipeline as
+    continuous_apex_poller (merge -> soil join -> derived cache -> alerts)
+    against the site's own endpoints and thresholds, until the site is evicted.
+    Alert events go to the site's own alert engine log and, tagged with the
+    site id, to the alert bus (streams, history, notifier).
+    """
+    print(f"🏠 Site '{site.site_id}' active, polling {site.config['apex_url']} every {site.poll_interval}s")
+    first_poll = True
+    while not site.stopped.is_set():
+        try:
+            readings = fetch_apex_readings(site.config['apex_url'], timeout=60)
+            if site.config.get('soil_url'):
+                try:
+                    site.soil.merge(fetch_apex_readings(site.config['soil_url'], timeout=60) or [])
+                except Exception as e:
+                    print(f"⚠️ Site '{site.site_id}' soil poll failed (non-critical): {e}")
+            
+            if readings:
+                new_readings = site.readings.merge(readings)
+                buffered = site.readings.newest_first()
+                _attach_soil_moisture(buffered, site.soil)
+                thresholds = site_registry.thresholds(site.site_id)
+                # Derived once per new reading (oldest first), with the site's thresholds
+                derived = []
+                for reading in reversed(new_readings):
+                    reading['_quality'] = site.quality.observe(reading)
+                    current_data = {**reading, **build_derived_from_reading(reading, thresholds)}
+                    scores = site.anomaly.observe(current_data)
+                    reading.update(scores)
+                    current_data.update(scores)
+                    derived.append(current_data)
+                latest = buffered[0]
+                if new_readings and new_readings[0] is latest:
+                    latest_derived = derived[-1]
+                else:
+                    latest_derived = {**latest, **build_derived_from_reading(latest, thresholds)}
+                site.latest = {**{k: v for k, v in latest_derived.items() if not k.startswith("_")},
+                               '_quality': latest.get('_quality', [])}
+                site.updated_at = time.time()
+                
+                site_name = site.config.get('name', site.site_id)
+                _run_alert_engine(site.alert_engine, derived, thresholds, first_poll,
+                                  lambda event: alert_bus.publish({**event, 'site_id': site.site_id,
+                                                                   'title': f"{site_name}: {event.get('title')}"}))
+                first_poll = False
+                fleet_summary.update(site.site_id, _fleet_reading(latest, latest_derived),
+                                     site.alert_engine.active_alerts())
+        except Exception as e:
+            print(f"❌ Site '{site.site_id}' poll error: {e}")
+        site.stopped.wait(site.poll_interval)
+
+# Seconds between idle site evictions (one housekeeping thread for all sites)
+SITE_HOUSEKEEPING_SECONDS = 30
+
+def _site_housekeeping():
+    """Background thread: evict idle sites, which stops their pollers"""
+    while True:
+        time.sleep(SITE_HOUSEKEEPING_SECONDS)
+        try:
+            site_registry.evict_idle()
+        except Exception as e:
+            print(f"⚠️ Site eviction error: {e}")
+
+def _fleet_reading(reading, derived=None):
+    """Derived reading for the fleet summary (no soil value rather than the derived default)"""
+    if derived is None:
+        derived = {**reading, **build_derived_from_reading(reading)}
+    return derived if _has_soil_value(reading) else {**derived, 'soil_moisture': None}
+
+def _start_site_poller(site):
+    fleet_summary.set_active(site.site_id, True)
+    threading.Thread(target=_site_poller, args=(site,), daemon=True, name=f'site-{site.site_id}').start()
+
+# Sites are activated (poller started) on first request and evicted when idle
+site_registry = SiteRegistry(
+    base_thresholds=load_thresholds,
+    on_activate=_start_site_poller,
+    on_evict=lambda site: fleet_summary.set_active(site.site_id, False),
+    buffer_size=int(os.getenv('READING_BUFFER_SIZE', str(READING_BUFFER_SIZE))),
+    reorder_window=float(os.getenv('REORDER_WINDOW_SECONDS', str(REORDER_WINDOW_SECONDS)))
+)
+
+# One row per greenhouse: the primary pipeline above plus every configured site
+PRIMARY_SITE_ID = 'primary'
+fleet_summary = FleetSummary()
+fleet_summary.register(PRIMARY_SITE_ID, os.getenv('PRIMARY_SITE_NAME', 'Main greenhouse'), active=True)
+for _site_id in site_registry.site_ids():
+    fleet_summary.register(_site_id, site_registry.config(_site_id).get('name', _site_id))
+
 # ...existing code...
 
 @app.route('/api/items', methods=['GET'])
@@ -821,6 +1092,7 @@ def get_sensor_data():
         latest = readings[0]
         derived = build_derived_from_reading(latest)
         merged = {**{k: v for k, v in latest.items() if not k.startswith("_")}, **derived}
+        merged['data_quality'] = _data_quality_summary(latest, data_quality)
         merged['_cache_status'] = cache_status
         merged['_data_source'] = 'apex'
         return jsonify(merged)
@@ -832,9 +1104,138 @@ def get_sensor_data():
             "_data_source": "none"
         }), 503
 
+def _data_quality_summary(reading, monitor):
+    """Quality flags for a served reading: its own checks plus ongoing stale / flatline problems"""
+    flags = [f for f in reading.get('_quality', []) if f['check'] != 'flatline'] + monitor.current_flags()
+    return {"ok": not flags, "flags": flags}
+
+@app.route('/api/data-quality', methods=['GET'])
+def get_data_quality():
+    """
+    Data quality of the primary reading stream (or ?site=<site_id>): stale
+    data, flatlined sensors, DHT22 / BMP280 disagreement, out-of-range values
+    and spikes, with the per-sensor statistics behind them.
+    """
+    site_id = request.args.get('site')
+    if site_id:
+        site = site_registry.get(site_id)
+        if site is None:
+            return _unknown_site(site_id)
+        return jsonify({"site_id": site_id, **site.quality.report()})
+    return jsonify(data_quality.report())
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({"status": "healthy", "message": "Flask API is running"})
+    return jsonify({
+        "status": "healthy",
+        "message": "Flask API is running",
+        "gemini": get_gemini_status(),
+        "notifier": notifier.status() if notifier else None,
+        "mqtt_ingest": mqtt_ingest.status() if mqtt_ingest else None
+    })
+
+# time_range -> (bucket seconds, number of buckets), same ranges as sensor analysis
+HEALTH_SCORE_RANGES = {
+    'seconds': (1, 60), 'minutes': (60, 60), 'hours': (3600, 24),
+    'days': (86400, 30), 'weeks': (7 * 86400, 52), 'months': (30 * 86400, 12), 'years': (365 * 86400, 5)
+}
+
+@app.route('/api/health-score', methods=['GET'])
+def get_health_score():
+    """
+    Greenhouse health score: the newest reading's score and sub-scores plus
+    the stored per-reading series for ?time_range= (default hours), averaged
+    per bucket.
+    """
+    time_range = request.args.get('time_range', 'hours')
+    if time_range not in HEALTH_SCORE_RANGES:
+        return jsonify({'error': f"Invalid time_range '{time_range}'. Use one of: {', '.join(HEALTH_SCORE_RANGES)}"}), 400
+    bucket_seconds, buckets = HEALTH_SCORE_RANGES[time_range]
+    end = time.time() + 1
+    series = history_store.health_series(end - bucket_seconds * buckets, end, max_points=buckets)
+    
+    current = _latest_health
+    return jsonify({
+        'time_range': time_range,
+        'current': {**current, 'status': health_label(current['score'])} if current else None,
+        'series': [
+            {
+                'timestamp': ts,
+                'score': round(score, 1),
+                'sub_scores': {name: round(value, 1) for name, value in sub_scores.items() if value is not None}
+            }
+            for ts, score, sub_scores in series
+        ]
+    })
+
+# Sensors with a forecast (history columns) and their units
+FORECAST_SENSORS = {'temperature': '°C', 'humidity': '%'}
+forecast_cache = ForecastCache(history_store)
+
+@app.route('/api/forecast/<sensor>', methods=['GET'])
+def get_forecast(sensor):
+    """
+    Forecast of temperature or humidity for the next ?horizon= minutes
+    (default 60), with the predicted time the value first leaves the
+    optimal and the acceptable band of the current thresholds. Only points
+    from now on are returned; 503 while the sensor has no recent history.
+    """
+    if sensor not in FORECAST_SENSORS:
+        return jsonify({'error': f"No forecast for '{sensor}'. Use one of: {', '.join(FORECAST_SENSORS)}"}), 400
+    horizon = min(max(request.args.get('horizon', 60, type=int), 1), FORECAST_MAX_HORIZON_MINUTES)
+    now = time.time()
+    model = forecast_cache.model(sensor, now)
+    if model.level is None:
+        return jsonify({'error': 'Not enough history for a forecast yet', 'sensor': sensor}), 503
+    if model.is_stale(now):
+        return jsonify({'error': 'No recent history to forecast from', 'sensor': sensor,
+                        'fitted_until': model.last_ts + model.step}), 503
+    
+    steps = math.ceil((now + horizon * 60 - model.last_ts) / model.step)
+    points = [point for point in model.forecast(steps) if point[0] >= now]
+    opt_lo, opt_hi, acc_lo, acc_hi = _time_in_range_bands(load_thresholds())[sensor]
+    
+    def crossing(low, high):
+        hit = first_crossing(points, low, high)
+        if hit:
+            hit['value'] = round(hit['value'], 2)
+            hit['minutes_from_now'] = round((hit['timestamp'] - now) / 60)
+        return hit
+    
+    return jsonify({
+        'sensor': sensor,
+        'unit': FORECAST_SENSORS[sensor],
+        'horizon_minutes': horizon,
+        'step_seconds': model.step,
+        'fitted_until': model.last_ts + model.step,
+        'forecast': [
+            {'timestamp': ts, 'value': round(value, 2), 'lower': round(value - spread, 2), 'upper': round(value + spread, 2)}
+            for ts, value, spread in points
+        ],
+        'thresholds': {'optimal': {'min': opt_lo, 'max': opt_hi}, 'acceptable': {'min': acc_lo, 'max': acc_hi}},
+        'first_crossing': {'optimal': crossing(opt_lo, opt_hi), 'acceptable': crossing(acc_lo, acc_hi)}
+    })
+
+@app.route('/api/diurnal/<sensor>', methods=['GET'])
+def get_diurnal_profile(sensor):
+    """
+    Usual value of a sensor per hour of day (mean, p10, p90) over the past
+    DIURNAL_DAYS days, and how the newest reading compares with its hour.
+    """
+    if sensor not in DIURNAL_FIELDS:
+        return jsonify({'error': f"No daily profile for '{sensor}'. Use one of: {', '.join(DIURNAL_FIELDS)}"}), 400
+    current = None
+    latest = reading_buffer.latest()
+    if latest is not None and (sensor != 'soil_moisture' or _has_soil_value(latest)):
+        value = {**latest, **build_derived_from_reading(latest)}.get(sensor)
+        current = diurnal_profiles.compare(sensor, value, latest.get('_ts_num'))
+    return jsonify({
+        'sensor': sensor,
+        'days': diurnal_profiles.days,
+        'min_days': diurnal_profiles.min_days,
+        'profile': diurnal_profiles.profile(sensor),
+        'current': current
+    })
 
 @app.route('/api/sensor-analysis/<sensor_type>', methods=['GET'])
 def get_sensor_analysis(sensor_type):
@@ -1075,122 +1476,320 @@ def get_sensor_analysis(sensor_type):
         "timestamp": current_data.get('timestamp', time.time()),
         "raw_data": current_data
     }
+    
+    # Online anomaly score of the newest reading and per historical point
+    name = anomaly_name(key)
+    if name:
+        response["anomaly"] = anomaly_detector.details(name)
+        scores = {r.get('timestamp', r.get('_ts_num')): r.get(f"{name}_anomaly") for r in historical_raw}
+        for point in historical_data:
+            point["anomaly_score"] = scores.get(point["timestamp"])
+    # Usual range for this hour of the day (e.g. dark when it is normally bright)
+    if key in DIURNAL_FIELDS and (key != 'soil_moisture' or _has_soil_value(latest)):
+        response["diurnal"] = diurnal_profiles.compare(key, current_value, latest.get('_ts_num'))
 
     return jsonify(response)
 # ...existing code...
 
-@app.route('/api/sensor-analysis/<sensor_type>/ai', methods=['GET'])
-def get_sensor_ai_only(sensor_type):
+# Per-sensor AI analysis cache - filled by single and batched AI requests.
+# An entry is reused while the sensor's status is unchanged and it is younger than the TTL.
+_ai_analysis_cache = {}
+_ai_analysis_cache_lock = threading.Lock()
+AI_ANALYSIS_CACHE_TTL = float(os.getenv('AI_ANALYSIS_CACHE_TTL', '120'))
+
+# Sensors covered by the batched AI endpoint when ?sensors= is not given: the
+# sensor types the dashboard cards open, so their analyses are cached under
+# the same names the analysis screens request
+DEFAULT_AI_BATCH_SENSORS = [
+    'temperature', 'humidity', 'soil_moisture', 'light_level',
+    'air_quality', 'smoke', 'co', 'pressure', 'altitude'
+]
+
+def _get_cached_ai_analysis(sensor_type, status):
+    """Return cached analysis text for sensor_type if still valid for this status, else None"""
+    with _ai_analysis_cache_lock:
+        entry = _ai_analysis_cache.get(sensor_type.lower())
+    if not entry:
+        return None
+    if entry['status'] != status or time.time() - entry['created'] > AI_ANALYSIS_CACHE_TTL:
+        return None
+    return entry['analysis']
+
+def _store_ai_analysis(sensor_type, status, analysis_text):
+    """Store analysis text for sensor_type in the per-sensor AI cache"""
+    with _ai_analysis_cache_lock:
+        _ai_analysis_cache[sensor_type.lower()] = {
+            'analysis': analysis_text,
+            'status': status,
+            'created': time.time()
+        }
+
+def _resolve_ai_sensor_inputs(sensor_type, readings):
     """
-    Get ONLY AI analysis for a sensor - called separately for async loading!
-    This endpoint is FAST because it skips historical data processing.
+    Work out the Gemini inputs for one sensor from the cached APEX readings.
+    Returns tuple: (current_value, unit, status, historical_values)
     """
-    try:
-        readings, _ = get_cached_apex_or_fetch()
-        if not readings:
-            return jsonify({'analysis': 'No data available'}), 503
-        
-        latest = readings[0]
-        sensor_data = {**latest, **build_derived_from_reading(latest)}
+    latest = readings[0]
+    sensor_data = {**latest, **build_derived_from_reading(latest)}
+    
+    # Determine sensor specifics based on type
+    st = sensor_type.lower()
+    if 'temp' in st:
+        current_value = sensor_data.get('temperature', 0)
+        unit = '°C'
+        status = _get_temperature_status(current_value)
+    elif 'humid' in st:
+        current_value = sensor_data.get('humidity', 0)
+        unit = '%'
+        status = _get_humidity_status(current_value)
+    elif 'light' in st:
+        current_value = sensor_data.get('light', 0)
+        unit = 'lux'
+        status = _get_light_status(current_value)
+    elif 'co2' in st or 'air' in st or 'mq135' in st or 'air_quality' in st:
+        # For CO2/air quality cards, show the CO2 level (calculated from MQ135)
+        current_value = sensor_data.get('co2_level', sensor_data.get('mq135_drop', 0))
+        unit = 'ppm'
+        # Determine status based on whether we're using CO2 level or raw MQ135
+        if sensor_data.get('co2_level', 0) > 0:
+            # Using CO2 level
+            status = _get_co2_status(current_value)
+        else:
+            # Fallback to MQ135 drop status
+            status = "Good" if current_value <= 200 else ("Poor" if current_value > 500 else "Moderate")
+    elif 'mq2' in st or 'smoke' in st or 'flammable' in st:
+        current_value = sensor_data.get('mq2_drop', 0)
+        unit = 'ppm'
+        status = "Safe" if current_value <= 300 else ("High" if current_value > 750 else "Elevated")
+    elif 'mq7' in st or ('co' in st and 'co2' not in st) or 'carbon monoxide' in st:
+        current_value = sensor_data.get('mq7_drop', 0)
+        unit = 'ppm'
+        status = "Safe" if current_value <= 300 else ("High" if current_value > 750 else "Elevated")
+    elif 'soil' in st or 'moisture' in st:
+        # Check for various soil moisture field names
+        current_value = (sensor_data.get('sloi_moisture') or 
+                       sensor_data.get('moisture') or 
+                       sensor_data.get('soil_moisture') or 0)
+        unit = '%'
+        status = _get_soil_moisture_status(current_value)
+    elif 'altitude' in st:
+        current_value = sensor_data.get('altitude', 0)
+        unit = 'm'
+        status = "Low" if current_value < 500 else ("High" if current_value > 1500 else "Normal")
+    elif 'pressure' in st:
+        current_value = sensor_data.get('pressure', 0)
+        unit = 'hPa'
+        status = "Normal" if 990 <= current_value <= 1030 else ("Low" if current_value < 990 else "High")
+    else:
+        current_value = 0
+        unit = ''
+        status = 'Unknown'
+    
+    # Get last 10 readings for trend analysis
+    historical_values = []
+    for r in readings[:10]:
+        # Build derived data for each reading to get co2_level
+        r_derived = build_derived_from_reading(r)
+        r_data = {**r, **r_derived}
         
-        # Determine sensor specifics based on type
-        st = sensor_type.lower()
         if 'temp' in st:
-            current_value = sensor_data.get('temperature', 0)
-            unit = '°C'
-            status = _get_temperature_status(current_value)
+            val = r_data.get('temperature', 0)
         elif 'humid' in st:
-            current_value = sensor_data.get('humidity', 0)
-            unit = '%'
-            status = _get_humidity_status(current_value)
+            val = r_data.get('humidity', 0)
         elif 'light' in st:
-            current_value = sensor_data.get('light', 0)
-            unit = 'lux'
-            status = _get_light_status(current_value)
+            val = r_data.get('light', 0)
         elif 'co2' in st or 'air' in st or 'mq135' in st or 'air_quality' in st:
-            # For CO2/air quality cards, show the CO2 level (calculated from MQ135)
-            current_value = sensor_data.get('co2_level', sensor_data.get('mq135_drop', 0))
-            unit = 'ppm'
-            # Determine status based on whether we're using CO2 level or raw MQ135
-            if sensor_data.get('co2_level', 0) > 0:
-                # Using CO2 level
-                status = _get_co2_status(current_value)
-            else:
-                # Fallback to MQ135 drop status
-                status = "Good" if current_value <= 200 else ("Poor" if current_value > 500 else "Moderate")
+            # Use CO2 level if available, otherwise fall back to MQ135 drop
+            val = r_data.get('co2_level', r_data.get('mq135_drop', 0))
         elif 'mq2' in st or 'smoke' in st or 'flammable' in st:
-            current_value = sensor_data.get('mq2_drop', 0)
-            unit = 'ppm'
-            status = "Safe" if current_value <= 300 else ("High" if current_value > 750 else "Elevated")
+            val = r_data.get('mq2_drop', 0)
         elif 'mq7' in st or ('co' in st and 'co2' not in st) or 'carbon monoxide' in st:
-            current_value = sensor_data.get('mq7_drop', 0)
-            unit = 'ppm'
-            status = "Safe" if current_value <= 300 else ("High" if current_value > 750 else "Elevated")
+            val = r_data.get('mq7_drop', 0)
         elif 'soil' in st or 'moisture' in st:
-            # Check for various soil moisture field names
-            current_value = (sensor_data.get('sloi_moisture') or 
-                           sensor_data.get('moisture') or 
-                           sensor_data.get('soil_moisture') or 0)
-            unit = '%'
-            status = _get_soil_moisture_status(current_value)
+            # Check for various soil moisture field names from merged data
+            val = (r_data.get('sloi_moisture') or 
+                  r_data.get('moisture') or 
+                  r_data.get('soil_moisture') or 0)
         elif 'altitude' in st:
-            current_value = sensor_data.get('altitude', 0)
-            unit = 'm'
-            status = "Low" if current_value < 500 else ("High" if current_value > 1500 else "Normal")
+            val = r_data.get('altitude', 0)
         elif 'pressure' in st:
-            current_value = sensor_data.get('pressure', 0)
-            unit = 'hPa'
-            status = "Normal" if 990 <= current_value <= 1030 else ("Low" if current_value < 990 else "High")
+            val = r_data.get('pressure', 0)
         else:
-            current_value = 0
-            unit = ''
-            status = 'Unknown'
+            val = 0
+        historical_values.append(val)
+    
+    return current_value, unit, status, historical_values
+
+@app.route('/api/sensor-analysis/<sensor_type>/ai', methods=['GET'])
+def get_sensor_ai_only(sensor_type):
+    """
+    Get ONLY AI analysis for a sensor - called separately for async loading!
+    This endpoint is FAST because it skips historical data processing.
+    Served from the per-sensor AI cache when a recent analysis exists.
+    """
+    try:
+        readings, _ = get_cached_apex_or_fetch()
+        if not readings:
+            return jsonify({'analysis': 'No data available'}), 503
         
-        # Get last 10 readings for trend analysis
-        historical_values = []
-        for r in readings[:10]:
-            # Build derived data for each reading to get co2_level
-            r_derived = build_derived_from_reading(r)
-            r_data = {**r, **r_derived}
-            
-            if 'temp' in st:
-                val = r_data.get('temperature', 0)
-            elif 'humid' in st:
-                val = r_data.get('humidity', 0)
-            elif 'light' in st:
-                val = r_data.get('light', 0)
-            elif 'co2' in st or 'air' in st or 'mq135' in st or 'air_quality' in st:
-                # Use CO2 level if available, otherwise fall back to MQ135 drop
-                val = r_data.get('co2_level', r_data.get('mq135_drop', 0))
-            elif 'mq2' in st or 'smoke' in st or 'flammable' in st:
-                val = r_data.get('mq2_drop', 0)
-            elif 'mq7' in st or ('co' in st and 'co2' not in st) or 'carbon monoxide' in st:
-                val = r_data.get('mq7_drop', 0)
-            elif 'soil' in st or 'moisture' in st:
-                # Check for various soil moisture field names from merged data
-                val = (r_data.get('sloi_moisture') or 
-                      r_data.get('moisture') or 
-                      r_data.get('soil_moisture') or 0)
-            elif 'altitude' in st:
-                val = r_data.get('altitude', 0)
-            elif 'pressure' in st:
-                val = r_data.get('pressure', 0)
-            else:
-                val = 0
-            historical_values.append(val)
+        current_value, unit, status, historical_values = _resolve_ai_sensor_inputs(sensor_type, readings)
         
-        # Call Gemini AI
-        analysis_text = get_gemini_analysis(sensor_type, current_value, unit, status, historical_values)
+        analysis_text = _get_cached_ai_analysis(sensor_type, status)
+        cached = analysis_text is not None
+        if not cached:
+            # Call Gemini AI
+            analysis_text, generated = get_gemini_analysis_result(sensor_type, current_value, unit, status, historical_values)
+            # Fallback text (Gemini unconfigured / limited / failing) isn't cached
+            if generated:
+                _store_ai_analysis(sensor_type, status, analysis_text)
         
         return jsonify({
             'analysis': analysis_text,
             'timestamp': time.time(),
-            'sensor_type': sensor_type
+            'sensor_type': sensor_type,
+            'cached': cached
         }), 200
         
     except Exception as e:
         logger.error(f"AI analysis error for {sensor_type}: {e}")
-        return jsonify({'analysis': f'AI analysis temporarily unavailable'}), 500
+        return jsonify({'analysis': 'AI analysis temporarily unavailable'}), 500
+
+# Each open Server-Sent Events stream (AI text, alert push) holds a gunicorn
+# thread for as long as the client stays connected; capping them keeps the
+# remaining threads (--threads 8) free for ordinary requests
+STREAM_MAX_SUBSCRIBERS = int(os.getenv('STREAM_MAX_SUBSCRIBERS', '4'))
+_stream_slots = threading.BoundedSemaphore(STREAM_MAX_SUBSCRIBERS)
+
+def _acquire_stream_slot(fallback):
+    """
+    Reserve a stream slot. Returns None on success (the caller releases it
+    with response.call_on_close), or a 503 response pointing the client at
+    the polling endpoint `fallback` when every slot is taken.
+    """
+    if _stream_slots.acquire(blocking=False):
+        return None
+    response = jsonify({'error': 'Too many open streams', 'fallback': fallback})
+    response.status_code = 503
+    response.headers['Retry-After'] = '10'
+    return response
+
+@app.route('/api/sensor-analysis/<sensor_type>/ai/stream', methods=['GET'])
+def stream_sensor_ai_only(sensor_type):
+    """
+    Streaming version of the AI-only endpoint (Server-Sent Events).
+    Emits 'chunk' events with {"text": ...} as Gemini generates, then one
+    'done' event with the full {"analysis": ...}. A cached analysis is sent
+    as a single chunk. Text from a stream Gemini finished normally is stored
+    in the per-sensor AI cache (not fallback text or a stream that broke off).
+    When STREAM_MAX_SUBSCRIBERS streams are already open it answers 503 with
+    the non-streaming endpoint as 'fallback'.
+    """
+    readings, _ = get_cached_apex_or_fetch()
+    if not readings:
+        return jsonify({'analysis': 'No data available'}), 503
+    
+    try:
+        current_value, unit, status, historical_values = _resolve_ai_sensor_inputs(sensor_type, readings)
+    except Exception as e:
+        logger.error(f"AI analysis error for {sensor_type}: {e}")
+        return jsonify({'analysis': 'AI analysis temporarily unavailable'}), 500
+    
+    cached_text = _get_cached_ai_analysis(sensor_type, status)
+    
+    def sse(event, payload):
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    
+    def generate():
+        if cached_text is not None:
+            yield sse('chunk', {'text': cached_text})
+            yield sse('done', {'analysis': cached_text, 'sensor_type': sensor_type, 'cached': True})
+            return
+        
+        parts = []
+        complete = False
+        try:
+            stream = stream_gemini_analysis(sensor_type, current_value, unit, status, historical_values)
+            while True:
+                try:
+                    chunk = next(stream)
+                except StopIteration as stop:
+                    complete = bool(stop.value)
+                    break
+                parts.append(chunk)
+                yield sse('chunk', {'text': chunk})
+        except Exception as e:
+            logger.error(f"AI stream error for {sensor_type}: {e}")
+        
+        analysis_text = ''.join(parts).strip() or 'AI analysis temporarily unavailable'
+        # Only a stream Gemini finished normally is a complete analysis
+        if complete:
+            _store_ai_analysis(sensor_type, status, analysis_text)
+        yield sse('done', {'analysis': analysis_text, 'sensor_type': sensor_type, 'cached': False})
+    
+    busy = _acquire_stream_slot(f"/api/sensor-analysis/{sensor_type}/ai")
+    if busy is not None:
+        return busy
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Don't let reverse proxies buffer the stream
+    })
+    response.call_on_close(_stream_slots.release)
+    return response
+
+@app.route('/api/sensor-analysis/ai/batch', methods=['GET'])
+def get_sensor_ai_batch():
+    """
+    Get AI analysis for several sensors with ONE Gemini request.
+    ?sensors=temperature,humidity,... (defaults to all dashboard sensors)
+    ?refresh=true ignores cached analyses.
+    Results are written to the per-sensor AI cache, so the individual
+    /api/sensor-analysis/<sensor_type>/ai calls that follow are served from it.
+    """
+    try:
+        readings, _ = get_cached_apex_or_fetch()
+        if not readings:
+            return jsonify({'error': 'No data available', 'analyses': {}}), 503
+        
+        sensors_param = request.args.get('sensors', '')
+        sensor_types = [s.strip() for s in sensors_param.split(',') if s.strip()] or DEFAULT_AI_BATCH_SENSORS
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        
+        analyses = {}
+        cached_types = []
+        to_generate = []
+        for sensor_type in sensor_types:
+            current_value, unit, status, historical_values = _resolve_ai_sensor_inputs(sensor_type, readings)
+            analysis_text = None if refresh else _get_cached_ai_analysis(sensor_type, status)
+            if analysis_text is not None:
+                analyses[sensor_type] = analysis_text
+                cached_types.append(sensor_type)
+            else:
+                to_generate.append({
+                    'sensor_type': sensor_type,
+                    'current_value': current_value,
+                    'unit': unit,
+                    'status': status,
+                    'historical_data': historical_values
+                })
+        
+        if to_generate:
+            generated, from_ai = get_gemini_batch_analysis(to_generate)
+            for s in to_generate:
+                analysis_text = generated.get(s['sensor_type'], '')
+                analyses[s['sensor_type']] = analysis_text
+                if s['sensor_type'] in from_ai:
+                    _store_ai_analysis(s['sensor_type'], s['status'], analysis_text)
+        
+        return jsonify({
+            'analyses': analyses,
+            'cached': cached_types,
+            'generated': [s['sensor_type'] for s in to_generate],
+            'timestamp': time.time()
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Batch AI analysis error: {e}")
+        return jsonify({'error': 'AI analysis temporarily unavailable', 'analyses': {}}), 500
 
 @app.route('/api/ai-recommendations', methods=['GET'])
 def get_ai_recommendations():
@@ -1206,7 +1805,7 @@ def get_ai_recommendations():
     current_data = {**latest, **build_derived_from_reading(latest)}
     
     # Use Gemini AI to generate recommendations based on APEX sensor data
-    recommendations = get_gemini_recommendations(current_data)
+    recommendations = get_gemini_recommendations(current_data, load_thresholds())
     
     # Return recommendations along with timestamp
     return jsonify({
@@ -1220,214 +1819,164 @@ def get_alerts():
     Get alerts when sensors are outside normal ranges - ONLY FROM APEX DATA
     Triggers sound notification in frontend when alerts exist.
     Uses editable thresholds from thresholds.json
+    
+    ?since=<event id> returns only alert state changes published after that
+    id (raised / changed / cleared; site events carry site_id), plus the
+    currently active alerts. Pass the returned latest_event_id on the next call.
     """
+    since = request.args.get('since', type=int)
+    if since is not None:
+        events, latest_id = alert_bus.events_since(since, limit=request.args.get('limit', type=int))
+        return jsonify({
+            "events": events,
+            "active_alerts": alert_engine.active_alerts(),
+            "latest_event_id": latest_id,
+            "should_alert": any(e.get('sound', False) and e['event'] != 'cleared' for e in events)
+        })
+    
     # ONLY USE APEX DATA
     readings, _ = get_cached_apex_or_fetch()
     if not readings:
-        return jsonify({"error": "No APEX data available", "alerts": [], "alert_count": 0, "should_alert": False}), 503
+        return jsonify({"error": "No APEX data available", "alerts": [], "alert_count": 0, "should_alert": False,
+                        "latest_event_id": alert_bus.latest_event_id}), 503
     
     latest = readings[0]
     current_data = {**latest, **build_derived_from_reading(latest)}
     
-    # Load current thresholds (editable from frontend)
+    # Load current thresholds (editable from frontend) and evaluate the shared rule table
     thresholds = load_thresholds()
+    evaluation = evaluate_reading(current_data, thresholds)
+    alerts = build_alerts(evaluation, current_data['timestamp'])
+    # Windowed rules (sustained exceedance, rate of change) need history, so
+    # they come from the alert engine's sliding windows
+    alerts.extend(alert_engine.active_alerts(windowed_only=True))
     
-    # Generate alerts based on thresholds
-    alerts = []
-    
-    # CRITICAL SAFETY ALERTS (highest priority)
-    
-    # Flame detection alert - check if flame_detected is truthy (boolean, 'Yes', 1, etc.)
-    flame_detected = current_data.get('flame_detected')
-    if flame_detected and str(flame_detected).lower() in ('true', 'yes', '1'):
-        alerts.append({
-            "title": "🔥 FIRE HAZARD",
-            "message": "Flame or strong IR source detected. Inspect all heating equipment immediately!",
-            "timestamp": current_data['timestamp'],
-            "sensor_type": "flame",
-            "severity": "critical",
-            "value": current_data.get('flame_raw', 0),
-            "unit": "raw",
-            "sound": True  # Trigger sound alert
-        })
-    
-    # Carbon monoxide alert (using thresholds from config)
-    mq7_drop = current_data.get('mq7_drop', 0)
-    mq7_safe = thresholds.get('mq7', {}).get('safe', 300)
-    mq7_high = thresholds.get('mq7', {}).get('high', 750)
-    if mq7_drop > mq7_high:
-        alerts.append({
-            "title": "⚠️ CO CRITICAL",
-            "message": f"Carbon monoxide at {mq7_drop:.0f} ppm exceeds safe levels (>{mq7_high}). Ventilate immediately!",
-            "timestamp": current_data['timestamp'],
-            "sensor_type": "carbon_monoxide",
-            "severity": "critical",
-            "value": mq7_drop,
-            "unit": "ppm",
-            "sound": True
-        })
-    elif mq7_drop > mq7_safe:
-        alerts.append({
-            "title": "CO Elevated",
-            "message": f"Carbon monoxide at {mq7_drop:.0f} ppm. Monitor heating equipment closely.",
-            "timestamp": current_data['timestamp'],
-            "sensor_type": "carbon_monoxide",
-            "severity": "high",
-            "value": mq7_drop,
-            "unit": "ppm",
-            "sound": True
-        })
-    
-    # Flammable gas alert (using thresholds from config)
-    mq2_drop = current_data.get('mq2_drop', 0)
-    mq2_safe = thresholds.get('mq2', {}).get('safe', 300)
-    mq2_high = thresholds.get('mq2', {}).get('high', 750)
-    if mq2_drop > mq2_high:
-        alerts.append({
-            "title": "⚠️ GAS CRITICAL",
-            "message": f"Flammable gas at {mq2_drop:.0f} ppm (>{mq2_high}). Check for leaks immediately!",
-            "timestamp": current_data['timestamp'],
-            "sensor_type": "flammable_gas",
-            "severity": "critical",
-            "value": mq2_drop,
-            "unit": "ppm",
-            "sound": True
-        })
-    elif mq2_drop > mq2_safe:
-        alerts.append({
-            "title": "Gas Elevated",
-            "message": f"Flammable gas at {mq2_drop:.0f} ppm. Increase ventilation.",
-            "timestamp": current_data['timestamp'],
-            "sensor_type": "flammable_gas",
-            "severity": "high",
-            "value": mq2_drop,
-            "unit": "ppm",
-            "sound": True
-        })
-    
-    # ENVIRONMENTAL ALERTS
-    
-    # Temperature alert (using thresholds from config)
-    avg_temp = (current_data['temperature_bmp280'] + current_data['temperature_dht22']) / 2
-    temp_opt_min = thresholds.get('temperature', {}).get('optimal', {}).get('min', 20)
-    temp_opt_max = thresholds.get('temperature', {}).get('optimal', {}).get('max', 27)
-    temp_acc_min = thresholds.get('temperature', {}).get('acceptable', {}).get('min', 18)
-    temp_acc_max = thresholds.get('temperature', {}).get('acceptable', {}).get('max', 30)
-    
-    if avg_temp < temp_acc_min:
-        alerts.append({
-            "title": "Temperature Critical Low",
-            "message": f"Temperature at {avg_temp:.1f}°C is critically low (<{temp_acc_min}°C). Plants may suffer cold damage.",
-            "timestamp": current_data['timestamp'],
-            "sensor_type": "temperature",
-            "severity": "high",
-            "value": avg_temp,
-            "unit": "°C",
-            "sound": True
-        })
-    elif avg_temp > temp_acc_max:
-        alerts.append({
-            "title": "Temperature Critical High",
-            "message": f"Temperature at {avg_temp:.1f}°C is dangerously high (>{temp_acc_max}°C). Risk of heat stress.",
-            "timestamp": current_data['timestamp'],
-            "sensor_type": "temperature",
-            "severity": "high",
-            "value": avg_temp,
-            "unit": "°C",
-            "sound": True
-        })
-    elif avg_temp < temp_opt_min or avg_temp > temp_opt_max:
-        alerts.append({
-            "title": "Temperature Outside Optimal",
-            "message": f"Temperature at {avg_temp:.1f}°C is outside optimal range ({temp_opt_min}-{temp_opt_max}°C).",
-            "timestamp": current_data['timestamp'],
-            "sensor_type": "temperature",
-            "severity": "medium",
-            "value": avg_temp,
-            "unit": "°C",
-            "sound": False
-        })
-    
-    # Humidity alert (using thresholds from config)
-    humidity = current_data.get('humidity', 0)
-    hum_opt_min = thresholds.get('humidity', {}).get('optimal', {}).get('min', 45)
-    hum_opt_max = thresholds.get('humidity', {}).get('optimal', {}).get('max', 70)
-    hum_acc_min = thresholds.get('humidity', {}).get('acceptable', {}).get('min', 40)
-    hum_acc_max = thresholds.get('humidity', {}).get('acceptable', {}).get('max', 80)
-    
-    if humidity < hum_acc_min:
-        alerts.append({
-            "title": "Humidity Critical Low",
-            "message": f"Humidity at {humidity}% is critically low (<{hum_acc_min}%). Too dry - recommend shading to reduce evaporation.",
-            "timestamp": current_data['timestamp'],
-            "sensor_type": "humidity",
-            "severity": "high",
-            "value": humidity,
-            "unit": "%",
-            "sound": True
-        })
-    elif humidity > hum_acc_max:
-        alerts.append({
-            "title": "Humidity Critical High",
-            "message": f"Humidity at {humidity}% is dangerously high (>{hum_acc_max}%). Risk of fungal growth - run all ventilation and open vents!",
-            "timestamp": current_data['timestamp'],
-            "sensor_type": "humidity",
-            "severity": "high",
-            "value": humidity,
-            "unit": "%",
-            "sound": True
-        })
-    elif humidity < hum_opt_min or humidity > hum_opt_max:
-        alerts.append({
-            "title": "Humidity Outside Optimal",
-            "message": f"Humidity at {humidity}% is outside optimal range ({hum_opt_min}-{hum_opt_max}%). Adjust vents/fans.",
-            "timestamp": current_data['timestamp'],
-            "sensor_type": "humidity",
-            "severity": "medium",
-            "value": humidity,
-            "unit": "%",
-            "sound": False
-        })
+    # Determine if sound alert should be triggered (any critical/high severity)
+    should_alert = any(alert.get('sound', False) for alert in alerts)
     
-    # Air quality alert (using thresholds from config)
-    mq135_drop = current_data.get('mq135_drop', 0)
-    mq135_good = thresholds.get('mq135', {}).get('good', 200)
-    mq135_poor = thresholds.get('mq135', {}).get('poor', 500)
-    
-    if mq135_drop > mq135_poor:
-        alerts.append({
-            "title": "Air Quality Poor",
-            "message": f"Air quality at {mq135_drop:.0f} ppm indicates poor conditions (>{mq135_poor}). Increase ventilation.",
-            "timestamp": current_data['timestamp'],
-            "sensor_type": "air_quality",
-            "severity": "medium",
-            "value": mq135_drop,
-            "unit": "ppm",
-            "sound": True
+    return jsonify({
+        "alerts": alerts,
+        "timestamp": current_data['timestamp'],
+        "alert_count": len(alerts),
+        "should_alert": should_alert,  # Frontend can use this to trigger sound
+        "latest_event_id": alert_bus.latest_event_id
+    })
+
+@app.route('/api/sites', methods=['GET'])
+def get_sites():
+    """Configured sites (sites.json) and whether each one is currently active"""
+    sites = []
+    for site_id in site_registry.site_ids():
+        config = site_registry.config(site_id) or {}
+        sites.append({
+            "site_id": site_id,
+            "name": config.get('name', site_id),
+            "active": site_registry.is_active(site_id)
         })
-    elif mq135_drop > mq135_good:
-        alerts.append({
-            "title": "Air Quality Moderate",
-            "message": f"Air quality at {mq135_drop:.0f} ppm is outside optimal range (>{mq135_good}).",
-            "timestamp": current_data['timestamp'],
-            "sensor_type": "air_quality",
-            "severity": "low",
-            "value": mq135_drop,
-            "unit": "ppm",
-            "sound": False
+    return jsonify({"sites": sites})
+
+@app.route('/api/fleet/summary', methods=['GET'])
+def get_fleet_summary():
+    """
+    All greenhouses in one call: latest key values, worst active severity,
+    active alert count and data freshness per site. Served from the fleet
+    summary table the pollers keep up to date; viewing the fleet keeps the
+    sites active (up to MAX_ACTIVE_SITES).
+    """
+    site_registry.touch_all()
+    return Response(fleet_summary.body(), mimetype='application/json')
+
+def _unknown_site(site_id):
+    return jsonify({"error": f"Unknown site '{site_id}'"}), 404
+
+@app.route('/api/sites/<site_id>/sensor-data', methods=['GET'])
+def get_site_sensor_data(site_id):
+    """Latest derived reading of one site, served from the site's derived cache"""
+    site = site_registry.get(site_id)
+    if site is None:
+        return _unknown_site(site_id)
+    latest = site.latest
+    if latest is None:
+        return jsonify({
+            "error": "APEX data not available yet",
+            "message": "Waiting for APEX to respond. Please wait...",
+            "_site_id": site_id,
+            "_data_source": "none"
+        }), 503
+    age = time.time() - site.updated_at
+    served = {k: v for k, v in latest.items() if k != '_quality'}
+    served['data_quality'] = _data_quality_summary(latest, site.quality)
+    return jsonify({**served, '_site_id': site_id, '_cache_status': f'cache_age_{age:.0f}s', '_data_source': 'apex'})
+
+@app.route('/api/sites/<site_id>/alerts', methods=['GET'])
+def get_site_alerts(site_id):
+    """Same as /api/alerts (including ?since=) for one site, with its own thresholds"""
+    site = site_registry.get(site_id)
+    if site is None:
+        return _unknown_site(site_id)
+    engine = site.alert_engine
+    since = request.args.get('since', type=int)
+    if since is not None:
+        events, latest_id = engine.events_since(since, limit=request.args.get('limit', type=int))
+        return jsonify({
+            "events": events,
+            "active_alerts": engine.active_alerts(),
+            "latest_event_id": latest_id,
+            "should_alert": any(e.get('sound', False) and e['event'] != 'cleared' for e in events)
         })
     
-    # Determine if sound alert should be triggered (any critical/high severity)
-    should_alert = any(alert.get('sound', False) for alert in alerts)
-    
+    current_data = site.latest
+    if current_data is None:
+        return jsonify({"error": "No APEX data available", "alerts": [], "alert_count": 0, "should_alert": False}), 503
+    alerts = build_alerts(evaluate_reading(current_data, site_registry.thresholds(site_id)), current_data['timestamp'])
+    alerts.extend(engine.active_alerts(windowed_only=True))
     return jsonify({
         "alerts": alerts,
         "timestamp": current_data['timestamp'],
         "alert_count": len(alerts),
-        "should_alert": should_alert  # Frontend can use this to trigger sound
+        "should_alert": any(alert.get('sound', False) for alert in alerts),
+        "latest_event_id": engine.latest_event_id
     })
 
-if __name__ == '__main__':
+@app.route('/api/sites/<site_id>/thresholds', methods=['GET'])
+def get_site_thresholds(site_id):
+    """Effective thresholds of one site (global thresholds + the site's overrides)"""
+    config = site_registry.config(site_id)
+    if config is None:
+        return _unknown_site(site_id)
+    return jsonify({"thresholds": site_registry.thresholds(site_id), "overrides": config.get('thresholds', {})}), 200
+
+@app.route('/api/sites/<site_id>/thresholds', methods=['POST'])
+def set_site_thresholds(site_id):
+    """Replace the threshold overrides of one site (saved to sites.json)"""
+    try:
+        payload = request.get_json(force=True)
+        if not isinstance(payload, dict):
+            return jsonify({"error": "Invalid payload - must be a dictionary"}), 400
+        if not site_registry.save_thresholds(site_id, payload):
+            return _unknown_site(site_id)
+        return jsonify({"message": "Thresholds updated successfully", "thresholds": site_registry.thresholds(site_id)}), 200
+    except Exception as e:
+        logger.error(f"Error updating thresholds for site {site_id}: {e}")
+        return jsonify({"error": str(e)}), 500
+
+_background_started = False
+_background_lock = threading.Lock()
+
+def start_background_services():
+    """
+    Start the server process's background work (APEX poller, diurnal
+    profile backfill, MQTT ingest, site eviction, Gemini client warm-up).
+    Runs once per process: from `python app.py` below, and under gunicorn
+    from the post_worker_init hook in gunicorn.conf.py. Importing the app
+    (tests, tools) starts nothing.
+    """
+    global _background_started, mqtt_ingest
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+    
     # Start continuous APEX poller if URL is set
     if ORACLE_APEX_URL:
         poller_thread = threading.Thread(target=continuous_apex_poller, daemon=True)
@@ -1439,20 +1988,253 @@ if __name__ == '__main__':
     else:
         print('⚠️ ORACLE_APEX_URL not set - APEX polling disabled')
 
+    # Hour-of-day baselines of readings from before startup
+    threading.Thread(target=_backfill_diurnal_profiles, daemon=True, name='diurnal-backfill').start()
+
+    # Optional: readings straight from the MQTT broker (MQTT_INGEST_HOST)
+    mqtt_ingest = create_mqtt_ingest(_ingest_pushed_readings)
+
+    # Idle sites (sites.json) are evicted by one housekeeping thread
+    threading.Thread(target=_site_housekeeping, daemon=True, name='site-housekeeping').start()
+
+    # Configure the shared Gemini client now so the first AI request doesn't pay for it
+    threading.Thread(target=warm_up_gemini, daemon=True, name='gemini-warmup').start()
+
+if __name__ == '__main__':
+    start_background_services()
+
     # Start the IP broadcast service in a separate thread
     broadcast_thread = threading.Thread(target=ip_broadcast_service, daemon=True)
     broadcast_thread.start()
     print("IP broadcast service started")
 
-@app.route('/api/export-report', methods=['GET'])
-def export_greenhouse_report():
-    """Generate comprehensive greenhouse PDF report with AI analysis"""
+# Seconds between keep-alive comments on idle alert streams
+ALERT_STREAM_HEARTBEAT = float(os.getenv('ALERT_STREAM_HEARTBEAT', '15'))
+
+@app.route('/api/alerts/stream', methods=['GET'])
+def stream_alerts():
+    """
+    Push alert events to the client as they happen (Server-Sent Events).
+    Each 'alert' event carries one alert bus event (raised / changed /
+    cleared, from the primary greenhouse or a site) with its id as the SSE id. Reconnecting clients send
+    Last-Event-ID (or ?since=) and first receive the events they missed.
+    A comment line is sent every ALERT_STREAM_HEARTBEAT seconds. When
+    STREAM_MAX_SUBSCRIBERS streams are already open it answers 503 with
+    /api/alerts?since= as 'fallback' for polling.
+    """
+    since = request.headers.get('Last-Event-ID', request.args.get('since'))
     try:
-        # Get latest APEX data directly
-        readings, cache_status = get_cached_apex_or_fetch()
+        since = int(since) if since is not None else None
+    except ValueError:
+        since = None
+    
+    busy = _acquire_stream_slot(f"/api/alerts?since={since if since is not None else alert_bus.latest_event_id}")
+    if busy is not None:
+        return busy
+    
+    # Subscribe before reading the backlog so nothing falls in between
+    subscriber = alert_bus.subscribe()
+    backlog = alert_bus.events_since(since)[0] if since is not None else []
+    
+    def sse(event):
+        return f"id: {event['id']}\nevent: alert\ndata: {json.dumps(event, default=str)}\n\n"
+    
+    def generate():
+        last_id = since or 0
+        try:
+            yield "retry: 3000\n\n"
+            for event in backlog:
+                last_id = event['id']
+                yield sse(event)
+            while True:
+                try:
+                    event = subscriber.get(timeout=ALERT_STREAM_HEARTBEAT)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event['id'] <= last_id:
+                    continue  # Already sent from the backlog
+                last_id = event['id']
+                yield sse(event)
+        finally:
+            alert_bus.unsubscribe(subscriber)
+    
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    response.call_on_close(_stream_slots.release)
+    return response
+
+report_cache = ReportCache()
+report_jobs = ReportJobs(report_cache)
+chart_cache = ChartCache()
+# How long a plain /api/export-report request waits for a cold build before answering 202
+REPORT_SYNC_TIMEOUT = float(os.getenv('REPORT_SYNC_TIMEOUT', '60'))
+
+@app.route('/api/export-report', methods=['GET'])
+def export_greenhouse_report():
+    """
+    Comprehensive greenhouse PDF report with AI analysis.
+    
+    ?period=day|week|month builds a period report (per-day aggregates, time
+    in range, alert counts) from the local history store instead.
+    
+    Reports are cached per data version (latest reading or history rows,
+    plus thresholds version) and built in the background report pool. A cached report is returned immediately.
+    Otherwise the request waits for the build (joining one already running
+    for the same data), or with ?async=true returns 202 and a job id to poll
+    at /api/export-report/jobs/<job_id>.
+    """
+    thresholds = load_thresholds()
+    period = request.args.get('period')
+    if period:
+        # Period report (?period=day|week|month) from the local history store
+        if period not in PERIOD_DAYS:
+            return jsonify({'error': f"Invalid period '{period}'. Use one of: {', '.join(PERIOD_DAYS)}"}), 400
+        start, end = period_range(period)
+        key = report_key('period', period, *history_store.data_version(start, end), thresholds_version(thresholds))
+        build = lambda: _build_period_report_pdf(period, start, end, thresholds)
+    else:
+        readings, cache_status = get_cached_apex_or_fetch()
         if not readings:
             return jsonify({'error': 'No APEX data available'}), 503
         
+        # Snapshot so the background build isn't affected by the next poll
+        readings = [dict(r) for r in readings]
+        key = _report_cache_key(readings, thresholds)
+        build = lambda: _build_greenhouse_report_pdf(readings, thresholds)
+    
+    pdf_bytes = report_cache.get(key)
+    if pdf_bytes is not None:
+        return _send_report_pdf(pdf_bytes, cache_hit=True)
+    
+    job = report_jobs.submit(key, build)
+    if request.args.get('async', 'false').lower() == 'true':
+        return jsonify(_report_job_response(job)), 202
+    
+    pdf_bytes = report_jobs.wait(job['id'], REPORT_SYNC_TIMEOUT)
+    if pdf_bytes is not None:
+        return _send_report_pdf(pdf_bytes, cache_hit=False)
+    job = report_jobs.get(job['id'])
+    if job['status'] == 'failed':
+        return jsonify({'error': job['error']}), 500
+    # Still building - let the client poll for it
+    return jsonify(_report_job_response(job)), 202
+
+@app.route('/api/export-report/jobs/<job_id>', methods=['GET'])
+def get_report_job(job_id):
+    """Status of a background report build."""
+    job = report_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown report job'}), 404
+    return jsonify(_report_job_response(job))
+
+@app.route('/api/export-report/jobs/<job_id>/download', methods=['GET'])
+def download_report_job(job_id):
+    """PDF of a finished background report build."""
+    job = report_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown report job'}), 404
+    if job['status'] == 'failed':
+        return jsonify({'error': job['error']}), 500
+    if job['status'] != 'done':
+        return jsonify(_report_job_response(job)), 202
+    pdf_bytes = report_cache.get(job['key'])
+    if pdf_bytes is None:
+        return jsonify({'error': 'Report expired from cache, request a new export'}), 410
+    return _send_report_pdf(pdf_bytes, cache_hit=True)
+
+@app.route('/api/export', methods=['GET'])
+def export_history():
+    """
+    Stream stored readings as a file download.
+    
+    Query params:
+        format: csv (default), ndjson or parquet (parquet needs pyarrow)
+        from / to: Range as epoch seconds or ISO 8601 (default: all history up to now)
+        sensors: Comma-separated history columns (default: all)
+    
+    The body is generated batch by batch (chunked transfer encoding), so
+    memory use does not grow with the size of the range.
+    """
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Invalid format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    if fmt == 'parquet' and not parquet_available():
+        return jsonify({'error': 'Parquet export requires pyarrow, which is not installed on this server'}), 501
+    
+    try:
+        start = _parse_export_time(request.args.get('from'), 0.0)
+        end = _parse_export_time(request.args.get('to'), time.time() + 1)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    sensors = request.args.get('sensors')
+    columns = tuple(s.strip() for s in sensors.split(',') if s.strip()) if sensors else READING_COLUMNS
+    unknown = [c for c in columns if c not in READING_COLUMNS]
+    if unknown or not columns:
+        return jsonify({'error': f"Unknown sensor(s): {', '.join(unknown)}. Available: {', '.join(READING_COLUMNS)}"}), 400
+    
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    filename = f"greenhouse_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return Response(stream_with_context(export_chunks(history_store, fmt, start, end, columns)),
+                    mimetype=mimetype, headers={
+                        'Content-Disposition': f'attachment; filename="{filename}"',
+                        'X-Accel-Buffering': 'no'
+                    })
+
+def _parse_export_time(value, default):
+    """Epoch seconds or ISO 8601 (local time) -> epoch seconds."""
+    if value is None or value == '':
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid time '{value}': use epoch seconds or ISO 8601")
+
+def _report_cache_key(readings, thresholds):
+    """Report data version: latest reading (incl. merged soil moisture), history size, thresholds."""
+    latest = readings[0]
+    return report_key(latest.get('_ts_num'), latest.get('moisture'), min(24, len(readings)),
+                      thresholds_version(thresholds))
+
+def _report_job_response(job):
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'error': job['error'],
+        'status_url': f"/api/export-report/jobs/{job['id']}",
+        'download_url': f"/api/export-report/jobs/{job['id']}/download"
+    }
+
+def _send_report_pdf(pdf_bytes, cache_hit):
+    filename = f"EcoView_Report_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.pdf"
+    response = send_file(
+        io.BytesIO(pdf_bytes),
+        as_attachment=True,
+        download_name=filename,
+        mimetype='application/pdf'
+    )
+    response.headers['X-Report-Cache'] = 'hit' if cache_hit else 'miss'
+    return response
+
+def _build_greenhouse_report_pdf(readings, thresholds):
+    """
+    Build the full report PDF (runs in the report worker pool).
+    
+    Args:
+        readings (list): APEX readings, newest first
+        thresholds (dict): Thresholds used for statuses, recommendations and alerts
+    
+    Returns:
+        bytes: PDF document
+    """
+    try:
         latest = readings[0]
         sensor_data = {**latest, **build_derived_from_reading(latest)}
         
@@ -1472,7 +2254,7 @@ def export_greenhouse_report():
             },
             'air_quality': {
                 'value': sensor_data.get('mq135_drop', 0),
-                'status': "Good" if sensor_data.get('mq135_drop', 0) <= 200 else ("Poor" if sensor_data.get('mq135_drop', 0) > 500 else "Moderate"),
+                'status': _get_air_quality_status(sensor_data.get('mq135_drop', 0)),
                 'unit': 'ppm'
             },
             'light': {
@@ -1499,7 +2281,7 @@ def export_greenhouse_report():
         
         # Get AI recommendations
         try:
-            ai_recommendations = get_gemini_recommendations(sensor_data)
+            ai_recommendations = get_gemini_recommendations(sensor_data, thresholds)
         except Exception as e:
             logger.warning(f"AI recommendations failed: {e}")
             ai_recommendations = []
@@ -1517,97 +2299,27 @@ def export_greenhouse_report():
         
         # Container for PDF elements
         elements = []
-        styles = getSampleStyleSheet()
-        
-        # Define color palette (use soil-toned light surfaces)
-        primary_green = colors.HexColor('#2D5016')  # Dark green
-        accent_green = colors.HexColor('#4CAF50')   # Light green
-        accent_blue = colors.HexColor('#2196F3')    # Blue
-        text_dark = colors.HexColor('#333333')      # Dark gray
-        bg_soil = colors.HexColor('#F3EEE6')        # Soil light background
-        card_soil = colors.HexColor('#FAF4EC')      # Soil card surface
-        
-        # Custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=28,
-            textColor=primary_green,
-            spaceAfter=8,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        )
-        
-        subtitle_style = ParagraphStyle(
-            'CustomSubtitle',
-            parent=styles['Normal'],
-            fontSize=14,
-            textColor=text_dark,
-            spaceAfter=20,
-            alignment=TA_CENTER,
-            fontName='Helvetica'
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor=primary_green,
-            spaceAfter=12,
-            spaceBefore=20,
-            fontName='Helvetica-Bold',
-            borderColor=accent_green,
-            borderWidth=0,
-            borderPadding=8
-        )
-        
-        section_heading_style = ParagraphStyle(
-            'SectionHeading',
-            parent=styles['Heading3'],
-            fontSize=14,
-            textColor=primary_green,
-            spaceAfter=10,
-            spaceBefore=15,
-            fontName='Helvetica-Bold'
-        )
-
-        # Styles to avoid overlap for large font content
-        health_style = ParagraphStyle(
-            'HealthStyle',
-            parent=styles['Normal'],
-            alignment=TA_CENTER,
-            leading=56,        # accommodate 48pt number comfortably
-            spaceAfter=12,
-        )
-        alert_cell_style = ParagraphStyle(
-            'AlertCell',
-            parent=styles['Normal'],
-            alignment=TA_CENTER,
-            leading=26,        # accommodate 24pt numbers in cells
-        )
+        # Styles, palette, table styles and static sections are built once
+        # per process (_report_assets); only data-dependent flowables are
+        # created here. Static flowables are shallow-copied per document.
+        assets = _report_assets
+        styles = assets['styles']
+        primary_green = assets['primary_green']
+        accent_green = assets['accent_green']
+        accent_blue = assets['accent_blue']
+        text_dark = assets['text_dark']
+        title_style = assets['title_style']
+        subtitle_style = assets['subtitle_style']
+        heading_style = assets['heading_style']
+        section_heading_style = assets['section_heading_style']
+        health_style = assets['health_style']
+        alert_cell_style = assets['alert_cell_style']
         
         # Header with logo and branding
-        icon_path = os.path.join(os.path.dirname(__file__), 'app_icon.png')
-        if os.path.exists(icon_path):
-            try:
-                logo = Image(icon_path, width=50, height=50)
-                # Create header with logo and title side by side
-                logo_title_data = [[
-                    logo,
-                    Paragraph("<b>EcoView</b><br/><font size='8'>Smart Greenhouse Monitoring</font>", 
-                             ParagraphStyle('LogoText', parent=styles['Normal'], fontSize=14, 
-                                          textColor=primary_green, leftIndent=10))
-                ]]
-                logo_table = Table(logo_title_data, colWidths=[60, 200])
-                logo_table.setStyle(TableStyle([
-                    ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-                    ('ALIGN', (1, 0), (1, 0), 'LEFT'),
-                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ]))
-                elements.append(logo_table)
-                elements.append(Spacer(1, 15))
-            except Exception as e:
-                logger.warning(f"Could not load app icon: {e}")
+        logo_table = _report_logo_header()
+        if logo_table is not None:
+            elements.append(logo_table)
+            elements.append(Spacer(1, 15))
         
         # Title
         elements.append(Paragraph("Greenhouse Environmental Report", title_style))
@@ -1621,21 +2333,13 @@ def export_greenhouse_report():
             Paragraph(f"<b>Data Source:</b><br/>Oracle APEX", styles['Normal'])
         ]]
         metadata_table = Table(metadata_data, colWidths=[2.1*inch, 2.1*inch, 2.1*inch])
-        metadata_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), card_soil),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('TOPPADDING', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-            ('BOX', (0, 0), (-1, -1), 1, colors.grey),
-            ('LINEBELOW', (0, 0), (-1, -1), 1, colors.white)
-        ]))
+        metadata_table.setStyle(assets['metadata_table_style'])
         elements.append(metadata_table)
         elements.append(Spacer(1, 30))
         
         # Health Score Card
         health_score = _calculate_health_score(all_analysis)
-        health_status = "EXCELLENT" if health_score >= 80 else ("GOOD" if health_score >= 60 else "NEEDS ATTENTION")
+        health_status = health_label(health_score)
         health_color = accent_green if health_score >= 80 else (colors.orange if health_score >= 60 else colors.red)
         
         elements.append(Paragraph("Overall Greenhouse Health", heading_style))
@@ -1687,18 +2391,7 @@ def export_greenhouse_report():
             ])
         
         sensor_table = Table(sensor_table_data, colWidths=[1.9*inch, 1.3*inch, 1.3*inch, 1.1*inch])
-        sensor_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), primary_green),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 11),
-            ('TOPPADDING', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [card_soil, bg_soil])
-        ]))
+        sensor_table.setStyle(assets['sensor_table_style'])
         elements.append(sensor_table)
         elements.append(Spacer(1, 30))
         
@@ -1732,7 +2425,7 @@ def export_greenhouse_report():
         # Alert Summary Section (portrait-optimized)
         elements.append(Paragraph("Alert Summary", heading_style))
         elements.append(Spacer(1, 10))
-        alert_summary = _generate_alert_summary(sensor_data)
+        alert_summary = _generate_alert_summary(sensor_data, thresholds)
         critical_count = alert_summary.get('critical_count', 0)
         warning_count = alert_summary.get('warning_count', 0)
         
@@ -1743,15 +2436,7 @@ def export_greenhouse_report():
         ]]
         
         alert_table = Table(alert_data, colWidths=[2.1*inch, 2.1*inch, 2.1*inch])
-        alert_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), card_soil),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('TOPPADDING', (0, 0), (-1, -1), 15),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
-            ('BOX', (0, 0), (-1, -1), 1, colors.grey),
-            ('GRID', (0, 0), (-1, -1), 1, colors.white)
-        ]))
+        alert_table.setStyle(assets['alert_table_style'])
         elements.append(alert_table)
         elements.append(Spacer(1, 15))
         
@@ -1856,7 +2541,7 @@ def export_greenhouse_report():
             • Adjust gradually for different crop stages or seasons
             """
         
-        elements.append(Paragraph(temp_advice, styles['Normal']))
+        elements.append(_static_paragraph(temp_advice))
         elements.append(Spacer(1, 20))
         
         # Humidity improvements
@@ -1926,7 +2611,7 @@ def export_greenhouse_report():
             • Keep records of humidity patterns for seasonal planning
             """
         
-        elements.append(Paragraph(humidity_advice, styles['Normal']))
+        elements.append(_static_paragraph(humidity_advice))
         elements.append(Spacer(1, 20))
         
         # Soil Moisture improvements
@@ -2018,7 +2703,7 @@ def export_greenhouse_report():
             • Regular soil testing to ensure proper nutrient availability
             """
         
-        elements.append(Paragraph(soil_advice, styles['Normal']))
+        elements.append(_static_paragraph(soil_advice))
         elements.append(Spacer(1, 20))
         
         # Air Quality and Gas Sensors
@@ -2112,150 +2797,11 @@ def export_greenhouse_report():
             • Consider installing CO alarms if not present
             """
         
-        elements.append(Paragraph(air_advice, styles['Normal']))
+        elements.append(_static_paragraph(air_advice))
         elements.append(Spacer(1, 30))
         
-        # ===== NEW: TROUBLESHOOTING GUIDE =====
-        elements.append(PageBreak())
-        elements.append(Paragraph("Troubleshooting Guide", heading_style))
-        elements.append(Paragraph(
-            "Common issues and their solutions for optimal greenhouse management:",
-            subtitle_style
-        ))
-        elements.append(Spacer(1, 15))
-        
-        troubleshooting_sections = [
-            {
-                "title": "🌡️ Temperature Won't Stabilize",
-                "symptoms": "Frequent temperature swings, difficulty maintaining target range",
-                "causes": [
-                    "<b>Poor insulation:</b> Heat loss through walls, roof, or foundation",
-                    "<b>Inadequate thermal mass:</b> Lack of heat storage capacity",
-                    "<b>Undersized/oversized equipment:</b> HVAC not matched to greenhouse size",
-                    "<b>Air leaks:</b> Drafts from doors, vents, or structural gaps"
-                ],
-                "solutions": [
-                    "Add insulation: bubble wrap on walls, thermal curtains, weather stripping",
-                    "Install thermal mass: 55-gallon water drums painted black, gravel beds, concrete blocks",
-                    "Upgrade to appropriately sized heating/cooling systems",
-                    "Seal all air leaks with caulk or weatherstripping",
-                    "Use automated controllers with temperature sensors for consistent management"
-                ],
-                "prevention": "Regular maintenance of HVAC systems, annual insulation inspections, proper greenhouse design with adequate thermal mass"
-            },
-            {
-                "title": "💧 Humidity Too High (Persistent)",
-                "symptoms": "Constant condensation, mold/mildew growth, fungal diseases",
-                "causes": [
-                    "<b>Poor air circulation:</b> Stagnant air pockets allowing moisture buildup",
-                    "<b>Overwatering:</b> Excess soil moisture evaporating into air",
-                    "<b>Inadequate ventilation:</b> Insufficient fresh air exchange",
-                    "<b>Night condensation:</b> Temperature drops causing moisture release"
-                ],
-                "solutions": [
-                    "Install horizontal airflow (HAF) fans for continuous circulation",
-                    "Reduce watering frequency; use drip irrigation instead of overhead",
-                    "Increase ventilation during high-humidity periods (early morning, evening)",
-                    "Use thermal screens to prevent night condensation",
-                    "Install dehumidifier for extreme cases",
-                    "Space plants further apart; prune dense foliage"
-                ],
-                "prevention": "Proper greenhouse design with ridge vents, side vents, and fans; regular monitoring; avoiding evening watering"
-            },
-            {
-                "title": "💨 CO2 Levels Low or Unstable",
-                "symptoms": "Slow plant growth, CO2 readings below 400 ppm, enrichment not effective",
-                "causes": [
-                    "<b>Excessive ventilation:</b> Fresh air exchange removing enriched CO2",
-                    "<b>Leaks in system:</b> CO2 escaping before reaching plants",
-                    "<b>Poor distribution:</b> Uneven CO2 levels across greenhouse",
-                    "<b>Timing issues:</b> CO2 released when stomata are closed"
-                ],
-                "solutions": [
-                    "Balance ventilation: enrich CO2 during low-ventilation periods (early morning)",
-                    "Check CO2 distribution system for leaks and proper placement",
-                    "Use circulation fans to distribute CO2 evenly",
-                    "Release CO2 during photosynthesis hours (sunrise to 2-3 hours before sunset)",
-                    "Install CO2 sensors to monitor and control enrichment automatically",
-                    "Consider burner or generator systems for larger operations"
-                ],
-                "prevention": "Regular system inspections, calibrate sensors annually, maintain 1000-1500 ppm during active growth"
-            },
-            {
-                "title": "🌬️ Poor Air Quality Persists",
-                "symptoms": "High gas readings (MQ135/MQ2/MQ7), odors, plant stress despite ventilation",
-                "causes": [
-                    "<b>Combustion equipment issues:</b> Incomplete burning producing CO",
-                    "<b>Gas leaks:</b> Propane or natural gas escaping from lines",
-                    "<b>Decomposing organic matter:</b> Compost or wet soil producing ammonia/methane",
-                    "<b>Chemical contamination:</b> Pesticides, paints, or cleaners releasing VOCs"
-                ],
-                "solutions": [
-                    "Inspect and service all combustion equipment (heaters, generators)",
-                    "Perform leak test on gas lines with soapy water or detector",
-                    "Move compost piles away from greenhouse; ensure proper aeration",
-                    "Remove or properly store chemicals; ventilate after application",
-                    "Install air filtration system with activated carbon filters",
-                    "Switch to electric heating if gas issues persist"
-                ],
-                "prevention": "Annual equipment servicing, proper chemical storage, adequate ventilation, regular gas sensor calibration"
-            },
-            {
-                "title": "☀️ Light Levels Inadequate",
-                "symptoms": "Leggy plants, slow growth, poor flowering/fruiting, low lux readings",
-                "causes": [
-                    "<b>Dirty glazing:</b> Algae, dust, or mineral deposits blocking light",
-                    "<b>Shading:</b> Nearby structures, trees, or shade cloth during low-light seasons",
-                    "<b>Short day length:</b> Insufficient natural light in winter",
-                    "<b>Glazing degradation:</b> Old plastic or glass with reduced transmittance"
-                ],
-                "solutions": [
-                    "Clean greenhouse glazing regularly (monthly minimum)",
-                    "Remove or trim nearby vegetation blocking light",
-                    "Remove shade cloth during low-light months (fall/winter)",
-                    "Install supplemental LED grow lights (full-spectrum, 12-16 hours/day)",
-                    "Replace old glazing with high-transmittance materials",
-                    "Use reflective mulches or white paint to increase light reflection"
-                ],
-                "prevention": "Regular cleaning schedule, proper greenhouse orientation (east-west for year-round), quality glazing materials"
-            },
-            {
-                "title": "🌱 Soil Moisture Inconsistent",
-                "symptoms": "Some areas too wet, others too dry; uneven plant growth",
-                "causes": [
-                    "<b>Uneven watering:</b> Manual watering missing spots or over-saturating areas",
-                    "<b>Soil variation:</b> Different soil types retaining water differently",
-                    "<b>Drainage issues:</b> Poor drainage creating waterlogged zones",
-                    "<b>Irrigation system problems:</b> Clogged emitters or broken lines"
-                ],
-                "solutions": [
-                    "Install drip irrigation with pressure-compensating emitters",
-                    "Use soil moisture sensors in multiple zones",
-                    "Amend soil with compost or perlite to improve consistency",
-                    "Ensure proper drainage with gravel beds or slope",
-                    "Flush and inspect irrigation lines regularly",
-                    "Group plants by water needs"
-                ],
-                "prevention": "Uniform soil preparation, automated irrigation with sensors, regular system maintenance"
-            }
-        ]
-        
-        for section in troubleshooting_sections:
-            elements.append(Paragraph(section["title"], section_heading_style))
-            elements.append(Spacer(1, 5))
-            elements.append(Paragraph(f"<b>Symptoms:</b> {section['symptoms']}", styles['Normal']))
-            elements.append(Spacer(1, 5))
-        
-            causes_text = "<b>Possible Causes:</b><br/>" + "<br/>".join([f"• {cause}" for cause in section['causes']])
-            elements.append(Paragraph(causes_text, styles['Normal']))
-            elements.append(Spacer(1, 5))
-        
-            solutions_text = "<b>Solutions:</b><br/>" + "<br/>".join([f"• {sol}" for sol in section['solutions']])
-            elements.append(Paragraph(solutions_text, styles['Normal']))
-            elements.append(Spacer(1, 5))
-        
-            elements.append(Paragraph(f"<b>Prevention:</b> {section['prevention']}", styles['Normal']))
-            elements.append(Spacer(1, 20))
+        # ===== NEW: TROUBLESHOOTING GUIDE ===== (static, built once)
+        elements.extend(copy.copy(flowable) for flowable in assets['troubleshooting'])
         
         # Historical Data Summary - New Page (portrait-optimized)
         elements.append(PageBreak())
@@ -2285,21 +2831,27 @@ def export_greenhouse_report():
             ])
         
         history_table = Table(history_table_data, colWidths=[1*inch, 0.75*inch, 0.75*inch, 0.65*inch, 0.85*inch, 0.85*inch])
-        history_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), accent_blue),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 9),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [card_soil, bg_soil])
-        ]))
+        history_table.setStyle(assets['history_table_style'])
         elements.append(history_table)
         
+        # Trend charts over every reading in the APEX window (soil moisture is
+        # only merged into the latest reading, so it has no series here)
+        elements.append(PageBreak())
+        elements.append(Paragraph("Sensor Trends", heading_style))
+        elements.append(Spacer(1, 10))
+        derived_readings = []
+        
+        def load_series(column):
+            if not derived_readings:
+                derived_readings.extend({**r, **build_derived_from_reading(r)} for r in readings)
+            return downsample((d.get('timestamp'), d.get(column)) for d in derived_readings)
+        
+        chart_version = (latest.get('_ts_num'), len(readings), thresholds_version(thresholds))
+        elements.extend(_trend_chart_flowables(
+            ('temperature', 'humidity', 'mq135_drop', 'mq2_drop', 'mq7_drop'),
+            'latest', chart_version, thresholds, load_series, '%m/%d %H:%M'
+        ))
+        
         # Additional Sensor Details (portrait-optimized)
         elements.append(Spacer(1, 30))
         elements.append(Paragraph("Gas Sensor Readings", heading_style))
@@ -2327,26 +2879,13 @@ def export_greenhouse_report():
         ]
         
         gas_table = Table(gas_data, colWidths=[1.85*inch, 1.35*inch, 1.3*inch, 1.2*inch])
-        gas_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), primary_green),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [card_soil, bg_soil])
-        ]))
+        gas_table.setStyle(assets['gas_table_style'])
         elements.append(gas_table)
         
         # Footer with branding
         elements.append(Spacer(1, 40))
         footer_line = Table([['']], colWidths=[6*inch])
-        footer_line.setStyle(TableStyle([
-            ('LINEABOVE', (0, 0), (-1, 0), 2, accent_green),
-        ]))
+        footer_line.setStyle(assets['footer_line_style'])
         elements.append(footer_line)
         elements.append(Spacer(1, 10))
         
@@ -2363,22 +2902,574 @@ def export_greenhouse_report():
         
         # Build PDF
         doc.build(elements)
-        buffer.seek(0)
+        return buffer.getvalue()
         
-        # Generate filename
-        filename = f"EcoView_Report_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.pdf"
-        
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/pdf'
+    except Exception as e:
+        logger.error(f"Error generating PDF report: {e}")
+        traceback.print_exc()
+        raise
+
+# Sensors shown in period reports: history column -> (label, unit)
+PERIOD_REPORT_SENSORS = {
+    'temperature': ('🌡️ Temperature', '°C'),
+    'humidity': ('💧 Humidity', '%'),
+    'soil_moisture': ('🌱 Soil Moisture', '%'),
+    'mq135_drop': ('🌬️ Air Quality (MQ135)', 'ppm'),
+    'mq2_drop': ('🔥 Flammable Gas (MQ2)', 'ppm'),
+    'mq7_drop': ('☠️ Carbon Monoxide (MQ7)', 'ppm'),
+}
+
+def _trend_chart_flowables(columns, period, version, thresholds, load_series, time_format):
+    """
+    Heading + cached trend chart per sensor.
+    
+    Args:
+        columns (tuple): History columns to chart (keys of PERIOD_REPORT_SENSORS)
+        period (str): Report period ('latest' for the APEX window report)
+        version (tuple): Data version of the series (incl. thresholds version)
+        thresholds (dict): Thresholds for the shaded optimal band
+        load_series (callable): column -> downsampled (ts, value) points; only
+            called when the chart is not cached yet
+        time_format (str): strftime format for the time axis
+    
+    Returns:
+        list: Flowables
+    """
+    bands = _time_in_range_bands(thresholds)
+    flowables = []
+    for column in columns:
+        label, unit = PERIOD_REPORT_SENSORS[column]
+        chart = chart_cache.get_or_build(
+            (column, period, version),
+            lambda: trend_chart(load_series(column), unit, band=bands[column][:2], time_format=time_format)
         )
+        flowables.append(Paragraph(label, _report_assets['section_heading_style']))
+        flowables.append(chart)
+        flowables.append(Spacer(1, 12))
+    return flowables
+
+def _time_in_range_bands(thresholds):
+    """(optimal_min, optimal_max, acceptable_min, acceptable_max) per history column."""
+    def band(section, opt_default, acc_default):
+        cfg = thresholds.get(section, {})
+        opt, acc = cfg.get('optimal', {}), cfg.get('acceptable', {})
+        return (opt.get('min', opt_default[0]), opt.get('max', opt_default[1]),
+                acc.get('min', acc_default[0]), acc.get('max', acc_default[1]))
+    
+    def gas(section, low_key, high_key, low_default, high_default):
+        cfg = thresholds.get(section, {})
+        return (0, cfg.get(low_key, low_default), 0, cfg.get(high_key, high_default))
+    
+    return {
+        'temperature': band('temperature', (20, 27), (18, 30)),
+        'humidity': band('humidity', (45, 70), (40, 80)),
+        'soil_moisture': band('soil_moisture', (40, 60), (30, 70)),
+        'mq135_drop': gas('mq135', 'good', 'poor', 200, 500),
+        'mq2_drop': gas('mq2', 'safe', 'high', 300, 750),
+        'mq7_drop': gas('mq7', 'safe', 'high', 300, 750),
+    }
+
+def _build_period_report_pdf(period, start, end, thresholds):
+    """
+    Build a day / week / month report from the history store (runs in the
+    report worker pool). All aggregation happens in SQLite.
+    
+    Args:
+        period (str): 'day', 'week' or 'month'
+        start (float): Period start (epoch seconds)
+        end (float): Period end (epoch seconds)
+        thresholds (dict): Thresholds used for the time-in-range bands
+    
+    Returns:
+        bytes: PDF document
+    """
+    try:
+        assets = _report_assets
+        styles = assets['styles']
+        heading_style = assets['heading_style']
+        bucket = 'hour' if period == 'day' else 'day'
+        
+        buckets = history_store.aggregate(start, end, bucket=bucket)
+        in_range = history_store.time_in_range(start, end, _time_in_range_bands(thresholds))
+        alert_counts = history_store.alert_counts(start, end)
+        total_readings = sum(b['count'] for b in buckets)
+        
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=50, leftMargin=50, topMargin=50, bottomMargin=50)
+        elements = []
+        
+        logo_table = _report_logo_header()
+        if logo_table is not None:
+            elements.append(logo_table)
+            elements.append(Spacer(1, 15))
+        
+        title = {'day': 'Daily', 'week': 'Weekly', 'month': 'Monthly'}[period]
+        date_range = f"{datetime.fromtimestamp(start).strftime('%b %d, %Y %H:%M')} – {datetime.fromtimestamp(end).strftime('%b %d, %Y %H:%M')}"
+        elements.append(Paragraph(f"Greenhouse {title} Report", assets['title_style']))
+        elements.append(Paragraph(date_range, assets['subtitle_style']))
+        
+        metadata_table = Table([[
+            Paragraph(f"<b>Report Date:</b><br/>{datetime.now().strftime('%B %d, %Y at %I:%M %p')}", styles['Normal']),
+            Paragraph(f"<b>Readings:</b><br/>{total_readings}", styles['Normal']),
+            Paragraph("<b>Data Source:</b><br/>Local history (Oracle APEX)", styles['Normal'])
+        ]], colWidths=[2.1*inch, 2.1*inch, 2.1*inch])
+        metadata_table.setStyle(assets['metadata_table_style'])
+        elements.append(metadata_table)
+        elements.append(Spacer(1, 30))
+        
+        if not total_readings:
+            elements.append(Paragraph(
+                "No readings have been stored for this period yet. History is recorded while the server is polling APEX.",
+                styles['Normal']
+            ))
+            doc.build(elements)
+            return buffer.getvalue()
+        
+        # Time in range per sensor
+        elements.append(Paragraph("Time in Range", heading_style))
+        elements.append(Spacer(1, 10))
+        range_rows = [['Sensor', 'Optimal', 'Acceptable', 'Outside', 'Samples']]
+        for column, (label, _) in PERIOD_REPORT_SENSORS.items():
+            stats = in_range.get(column, {})
+            if not stats.get('samples'):
+                range_rows.append([label, '–', '–', '–', '0'])
+                continue
+            range_rows.append([
+                label,
+                f"{stats['optimal_pct']:.1f}%",
+                f"{stats['acceptable_pct']:.1f}%",
+                Paragraph(f"<font color='{'red' if stats['outside_pct'] > 10 else 'black'}'>{stats['outside_pct']:.1f}%</font>", styles['Normal']),
+                str(stats['samples'])
+            ])
+        range_table = Table(range_rows, colWidths=[2.0*inch, 1.0*inch, 1.1*inch, 1.0*inch, 0.9*inch])
+        range_table.setStyle(assets['sensor_table_style'])
+        elements.append(range_table)
+        elements.append(Spacer(1, 30))
+        
+        # Alert counts
+        elements.append(Paragraph("Alerts Raised", heading_style))
+        elements.append(Spacer(1, 10))
+        by_severity = alert_counts['by_severity']
+        alert_table = Table([[
+            Paragraph(f"<b>Critical</b><br/><font size='24' color='red'>{by_severity.get('critical', 0)}</font>", assets['alert_cell_style']),
+            Paragraph(f"<b>High</b><br/><font size='24' color='orange'>{by_severity.get('high', 0)}</font>", assets['alert_cell_style']),
+            Paragraph(f"<b>Medium / Low</b><br/><font size='24' color='{assets['primary_green'].hexval()}'>{by_severity.get('medium', 0) + by_severity.get('low', 0)}</font>", assets['alert_cell_style'])
+        ]], colWidths=[2.1*inch, 2.1*inch, 2.1*inch])
+        alert_table.setStyle(assets['alert_table_style'])
+        elements.append(alert_table)
+        if alert_counts['by_sensor']:
+            elements.append(Spacer(1, 10))
+            by_sensor = ", ".join(f"{sensor.replace('_', ' ').title()}: {n}" for sensor, n in
+                                  sorted(alert_counts['by_sensor'].items(), key=lambda item: -item[1]))
+            elements.append(Paragraph(f"<b>By sensor:</b> {by_sensor}", styles['Normal']))
+        elements.append(Spacer(1, 30))
+        
+        # Per-bucket aggregates
+        elements.append(PageBreak())
+        elements.append(Paragraph("Hourly Summary" if bucket == 'hour' else "Daily Summary", heading_style))
+        elements.append(Spacer(1, 10))
+        
+        def fmt(stats, digits=1):
+            return '–' if stats['avg'] is None else f"{stats['avg']:.{digits}f}"
+        
+        summary_rows = [['Time' if bucket == 'hour' else 'Date', 'Temp avg\n(°C)', 'Temp range\n(°C)',
+                         'Humidity\n(%)', 'Soil\n(%)', 'CO2\n(ppm)', 'Readings']]
+        for b in buckets:
+            temp = b['temperature']
+            temp_range = '–' if temp['min'] is None else f"{temp['min']:.1f}–{temp['max']:.1f}"
+            summary_rows.append([
+                b['bucket'][5:] if bucket == 'hour' else b['bucket'],
+                fmt(temp), temp_range, fmt(b['humidity']), fmt(b['soil_moisture'], 0),
+                fmt(b['co2_level'], 0), str(b['count'])
+            ])
+        summary_table = Table(summary_rows, repeatRows=1,
+                              colWidths=[1.1*inch, 0.8*inch, 1.0*inch, 0.8*inch, 0.7*inch, 0.8*inch, 0.8*inch])
+        summary_table.setStyle(assets['history_table_style'])
+        elements.append(summary_table)
+        
+        # Trend charts from the downsampled history
+        elements.append(PageBreak())
+        elements.append(Paragraph("Sensor Trends", heading_style))
+        elements.append(Spacer(1, 10))
+        chart_version = history_store.data_version(start, end) + (thresholds_version(thresholds),)
+        elements.extend(_trend_chart_flowables(
+            tuple(PERIOD_REPORT_SENSORS), period, chart_version, thresholds,
+            lambda column: history_store.series(start, end, column),
+            '%H:%M' if period == 'day' else '%m/%d'
+        ))
+        
+        doc.build(elements)
+        return buffer.getvalue()
         
     except Exception as e:
-        logger.error(f"Error generating PDF report: {e}")
+        logger.error(f"Error generating {period} report: {e}")
         traceback.print_exc()
-        return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
+        raise
+
+# ============================================================================
+# REPORT ASSETS - invariant parts of the PDF report, built once per process
+# ============================================================================
+
+REPORT_TROUBLESHOOTING_SECTIONS = [
+    {
+        "title": "🌡️ Temperature Won't Stabilize",
+        "symptoms": "Frequent temperature swings, difficulty maintaining target range",
+        "causes": [
+            "<b>Poor insulation:</b> Heat loss through walls, roof, or foundation",
+            "<b>Inadequate thermal mass:</b> Lack of heat storage capacity",
+            "<b>Undersized/oversized equipment:</b> HVAC not matched to greenhouse size",
+            "<b>Air leaks:</b> Drafts from doors, vents, or structural gaps"
+        ],
+        "solutions": [
+            "Add insulation: bubble wrap on walls, thermal curtains, weather stripping",
+            "Install thermal mass: 55-gallon water drums painted black, gravel beds, concrete blocks",
+            "Upgrade to appropriately sized heating/cooling systems",
+            "Seal all air leaks with caulk or weatherstripping",
+            "Use automated controllers with temperature sensors for consistent management"
+        ],
+        "prevention": "Regular maintenance of HVAC systems, annual insulation inspections, proper greenhouse design with adequate thermal mass"
+    },
+    {
+        "title": "💧 Humidity Too High (Persistent)",
+        "symptoms": "Constant condensation, mold/mildew growth, fungal diseases",
+        "causes": [
+            "<b>Poor air circulation:</b> Stagnant air pockets allowing moisture buildup",
+            "<b>Overwatering:</b> Excess soil moisture evaporating into air",
+            "<b>Inadequate ventilation:</b> Insufficient fresh air exchange",
+            "<b>Night condensation:</b> Temperature drops causing moisture release"
+        ],
+        "solutions": [
+            "Install horizontal airflow (HAF) fans for continuous circulation",
+            "Reduce watering frequency; use drip irrigation instead of overhead",
+            "Increase ventilation during high-humidity periods (early morning, evening)",
+            "Use thermal screens to prevent night condensation",
+            "Install dehumidifier for extreme cases",
+            "Space plants further apart; prune dense foliage"
+        ],
+        "prevention": "Proper greenhouse design with ridge vents, side vents, and fans; regular monitoring; avoiding evening watering"
+    },
+    {
+        "title": "💨 CO2 Levels Low or Unstable",
+        "symptoms": "Slow plant growth, CO2 readings below 400 ppm, enrichment not effective",
+        "causes": [
+            "<b>Excessive ventilation:</b> Fresh air exchange removing enriched CO2",
+            "<b>Leaks in system:</b> CO2 escaping before reaching plants",
+            "<b>Poor distribution:</b> Uneven CO2 levels across greenhouse",
+            "<b>Timing issues:</b> CO2 released when stomata are closed"
+        ],
+        "solutions": [
+            "Balance ventilation: enrich CO2 during low-ventilation periods (early morning)",
+            "Check CO2 distribution system for leaks and proper placement",
+            "Use circulation fans to distribute CO2 evenly",
+            "Release CO2 during photosynthesis hours (sunrise to 2-3 hours before sunset)",
+            "Install CO2 sensors to monitor and control enrichment automatically",
+            "Consider burner or generator systems for larger operations"
+        ],
+        "prevention": "Regular system inspections, calibrate sensors annually, maintain 1000-1500 ppm during active growth"
+    },
+    {
+        "title": "🌬️ Poor Air Quality Persists",
+        "symptoms": "High gas readings (MQ135/MQ2/MQ7), odors, plant stress despite ventilation",
+        "causes": [
+            "<b>Combustion equipment issues:</b> Incomplete burning producing CO",
+            "<b>Gas leaks:</b> Propane or natural gas escaping from lines",
+            "<b>Decomposing organic matter:</b> Compost or wet soil producing ammonia/methane",
+            "<b>Chemical contamination:</b> Pesticides, paints, or cleaners releasing VOCs"
+        ],
+        "solutions": [
+            "Inspect and service all combustion equipment (heaters, generators)",
+            "Perform leak test on gas lines with soapy water or detector",
+            "Move compost piles away from greenhouse; ensure proper aeration",
+            "Remove or properly store chemicals; ventilate after application",
+            "Install air filtration system with activated carbon filters",
+            "Switch to electric heating if gas issues persist"
+        ],
+        "prevention": "Annual equipment servicing, proper chemical storage, adequate ventilation, regular gas sensor calibration"
+    },
+    {
+        "title": "☀️ Light Levels Inadequate",
+        "symptoms": "Leggy plants, slow growth, poor flowering/fruiting, low lux readings",
+        "causes": [
+            "<b>Dirty glazing:</b> Algae, dust, or mineral deposits blocking light",
+            "<b>Shading:</b> Nearby structures, trees, or shade cloth during low-light seasons",
+            "<b>Short day length:</b> Insufficient natural light in winter",
+            "<b>Glazing degradation:</b> Old plastic or glass with reduced transmittance"
+        ],
+        "solutions": [
+            "Clean greenhouse glazing regularly (monthly minimum)",
+            "Remove or trim nearby vegetation blocking light",
+            "Remove shade cloth during low-light months (fall/winter)",
+            "Install supplemental LED grow lights (full-spectrum, 12-16 hours/day)",
+            "Replace old glazing with high-transmittance materials",
+            "Use reflective mulches or white paint to increase light reflection"
+        ],
+        "prevention": "Regular cleaning schedule, proper greenhouse orientation (east-west for year-round), quality glazing materials"
+    },
+    {
+        "title": "🌱 Soil Moisture Inconsistent",
+        "symptoms": "Some areas too wet, others too dry; uneven plant growth",
+        "causes": [
+            "<b>Uneven watering:</b> Manual watering missing spots or over-saturating areas",
+            "<b>Soil variation:</b> Different soil types retaining water differently",
+            "<b>Drainage issues:</b> Poor drainage creating waterlogged zones",
+            "<b>Irrigation system problems:</b> Clogged emitters or broken lines"
+        ],
+        "solutions": [
+            "Install drip irrigation with pressure-compensating emitters",
+            "Use soil moisture sensors in multiple zones",
+            "Amend soil with compost or perlite to improve consistency",
+            "Ensure proper drainage with gravel beds or slope",
+            "Flush and inspect irrigation lines regularly",
+            "Group plants by water needs"
+        ],
+        "prevention": "Uniform soil preparation, automated irrigation with sensors, regular system maintenance"
+    }
+]
+
+def _downscaled_logo(icon_path, max_px=150):
+    """
+    The app icon resized for its 50pt slot in the report header (PNG bytes).
+    Embedding the full-size icon dominated PDF build time and file size.
+    Falls back to the original file if Pillow can't process it.
+    """
+    try:
+        from PIL import Image as PILImage
+        with PILImage.open(icon_path) as img:
+            img.thumbnail((max_px, max_px))
+            out = io.BytesIO()
+            img.save(out, format='PNG', optimize=True)
+        out.seek(0)
+        return out
+    except Exception as e:
+        logger.warning(f"Could not downscale app icon: {e}")
+        return icon_path
+
+def _build_report_assets():
+    """
+    Build the report parts that don't depend on the data: stylesheet and
+    custom paragraph styles, palette, table styles, logo header and the
+    troubleshooting guide pages.
+    
+    Returns:
+        dict: Named styles / colors / flowables used by _build_greenhouse_report_pdf
+    """
+    styles = getSampleStyleSheet()
+
+    # Define color palette (use soil-toned light surfaces)
+    primary_green = colors.HexColor('#2D5016')  # Dark green
+    accent_green = colors.HexColor('#4CAF50')   # Light green
+    accent_blue = colors.HexColor('#2196F3')    # Blue
+    text_dark = colors.HexColor('#333333')      # Dark gray
+    bg_soil = colors.HexColor('#F3EEE6')        # Soil light background
+    card_soil = colors.HexColor('#FAF4EC')      # Soil card surface
+
+    # Custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=28,
+        textColor=primary_green,
+        spaceAfter=8,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    )
+
+    subtitle_style = ParagraphStyle(
+        'CustomSubtitle',
+        parent=styles['Normal'],
+        fontSize=14,
+        textColor=text_dark,
+        spaceAfter=20,
+        alignment=TA_CENTER,
+        fontName='Helvetica'
+    )
+
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=16,
+        textColor=primary_green,
+        spaceAfter=12,
+        spaceBefore=20,
+        fontName='Helvetica-Bold',
+        borderColor=accent_green,
+        borderWidth=0,
+        borderPadding=8
+    )
+
+    section_heading_style = ParagraphStyle(
+        'SectionHeading',
+        parent=styles['Heading3'],
+        fontSize=14,
+        textColor=primary_green,
+        spaceAfter=10,
+        spaceBefore=15,
+        fontName='Helvetica-Bold'
+    )
+
+    # Styles to avoid overlap for large font content
+    health_style = ParagraphStyle(
+        'HealthStyle',
+        parent=styles['Normal'],
+        alignment=TA_CENTER,
+        leading=56,        # accommodate 48pt number comfortably
+        spaceAfter=12,
+    )
+    alert_cell_style = ParagraphStyle(
+        'AlertCell',
+        parent=styles['Normal'],
+        alignment=TA_CENTER,
+        leading=26,        # accommodate 24pt numbers in cells
+    )
+
+    # Header with logo and branding (the image file is read once; the
+    # header table itself is assembled per report, see _report_logo_header)
+    logo_cells = None
+    icon_path = os.path.join(os.path.dirname(__file__), 'app_icon.png')
+    if os.path.exists(icon_path):
+        try:
+            logo = Image(_downscaled_logo(icon_path), width=50, height=50)
+            logo.wrap(50, 50)  # Loads the image data now
+            logo_cells = [
+                logo,
+                Paragraph("<b>EcoView</b><br/><font size='8'>Smart Greenhouse Monitoring</font>", 
+                         ParagraphStyle('LogoText', parent=styles['Normal'], fontSize=14, 
+                                      textColor=primary_green, leftIndent=10))
+            ]
+        except Exception as e:
+            logger.warning(f"Could not load app icon: {e}")
+
+    troubleshooting = []
+    troubleshooting.append(PageBreak())
+    troubleshooting.append(Paragraph("Troubleshooting Guide", heading_style))
+    troubleshooting.append(Paragraph(
+        "Common issues and their solutions for optimal greenhouse management:",
+        subtitle_style
+    ))
+    troubleshooting.append(Spacer(1, 15))
+    
+    for section in REPORT_TROUBLESHOOTING_SECTIONS:
+        troubleshooting.append(Paragraph(section["title"], section_heading_style))
+        troubleshooting.append(Spacer(1, 5))
+        troubleshooting.append(Paragraph(f"<b>Symptoms:</b> {section['symptoms']}", styles['Normal']))
+        troubleshooting.append(Spacer(1, 5))
+
+        causes_text = "<b>Possible Causes:</b><br/>" + "<br/>".join([f"• {cause}" for cause in section['causes']])
+        troubleshooting.append(Paragraph(causes_text, styles['Normal']))
+        troubleshooting.append(Spacer(1, 5))
+
+        solutions_text = "<b>Solutions:</b><br/>" + "<br/>".join([f"• {sol}" for sol in section['solutions']])
+        troubleshooting.append(Paragraph(solutions_text, styles['Normal']))
+        troubleshooting.append(Spacer(1, 5))
+
+        troubleshooting.append(Paragraph(f"<b>Prevention:</b> {section['prevention']}", styles['Normal']))
+        troubleshooting.append(Spacer(1, 20))
+    
+    return {
+        'styles': styles,
+        'primary_green': primary_green,
+        'accent_green': accent_green,
+        'accent_blue': accent_blue,
+        'text_dark': text_dark,
+        'title_style': title_style,
+        'subtitle_style': subtitle_style,
+        'heading_style': heading_style,
+        'section_heading_style': section_heading_style,
+        'health_style': health_style,
+        'alert_cell_style': alert_cell_style,
+        'logo_cells': logo_cells,
+        'logo_table_style': TableStyle([
+            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+            ('ALIGN', (1, 0), (1, 0), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]),
+        'troubleshooting': troubleshooting,
+        'metadata_table_style': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), card_soil),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('TOPPADDING', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+            ('BOX', (0, 0), (-1, -1), 1, colors.grey),
+            ('LINEBELOW', (0, 0), (-1, -1), 1, colors.white)
+        ]),
+        'sensor_table_style': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), primary_green),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('TOPPADDING', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [card_soil, bg_soil])
+        ]),
+        'alert_table_style': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), card_soil),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('TOPPADDING', (0, 0), (-1, -1), 15),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
+            ('BOX', (0, 0), (-1, -1), 1, colors.grey),
+            ('GRID', (0, 0), (-1, -1), 1, colors.white)
+        ]),
+        'history_table_style': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), accent_blue),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 9),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [card_soil, bg_soil])
+        ]),
+        'gas_table_style': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), primary_green),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [card_soil, bg_soil])
+        ]),
+        'footer_line_style': TableStyle([
+            ('LINEABOVE', (0, 0), (-1, 0), 2, accent_green),
+        ]),
+    }
+
+_report_assets = _build_report_assets()
+
+# Parsed advice paragraphs, keyed by text (the advice texts are a small fixed set)
+_static_paragraphs = {}
+_static_paragraphs_lock = threading.Lock()
+
+def _report_logo_header():
+    """
+    Logo + title header table for one report. Flowables keep per-document
+    state while drawing, so cells are copies and the table is new each time.
+    """
+    if _report_assets['logo_cells'] is None:
+        return None
+    logo_table = Table([[copy.copy(cell) for cell in _report_assets['logo_cells']]], colWidths=[60, 200])
+    logo_table.setStyle(_report_assets['logo_table_style'])
+    return logo_table
+
+def _static_paragraph(text):
+    """Copy of a cached Paragraph for static report text (parsed only once)."""
+    with _static_paragraphs_lock:
+        paragraph = _static_paragraphs.get(text)
+        if paragraph is None:
+            paragraph = Paragraph(text, _report_assets['styles']['Normal'])
+            if len(_static_paragraphs) < 256:
+                _static_paragraphs[text] = paragraph
+    return copy.copy(paragraph)
 
 def _generate_overview(sensor_data, analysis):
     """Generate greenhouse overview summary"""
@@ -2449,93 +3540,30 @@ def _generate_current_conditions(sensor_data):
         'flame_detection': sensor_data.get('flame_status', 'Unknown')
     }
 
-def _generate_alert_summary(sensor_data):
-    """Generate alert summary"""
-    alerts = []
-    
-    # Temperature alerts (20-27°C optimal)
-    temp_avg = (sensor_data.get('temperature_bmp280', 0) + sensor_data.get('temperature_dht22', 0)) / 2
-    if temp_avg < 18:
-        alerts.append({'level': 'CRITICAL', 'type': 'Temperature', 'message': f'Temperature too low: {temp_avg:.1f}°C'})
-    elif temp_avg > 30:
-        alerts.append({'level': 'CRITICAL', 'type': 'Temperature', 'message': f'Temperature too high: {temp_avg:.1f}°C'})
-    elif temp_avg < 20 or temp_avg > 27:
-        alerts.append({'level': 'WARNING', 'type': 'Temperature', 'message': f'Temperature suboptimal: {temp_avg:.1f}°C'})
-    
-    # Humidity alerts (45-70% optimal)
-    humidity = sensor_data.get('humidity', 0)
-    if humidity < 45:
-        alerts.append({'level': 'CRITICAL', 'type': 'Humidity', 'message': f'Too dry: {humidity}% - Add shading'})
-    elif humidity > 80:
-        alerts.append({'level': 'CRITICAL', 'type': 'Humidity', 'message': f'Too humid: {humidity}% - Run ventilation'})
-    elif humidity > 70:
-        alerts.append({'level': 'WARNING', 'type': 'Humidity', 'message': f'Slightly high: {humidity}%'})
-    
-    # Air quality alerts (200/500 thresholds)
-    mq135 = sensor_data.get('mq135_drop', 0)
-    if mq135 > 500:
-        alerts.append({'level': 'WARNING', 'type': 'Air Quality', 'message': f'Poor air quality: {mq135:.0f} PPM'})
-    elif mq135 > 200:
-        alerts.append({'level': 'INFO', 'type': 'Air Quality', 'message': f'Moderate air quality: {mq135:.0f} PPM'})
-    
-    # Gas alerts
-    mq2 = sensor_data.get('mq2_drop', 0)
-    if mq2 > 750:
-        alerts.append({'level': 'CRITICAL', 'type': 'Flammable Gas', 'message': f'High gas level: {mq2:.0f} PPM'})
-    elif mq2 > 300:
-        alerts.append({'level': 'WARNING', 'type': 'Flammable Gas', 'message': f'Elevated gas: {mq2:.0f} PPM'})
-    
-    # CO alerts
-    mq7 = sensor_data.get('mq7_drop', 0)
-    if mq7 > 750:
-        alerts.append({'level': 'CRITICAL', 'type': 'Carbon Monoxide', 'message': f'High CO: {mq7:.0f} PPM'})
-    elif mq7 > 300:
-        alerts.append({'level': 'WARNING', 'type': 'Carbon Monoxide', 'message': f'Elevated CO: {mq7:.0f} PPM'})
-    
-    # Flame detection
-    if sensor_data.get('flame_detected'):
-        alerts.append({'level': 'CRITICAL', 'type': 'FIRE', 'message': '⚠️ FIRE DETECTED'})
-    
-    return {
-        'total_alerts': len(alerts),
-        'critical_count': sum(1 for a in alerts if a['level'] == 'CRITICAL'),
-        'warning_count': sum(1 for a in alerts if a['level'] == 'WARNING'),
-        'alerts': alerts
-    }
+def _generate_alert_summary(sensor_data, thresholds=None):
+    """Generate alert summary from the shared rule engine evaluation"""
+    if thresholds is None:
+        thresholds = load_thresholds()
+    return build_alert_summary(evaluate_reading(sensor_data, thresholds))
 
 def _calculate_health_score(analysis):
     """Calculate overall greenhouse health score (0-100)"""
-    score = 100
-    
-    # Temperature impact
-    temp_status = analysis.get('temperature', {}).get('status', '')
-    if temp_status == 'Critical':
-        score -= 30
-    elif temp_status == 'Acceptable':
-        score -= 10
-    
-    # Humidity impact
-    humidity_status = analysis.get('humidity', {}).get('status', '')
-    if humidity_status == 'Critical':
-        score -= 30
-    elif humidity_status == 'Acceptable':
-        score -= 10
-    
-    # Air quality impact
-    air_status = analysis.get('air_quality', {}).get('status', '')
-    if air_status == 'Poor':
-        score -= 20
-    elif air_status == 'Moderate':
-        score -= 10
-    
-    # Light impact
-    light_status = analysis.get('light', {}).get('status', '')
-    if light_status in ['Dark Night', 'Low Light']:
-        score -= 15
-    elif light_status == 'Dim Indoor':
-        score -= 5
-    
-    return max(0, min(100, score))
+    score, _ = score_statuses({name: info.get('status', '') for name, info in analysis.items()})
+    return score
+
+def _get_air_quality_status(mq135_ppm):
+    """MQ135-only air quality status used by the health score"""
+    return "Good" if mq135_ppm <= 200 else ("Poor" if mq135_ppm > 500 else "Moderate")
+
+def _health_statuses(derived):
+    """Health score component statuses for one derived reading"""
+    temperature = derived.get('temperature')
+    return {
+        'temperature': _get_temperature_status(temperature) if temperature is not None else '',
+        'humidity': _get_humidity_status(derived.get('humidity', 0)),
+        'air_quality': _get_air_quality_status(derived.get('mq135_drop', 0)),
+        'light': _get_light_status(derived.get('light', 0)),
+    }
 
 if __name__ == '__main__':
     # For development only - use gunicorn in production
@@ -0,0 +1,239 @@
+"""
+Sensor data quality checks for greenhouse monitoring system.
+Every ingested reading passes through DataQualityMonitor.observe(), which
+keeps a few numbers per sensor and flags the reading when something looks
+wrong with the data rather than with the greenhouse:
+
+- stale: the newest reading (or a sensor's last value) is older than
+  DQ_STALE_SECONDS, e.g. APEX keeps returning the same timestamp_reading
+- flatline: a sensor that normally fluctuates has reported exactly the same
+  value for DQ_FLATLINE_SECONDS (and at least DQ_FLATLINE_MIN_READINGS)
+- disagreement: two sensors measuring the same quantity (DHT22 / BMP280
+  temperature) differ by more than the allowed difference
+- out_of_range / spike: a value outside the sensor's physical range, or
+  more than DQ_SPIKE_Z deviations away from its running mean
+
+All statistics are incremental (run length, EWMA mean / variance), so each
+reading costs O(1) per sensor.
+"""
+
+import math
+import os
+import threading
+import time
+
+DQ_STALE_SECONDS = float(os.getenv('DQ_STALE_SECONDS', '300'))
+DQ_FLATLINE_SECONDS = float(os.getenv('DQ_FLATLINE_SECONDS', '1800'))
+DQ_FLATLINE_MIN_READINGS = int(os.getenv('DQ_FLATLINE_MIN_READINGS', '10'))
+DQ_SPIKE_Z = float(os.getenv('DQ_SPIKE_Z', '6'))
+DQ_TEMPERATURE_DISAGREEMENT = float(os.getenv('DQ_TEMPERATURE_DISAGREEMENT', '5'))
+
+# Raw reading fields checked:
+#   range    - physically plausible (min, max), None to skip the check
+#   flatline - a constant value means a stuck sensor (not for gas drops,
+#              which sit at 0 in clean air, or light, which sits at 0 at night)
+#   floor    - smallest deviation used for spike z-scores, so a very steady
+#              sensor doesn't flag its first small change as a spike
+SENSORS = {
+    "temperature_dht22": {"range": (-40, 80), "flatline": True, "floor": 0.3},
+    "temperature_bmp280": {"range": (-40, 85), "flatline": True, "floor": 0.3},
+    "humidity": {"range": (0, 100), "flatline": True, "floor": 1.0},
+    "pressure": {"range": None, "flatline": True, "floor": 0.5},
+    "mq135_drop": {"range": None, "flatline": False, "floor": 10.0},
+    "mq2_drop": {"range": None, "flatline": False, "floor": 10.0},
+    "mq7_drop": {"range": None, "flatline": False, "floor": 10.0},
+    "light_raw": {"range": (0, 4095), "flatline": False, "floor": 50.0},
+    "moisture": {"range": (0, 100), "flatline": False, "floor": 2.0},
+}
+
+# (name, field a, field b, largest normal difference)
+DISAGREEMENT_PAIRS = [
+    ("temperature", "temperature_dht22", "temperature_bmp280", DQ_TEMPERATURE_DISAGREEMENT),
+]
+
+EWMA_ALPHA = 0.1
+SPIKE_WARMUP_READINGS = 20
+
+
+def _value(reading, field):
+    value = reading.get(field)
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _flag(check, sensor, message):
+    return {"check": check, "sensor": sensor, "message": message}
+
+
+class _SensorStats:
+    """Incremental statistics of one sensor."""
+
+    def __init__(self):
+        self.count = 0
+        self.last_ts = None
+        self.last_value = None
+        self.run_start_ts = None   # first reading of the current constant run
+        self.run_count = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.spikes = 0
+        self.out_of_range = 0
+
+    def flatline_seconds(self):
+        if self.run_count < 2:
+            return 0.0
+        return self.last_ts - self.run_start_ts
+
+
+class DataQualityMonitor:
+    """Per-sensor quality state for one reading stream."""
+
+    def __init__(self, sensors=SENSORS, pairs=DISAGREEMENT_PAIRS, stale_seconds=DQ_STALE_SECONDS,
+                 flatline_seconds=DQ_FLATLINE_SECONDS, flatline_min_readings=DQ_FLATLINE_MIN_READINGS,
+                 spike_z=DQ_SPIKE_Z):
+        self.sensors = sensors
+        self.pairs = pairs
+        self.stale_seconds = stale_seconds
+        self.flatline_seconds = flatline_seconds
+        self.flatline_min_readings = flatline_min_readings
+        self.spike_z = spike_z
+        self._stats = {field: _SensorStats() for field in sensors}
+        self._pair_diffs = {name: None for name, _, _, _ in pairs}   # EWMA of |a - b|
+        self._newest_ts = None
+        self._newest_seen_at = None
+        self._newest_flags = []   # spike / range / disagreement flags of the newest reading
+        self._lock = threading.Lock()
+
+    def observe(self, reading):
+        """
+        Update the statistics with one reading (oldest first) and return the
+        problems found in it. Readings older than a sensor's last one are
+        checked but don't move its statistics.
+
+        Returns:
+            list: Flags ({check, sensor, message}), empty if the reading looks fine
+        """
+        ts = _value(reading, "_ts_num")
+        if ts is None:
+            ts = _value(reading, "timestamp") or time.time()
+        flags = []
+        with self._lock:
+            newest = self._newest_ts is None or ts >= self._newest_ts
+            if newest and ts != self._newest_ts:
+                self._newest_ts = ts
+                self._newest_seen_at = time.time()
+            for field, config in self.sensors.items():
+                value = _value(reading, field)
+                if value is not None:
+                    flags.extend(self._observe_sensor(field, config, self._stats[field], ts, value))
+            for name, field_a, field_b, limit in self.pairs:
+                a, b = _value(reading, field_a), _value(reading, field_b)
+                if a is None or b is None:
+                    continue
+                diff = abs(a - b)
+                previous = self._pair_diffs[name]
+                self._pair_diffs[name] = diff if previous is None else previous + EWMA_ALPHA * (diff - previous)
+                if diff > limit:
+                    flags.append(_flag("disagreement", name,
+                                       f"{field_a} and {field_b} differ by {diff:.1f} (limit {limit:g})"))
+            if newest:
+                self._newest_flags = [f for f in flags if f["check"] != "flatline"]
+        return flags
+
+    def _observe_sensor(self, field, config, stats, ts, value):
+        flags = []
+        value_range = config.get("range")
+        if value_range and not value_range[0] <= value <= value_range[1]:
+            stats.out_of_range += 1
+            flags.append(_flag("out_of_range", field,
+                               f"{field} = {value:g} outside {value_range[0]:g}..{value_range[1]:g}"))
+        elif stats.count >= SPIKE_WARMUP_READINGS:
+            z = abs(value - stats.mean) / max(math.sqrt(stats.var), config.get("floor", 0.0), 1e-9)
+            if z > self.spike_z:
+                stats.spikes += 1
+                flags.append(_flag("spike", field, f"{field} = {value:g} is {z:.1f} deviations from its mean {stats.mean:.1f}"))
+
+        if stats.last_ts is not None and ts <= stats.last_ts:
+            return flags   # late reading: checked, but the stream statistics stay in order
+
+        if value == stats.last_value:
+            stats.run_count += 1
+        else:
+            stats.run_start_ts, stats.run_count = ts, 1
+        stats.last_ts, stats.last_value = ts, value
+        if stats.count == 0:
+            stats.mean = value
+        else:
+            delta = value - stats.mean
+            stats.mean += EWMA_ALPHA * delta
+            stats.var = (1 - EWMA_ALPHA) * (stats.var + EWMA_ALPHA * delta * delta)
+        stats.count += 1
+
+        if config.get("flatline") and self._is_flatlined(stats):
+            flags.append(_flag("flatline", field,
+                               f"{field} stuck at {value:g} for {stats.flatline_seconds() / 60:.0f} min"))
+        return flags
+
+    def _is_flatlined(self, stats):
+        return stats.run_count >= self.flatline_min_readings and stats.flatline_seconds() >= self.flatline_seconds
+
+    def current_flags(self, now=None):
+        """Ongoing problems: stale data and flatlined sensors."""
+        now = time.time() if now is None else now
+        flags = []
+        with self._lock:
+            if self._newest_ts is not None and now - self._newest_ts > self.stale_seconds:
+                flags.append(_flag("stale", "source",
+                                   f"newest reading is {(now - self._newest_ts) / 60:.0f} min old"))
+            for field, stats in self._stats.items():
+                if stats.last_ts is None:
+                    continue
+                if now - stats.last_ts > self.stale_seconds:
+                    flags.append(_flag("stale", field, f"no {field} value for {(now - stats.last_ts) / 60:.0f} min"))
+                elif self.sensors[field].get("flatline") and self._is_flatlined(stats):
+                    flags.append(_flag("flatline", field, f"{field} stuck at {stats.last_value:g} "
+                                                          f"for {stats.flatline_seconds() / 60:.0f} min"))
+        return flags
+
+    def report(self, now=None):
+        """Per-sensor quality summary for /api/data-quality."""
+        now = time.time() if now is None else now
+        flags = self.current_flags(now)
+        with self._lock:
+            flags = self._newest_flags + flags
+            sensors = {}
+            for field, stats in self._stats.items():
+                if stats.count == 0:
+                    continue
+                sensors[field] = {
+                    "last_value": stats.last_value,
+                    "age_seconds": round(now - stats.last_ts, 1),
+                    "readings": stats.count,
+                    "mean": round(stats.mean, 2),
+                    "std": round(math.sqrt(stats.var), 2),
+                    "flatline_seconds": round(stats.flatline_seconds(), 1),
+                    "spikes": stats.spikes,
+                    "out_of_range": stats.out_of_range,
+                }
+            source = {
+                "newest_reading_at": self._newest_ts,
+                "age_seconds": round(now - self._newest_ts, 1) if self._newest_ts is not None else None,
+                "last_new_reading_seen_at": self._newest_seen_at,
+            }
+            disagreement = {
+                name: {"mean_difference": round(self._pair_diffs[name], 2) if self._pair_diffs[name] is not None else None,
+                       "limit": limit}
+                for name, _, _, limit in self.pairs
+            }
+        return {
+            "status": "ok" if not flags else "degraded",
+            "flags": flags,
+            "source": source,
+            "sensors": sensors,
+            "disagreement": disagreement,
+        }
@@ -0,0 +1,253 @@
+"""
+Daily-cycle (diurnal) baselines for greenhouse monitoring system.
+For each sensor the past DIURNAL_DAYS days are summarised per local hour
+of day: mean, 10th and 90th percentile, so a reading can be compared with
+what is normal at that time of day (dark at 14:00 is a problem, dark at
+02:00 is not) instead of with fixed breakpoints only.
+
+Readings are counted into one small histogram per (day, hour) as they are
+ingested, O(1) per sensor. An hour's profile is rebuilt from its day
+histograms only when one of them changed, and while the newest hour is
+still filling at most every DIURNAL_REBUILD_SECONDS (every hour is rebuilt
+once a new one starts). Days falling out of the window are dropped whole,
+so serving a profile is usually a list copy.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import Counter
+from datetime import date
+
+DIURNAL_DAYS = int(os.getenv('DIURNAL_DAYS', '7'))
+# Days of data an hour needs before its profile is used for comparisons
+DIURNAL_MIN_DAYS = int(os.getenv('DIURNAL_MIN_DAYS', '2'))
+# Seconds an hour's profile may lag new readings before it is rebuilt
+DIURNAL_REBUILD_SECONDS = float(os.getenv('DIURNAL_REBUILD_SECONDS', '60'))
+
+# Derived reading field -> histogram bin width (p10 / p90 resolution) and
+# smallest p10-p90 spread used when scoring, so a very steady hour (light at
+# night) doesn't make a small change look far from usual. 'labels' name the
+# below / above usual statuses where the plain words would mislead
+DIURNAL_FIELDS = {
+    "temperature": {"bin": 0.1, "spread_floor": 1.0},
+    "humidity": {"bin": 0.5, "spread_floor": 3.0},
+    "soil_moisture": {"bin": 1.0, "spread_floor": 3.0},
+    # Raw light (0-4095) rises as it gets darker
+    "light": {"bin": 10.0, "spread_floor": 100.0, "labels": ("brighter than usual", "darker than usual")},
+    "co2_level": {"bin": 5.0, "spread_floor": 25.0},
+    "pressure": {"bin": 0.1, "spread_floor": 1.0},
+}
+
+
+def band_position(value, entry, spread_floor=0.0):
+    """
+    Where a value sits relative to an hour's usual band.
+
+    Returns:
+        float: 0 inside [p10, p90]; otherwise the distance past p90 (positive)
+            or below p10 (negative) in units of the p10-p90 spread
+    """
+    spread = max(entry["p90"] - entry["p10"], spread_floor, 1e-9)
+    if value > entry["p90"]:
+        return (value - entry["p90"]) / spread
+    if value < entry["p10"]:
+        return (value - entry["p10"]) / spread
+    return 0.0
+
+
+class _Cell:
+    """Values of one sensor in one (day, hour)."""
+
+    __slots__ = ("count", "total", "low", "high", "bins")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.low = math.inf
+        self.high = -math.inf
+        self.bins = Counter()
+
+
+def _percentile(bins, count, q, width, low, high):
+    """q-th quantile of a bin histogram (bin midpoint, kept within [low, high])."""
+    target = q * (count - 1)
+    seen = 0
+    for index in sorted(bins):
+        seen += bins[index]
+        if seen > target:
+            break
+    return min(max((index + 0.5) * width, low), high)
+
+
+class DiurnalProfiles:
+    """Per-sensor hour-of-day profiles over a sliding window of days."""
+
+    def __init__(self, fields=DIURNAL_FIELDS, days=DIURNAL_DAYS, min_days=DIURNAL_MIN_DAYS,
+                 rebuild_interval=DIURNAL_REBUILD_SECONDS):
+        self.fields = fields
+        self.days = days
+        self.min_days = min_days
+        self.rebuild_interval = rebuild_interval
+        self._cells = {}          # (day ordinal, hour) -> {field: _Cell}
+        self._profiles = {field: [None] * 24 for field in fields}
+        self._dirty = set()       # (field, hour) whose profile must be rebuilt
+        self._built_at = {}       # (field, hour) -> monotonic time of its last rebuild
+        self._newest_day = None
+        self._newest_hour = None  # (day ordinal, hour) of the newest reading
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _day_hour(ts):
+        local = time.localtime(ts)
+        return date(local.tm_year, local.tm_mon, local.tm_mday).toordinal(), local.tm_hour
+
+    def observe(self, reading):
+        """Count one derived reading (any order) into its (day, hour) histograms."""
+        ts = reading.get("_ts_num", reading.get("timestamp"))
+        try:
+            ts = float(ts)
+        except (TypeError, ValueError):
+            return
+        day, hour = self._day_hour(ts)
+        with self._lock:
+            if self._newest_day is None or day > self._newest_day:
+                self._newest_day = day
+                self._expire()
+            elif day <= self._newest_day - self.days:
+                return
+            if self._newest_hour is None or (day, hour) > self._newest_hour:
+                # A new hour: the one that just ended gets its final rebuild
+                self._newest_hour = (day, hour)
+                self._built_at.clear()
+            cells = self._cells.setdefault((day, hour), {})
+            for field, config in self.fields.items():
+                value = reading.get(field)
+                if value is None or isinstance(value, bool):
+                    continue
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    continue
+                if not math.isfinite(value):
+                    continue
+                cell = cells.get(field)
+                if cell is None:
+                    cell = cells[field] = _Cell()
+                cell.count += 1
+                cell.total += value
+                cell.low = min(cell.low, value)
+                cell.high = max(cell.high, value)
+                cell.bins[math.floor(value / config["bin"])] += 1
+                self._dirty.add((field, hour))
+
+    def _expire(self):
+        oldest = self._newest_day - self.days + 1
+        for key in [key for key in self._cells if key[0] < oldest]:
+            for field in self._cells.pop(key):
+                self._dirty.add((field, key[1]))
+
+    def _rebuild(self, field, hour):
+        width = self.fields[field]["bin"]
+        bins = Counter()
+        count, total, days = 0, 0.0, 0
+        low, high = math.inf, -math.inf
+        for day in range(self._newest_day - self.days + 1, self._newest_day + 1):
+            cell = self._cells.get((day, hour), {}).get(field)
+            if cell is None or not cell.count:
+                continue
+            bins.update(cell.bins)
+            count += cell.count
+            total += cell.total
+            low, high = min(low, cell.low), max(high, cell.high)
+            days += 1
+        if not count:
+            return None
+        return {
+            "hour": hour,
+            "mean": round(total / count, 2),
+            "p10": round(_percentile(bins, count, 0.1, width, low, high), 2),
+            "p90": round(_percentile(bins, count, 0.9, width, low, high), 2),
+            "days": days,
+            "samples": count,
+        }
+
+    def profile(self, field):
+        """
+        The field's 24 hourly entries ({hour, mean, p10, p90, days, samples},
+        None for an hour without data), rebuilding changed hours not rebuilt
+        in the last rebuild_interval seconds.
+        """
+        now = time.monotonic()
+        with self._lock:
+            profile = self._profiles[field]
+            for key in [key for key in self._dirty if key[0] == field]:
+                built = self._built_at.get(key)
+                if built is not None and now - built < self.rebuild_interval:
+                    continue
+                profile[key[1]] = self._rebuild(*key)
+                self._built_at[key] = now
+                self._dirty.discard(key)
+            return list(profile)
+
+    def expected(self, field, ts=None):
+        """The hour's entry for ts once it covers min_days days, else None."""
+        if field not in self.fields:
+            return None
+        hour = time.localtime(time.time() if ts is None else ts).tm_hour
+        entry = self.profile(field)[hour]
+        if entry is None or entry["days"] < self.min_days:
+            return None
+        return entry
+
+    def compare(self, field, value, ts=None):
+        """
+        A value against the usual band for its hour.
+
+        Returns:
+            dict: The hour's entry plus 'value', 'position' (see band_position)
+                and 'status' ('below usual' / 'usual' / 'above usual', or the
+                field's labels), or None while the hour has too little history
+        """
+        entry = self.expected(field, ts)
+        if entry is None or value is None:
+            return None
+        config = self.fields[field]
+        position = band_position(float(value), entry, config["spread_floor"])
+        below, above = config.get("labels", ("below usual", "above usual"))
+        status = "usual" if position == 0 else (above if position > 0 else below)
+        return {**entry, "value": value, "position": round(position, 2), "status": status}
+
+    def positions(self, reading):
+        """'<field>_diurnal' band positions of one derived reading, for the rule engine."""
+        ts = reading.get("_ts_num", reading.get("timestamp"))
+        try:
+            ts = float(ts)
+        except (TypeError, ValueError):
+            return {}
+        result = {}
+        for field in self.fields:
+            value = reading.get(field)
+            if value is None or isinstance(value, bool):
+                continue
+            comparison = self.compare(field, value, ts)
+            if comparison is not None:
+                result[f"{field}_diurnal"] = comparison["position"]
+        return result
+
+    def backfill(self, store, end=None):
+        """
+        Seed the profiles from the history store (readings before end).
+
+        Returns:
+            int: Readings counted
+        """
+        end = time.time() if end is None else end
+        columns = list(self.fields)
+        count = 0
+        for rows in store.iter_readings(end - self.days * 86400, end, columns=columns):
+            for row in rows:
+                self.observe({"timestamp": row[0], **dict(zip(columns, row[1:]))})
+            count += len(rows)
+        return count
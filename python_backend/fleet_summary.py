@@ -0,0 +1,117 @@
+"""
+Fleet overview table for greenhouse monitoring system.
+One row per greenhouse (the primary APEX pipeline plus every site from
+sites.json), updated by the pollers whenever a site ingests readings or
+its alert state changes: latest key values, worst active alert severity,
+active alert count and when the newest reading was taken.
+
+/api/fleet/summary serves the table as one pre-serialized JSON body,
+rebuilt at most once per FLEET_SUMMARY_MAX_AGE seconds, so any number of
+clients polling a 50-site fleet costs one cached response, not 50 reads.
+"""
+
+import json
+import os
+import threading
+import time
+
+from rule_engine import SEVERITY_RANK
+
+FLEET_SUMMARY_MAX_AGE = float(os.getenv('FLEET_SUMMARY_MAX_AGE', '2'))
+# Age (seconds) of the newest reading after which a site is stale / offline
+FLEET_STALE_SECONDS = float(os.getenv('FLEET_STALE_SECONDS', '60'))
+FLEET_OFFLINE_SECONDS = float(os.getenv('FLEET_OFFLINE_SECONDS', '600'))
+
+# Derived reading fields shown per site
+KEY_VALUES = ("temperature", "humidity", "soil_moisture", "co2_level", "light",
+              "mq2_drop", "mq7_drop", "flame_detected")
+
+
+def worst_severity(severities):
+    """Most severe of the given severities, or None."""
+    worst = None
+    for severity in severities:
+        if SEVERITY_RANK.get(severity, 0) > SEVERITY_RANK.get(worst, 0):
+            worst = severity
+    return worst
+
+
+def freshness(age):
+    """'live' / 'stale' / 'offline' for a reading age in seconds ('no_data' if None)."""
+    if age is None:
+        return "no_data"
+    if age <= FLEET_STALE_SECONDS:
+        return "live"
+    if age <= FLEET_OFFLINE_SECONDS:
+        return "stale"
+    return "offline"
+
+
+class FleetSummary:
+    """Per-site summary rows plus the cached serialized overview."""
+
+    def __init__(self, max_age=FLEET_SUMMARY_MAX_AGE):
+        self.max_age = max_age
+        self._rows = {}        # site_id -> row, in registration order
+        self._lock = threading.Lock()
+        self._body = None
+        self._body_built = 0.0
+
+    def register(self, site_id, name, active=False):
+        """Add a site with no data yet (keeps an existing row)."""
+        with self._lock:
+            if site_id not in self._rows:
+                self._rows[site_id] = {
+                    "site_id": site_id, "name": name, "active": active,
+                    "values": {}, "worst_severity": None, "active_alerts": 0,
+                    "last_reading_at": None,
+                }
+
+    def set_active(self, site_id, active):
+        with self._lock:
+            row = self._rows.get(site_id)
+            if row is not None:
+                row["active"] = active
+
+    def update(self, site_id, reading, alerts):
+        """
+        Refresh one site's row.
+
+        Args:
+            reading (dict): Newest derived reading of the site
+            alerts (list): The site's currently active alerts
+        """
+        values = {key: reading.get(key) for key in KEY_VALUES if reading.get(key) is not None}
+        try:
+            last_reading_at = float(reading.get("timestamp"))
+        except (TypeError, ValueError):
+            last_reading_at = None
+        with self._lock:
+            row = self._rows.get(site_id)
+            if row is not None:
+                row.update(values=values, worst_severity=worst_severity(a.get("severity") for a in alerts),
+                           active_alerts=len(alerts), last_reading_at=last_reading_at)
+
+    def body(self):
+        """The overview as JSON bytes (freshness as of the build time)."""
+        now = time.time()
+        with self._lock:
+            if self._body is not None and now - self._body_built < self.max_age:
+                return self._body
+            rows = [dict(row) for row in self._rows.values()]
+        sites = []
+        for row in rows:
+            age = now - row["last_reading_at"] if row["last_reading_at"] is not None else None
+            sites.append({**row, "age_seconds": round(age, 1) if age is not None else None,
+                          "freshness": freshness(age)})
+        body = json.dumps({
+            "generated_at": now,
+            "site_count": len(sites),
+            "alerting_sites": sum(1 for s in sites if s["active_alerts"]),
+            "worst_severity": worst_severity(s["worst_severity"] for s in sites),
+            "sites": sites,
+        }, default=str).encode("utf-8")
+        with self._lock:
+            if now >= self._body_built:
+                self._body, self._body_built = body, now
+        return body
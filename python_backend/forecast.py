@@ -0,0 +1,144 @@
+"""
+Short-horizon forecasts for greenhouse monitoring system.
+Stored history (history_store.py) is averaged into FORECAST_STEP_SECONDS
+buckets and fed to an additive Holt-Winters model per sensor:
+
+- level and damped trend (Holt's linear method)
+- one seasonal offset per local hour of day (diurnal cycle)
+
+The fitted state is kept in memory per sensor. A forecast request first
+folds in only the buckets completed since the last fit (one indexed query,
+usually returning nothing new), so fitting costs O(new buckets) rather
+than a refit over the whole history.
+"""
+
+import math
+import os
+import threading
+import time
+
+FORECAST_STEP_SECONDS = int(os.getenv('FORECAST_STEP_SECONDS', '300'))
+# History folded in when a sensor's model is first built
+FORECAST_HISTORY_DAYS = float(os.getenv('FORECAST_HISTORY_DAYS', '3'))
+FORECAST_MAX_HORIZON_MINUTES = 180
+# Steps without new data after which a model is too stale to forecast from
+FORECAST_MAX_STALE_STEPS = int(os.getenv('FORECAST_MAX_STALE_STEPS', '3'))
+
+# Smoothing: level, trend, seasonal; trend damping per step
+ALPHA = 0.3
+BETA = 0.05
+GAMMA = 0.1
+PHI = 0.98
+
+
+class HoltWinters:
+    """Additive Holt-Winters state with hour-of-day seasonality."""
+
+    def __init__(self, step=FORECAST_STEP_SECONDS, alpha=ALPHA, beta=BETA, gamma=GAMMA, phi=PHI):
+        self.step = step
+        self.alpha, self.beta, self.gamma, self.phi = alpha, beta, gamma, phi
+        self.level = None
+        self.trend = 0.0
+        self.seasonal = [0.0] * 24
+        self.error_var = 0.0     # EWMA of squared one-step errors
+        self.last_ts = None      # start of the last bucket folded in
+        self.count = 0
+
+    @staticmethod
+    def _hour(ts):
+        return time.localtime(ts).tm_hour
+
+    def _trend_sum(self, steps):
+        """Damped trend accumulated over the next `steps` steps."""
+        if self.phi == 1.0:
+            return self.trend * steps
+        return self.trend * self.phi * (1 - self.phi ** steps) / (1 - self.phi)
+
+    def update(self, ts, value):
+        """Fold in one bucket (start ts, average value); buckets must arrive in order."""
+        hour = self._hour(ts)
+        if self.level is None:
+            self.level = value - self.seasonal[hour]
+        else:
+            steps = max(1, round((ts - self.last_ts) / self.step))
+            predicted_level = self.level + self._trend_sum(steps)
+            error = value - (predicted_level + self.seasonal[hour])
+            self.error_var += 0.1 * (error * error - self.error_var)
+            level = self.alpha * (value - self.seasonal[hour]) + (1 - self.alpha) * predicted_level
+            self.trend = self.beta * (level - self.level) / steps + (1 - self.beta) * self.trend * self.phi ** steps
+            self.level = level
+            self.seasonal[hour] += self.gamma * (value - self.level - self.seasonal[hour])
+        self.last_ts = ts
+        self.count += 1
+
+    def is_stale(self, now, max_steps=FORECAST_MAX_STALE_STEPS):
+        """True when the last bucket folded in ended more than max_steps steps before now."""
+        return self.last_ts is None or now - (self.last_ts + self.step) > max_steps * self.step
+
+    def forecast(self, steps):
+        """
+        Predictions for the next `steps` buckets after the last one folded in.
+
+        Returns:
+            list: (bucket start ts, value, half-width of a ~95% interval)
+        """
+        if self.level is None:
+            return []
+        sigma = math.sqrt(self.error_var)
+        points = []
+        for k in range(1, steps + 1):
+            ts = self.last_ts + k * self.step
+            value = self.level + self._trend_sum(k) + self.seasonal[self._hour(ts)]
+            points.append((ts, value, 1.96 * sigma * math.sqrt(k)))
+        return points
+
+
+def first_crossing(points, low, high):
+    """
+    First forecast point outside [low, high].
+
+    Returns:
+        dict: {'timestamp', 'value', 'bound': 'min' | 'max', 'threshold'}, or None
+    """
+    for ts, value, _ in points:
+        if low is not None and value < low:
+            return {"timestamp": ts, "value": value, "bound": "min", "threshold": low}
+        if high is not None and value > high:
+            return {"timestamp": ts, "value": value, "bound": "max", "threshold": high}
+    return None
+
+
+class ForecastCache:
+    """Fitted Holt-Winters state per history column, refreshed from new buckets only."""
+
+    def __init__(self, store, step=FORECAST_STEP_SECONDS, history_days=FORECAST_HISTORY_DAYS):
+        self.store = store
+        self.step = step
+        self.history_days = history_days
+        self._models = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def model(self, column, now=None):
+        """
+        The column's model with every completed bucket up to now folded in.
+
+        Returns:
+            HoltWinters: Model (level is None while there is no history)
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            lock = self._locks.setdefault(column, threading.Lock())
+        with lock:
+            model = self._models.get(column)
+            if model is None:
+                model = self._models[column] = HoltWinters(self.step)
+            # Only completed buckets; the current one is still filling
+            end = now // self.step * self.step
+            start = model.last_ts + self.step if model.last_ts is not None else end - self.history_days * 86400
+            start = start // self.step * self.step
+            if end > start:
+                buckets = int((end - start) // self.step)
+                for ts, value in self.store.series(start, end, column, max_points=buckets):
+                    model.update(start + (ts - start) // self.step * self.step, value)
+            return model
@@ -4,11 +4,370 @@ This module provides AI analysis of sensor data using Google's Gemini API.
 """
 
 import os
+import json
+import time
+import queue
+import threading
+import concurrent.futures
 from datetime import datetime
 
+from rule_engine import evaluate_reading, build_recommendations
+
+# Model and request limits (overridable via environment)
+GEMINI_MODEL_NAME = os.getenv('GEMINI_MODEL', 'models/gemini-2.5-flash')
+GEMINI_TIMEOUT_SECONDS = float(os.getenv('GEMINI_TIMEOUT_SECONDS', '20'))
+GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', '3'))
+# Max time a request waits for a free concurrency slot before falling back
+GEMINI_SLOT_WAIT_SECONDS = float(os.getenv('GEMINI_SLOT_WAIT_SECONDS', '1'))
+# Shared rate limit: sustained requests per minute and burst size
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', '15'))
+GEMINI_BURST = int(os.getenv('GEMINI_BURST', '5'))
+# Circuit breaker: consecutive failures before opening, and first probe delay
+GEMINI_BREAKER_THRESHOLD = int(os.getenv('GEMINI_BREAKER_THRESHOLD', '3'))
+GEMINI_BREAKER_COOLDOWN_SECONDS = float(os.getenv('GEMINI_BREAKER_COOLDOWN_SECONDS', '30'))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: refills at rate_per_minute, holds at most capacity tokens.
+    try_acquire() never blocks, so a caller that is over the limit can fall back at once.
+    """
+
+    def __init__(self, rate_per_minute, capacity):
+        self.rate = max(0.0, rate_per_minute) / 60.0
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Take one token if available. Returns True on success."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def available(self):
+        """Current (refilled) token count, for status output."""
+        with self._lock:
+            now = time.monotonic()
+            return min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Closed: requests pass. After `threshold` consecutive failures it opens and
+    every request is rejected immediately. It is closed again only by
+    record_success(), which the background recovery probe calls.
+    """
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def allow_request(self):
+        return self._opened_at is None
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        """Count a failure. Returns True if this failure opened the breaker."""
+        with self._lock:
+            self._failures += 1
+            if self._opened_at is None and self._failures >= self.threshold:
+                self._opened_at = time.time()
+                return True
+            return False
+
+    def status(self):
+        return {
+            'state': 'open' if self.is_open else 'closed',
+            'consecutive_failures': self._failures,
+            'opened_at': self._opened_at
+        }
+
+
+class GeminiClient:
+    """
+    Process-wide Gemini client.
+
+    Configures the SDK and builds the GenerativeModel once, so the underlying
+    transport (and its open connection) is reused by every request in this
+    worker. Calls run on a small bounded pool so each one can be given a
+    timeout and the number of in-flight requests stays capped.
+
+    A shared token bucket limits requests per minute and a circuit breaker
+    stops calling the API after repeated errors/timeouts; while it is open
+    generate() returns None immediately (callers use their fallback text)
+    and a background thread probes the API until it recovers.
+    """
+
+    def __init__(self, api_key, model_name=GEMINI_MODEL_NAME,
+                 timeout=GEMINI_TIMEOUT_SECONDS, max_concurrency=GEMINI_MAX_CONCURRENCY):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.timeout = timeout
+        self.max_concurrency = max(1, max_concurrency)
+        self.slot_wait = GEMINI_SLOT_WAIT_SECONDS
+        self._model = genai.GenerativeModel(model_name)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix='gemini'
+        )
+        self.rate_limiter = TokenBucket(GEMINI_REQUESTS_PER_MINUTE, GEMINI_BURST)
+        self.breaker = CircuitBreaker(GEMINI_BREAKER_THRESHOLD, GEMINI_BREAKER_COOLDOWN_SECONDS)
+        self._probe_thread = None
+
+    def generate(self, prompt, timeout=None):
+        """
+        Run generate_content with a timeout, the rate limit, the concurrency
+        limit and the circuit breaker applied.
+
+        Args:
+            prompt (str): Prompt text
+            timeout (float, optional): Seconds to wait; defaults to self.timeout
+
+        Returns:
+            str: Response text, or None when the call was rejected (breaker
+                 open, rate limited, no free slot) or failed/timed out
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if not self.breaker.allow_request():
+            return None
+        if not self.rate_limiter.try_acquire():
+            print("Gemini request skipped: rate limit reached")
+            return None
+        if not self._slots.acquire(timeout=min(self.slot_wait, timeout)):
+            print("Gemini request skipped: concurrency limit reached")
+            return None
+
+        try:
+            future = self._executor.submit(self._model.generate_content, prompt)
+        except Exception:
+            self._slots.release()
+            raise
+        # Release the slot when the call really finishes, not when we stop waiting
+        future.add_done_callback(lambda _f: self._slots.release())
+
+        try:
+            response = future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            print(f"Gemini request timed out after {timeout:.0f}s")
+            self._record_failure()
+            return None
+        except Exception as e:
+            print(f"Error with Gemini API: {str(e)}")
+            self._record_failure()
+            return None
+
+        self.breaker.record_success()
+        return _extract_response_text(response)
+
+    def stream(self, prompt, timeout=None):
+        """
+        Streaming variant of generate(): yields text chunks as the SDK
+        receives them. The same breaker/limit checks apply; `timeout` bounds
+        the wait for the first chunk and between chunks, so a long healthy
+        stream isn't cut off. Yields nothing when the call is rejected or
+        fails before the first chunk.
+
+        Returns:
+            bool: (generator return value) True if the stream finished normally
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if not self.breaker.allow_request():
+            return False
+        if not self.rate_limiter.try_acquire():
+            print("Gemini request skipped: rate limit reached")
+            return False
+        if not self._slots.acquire(timeout=min(self.slot_wait, timeout)):
+            print("Gemini request skipped: concurrency limit reached")
+            return False
+
+        chunks = queue.Queue()
+
+        def _produce():
+            try:
+                for part in self._model.generate_content(prompt, stream=True):
+                    text = _extract_chunk_text(part)
+                    if text:
+                        chunks.put(('chunk', text))
+                chunks.put(('done', None))
+            except Exception as e:
+                chunks.put(('error', e))
+            finally:
+                self._slots.release()
+
+        try:
+            self._executor.submit(_produce)
+        except Exception:
+            self._slots.release()
+            raise
+
+        while True:
+            try:
+                kind, payload = chunks.get(timeout=timeout)
+            except queue.Empty:
+                print(f"Gemini stream idle for {timeout:.0f}s")
+                self._record_failure()
+                return False
+            if kind == 'chunk':
+                yield payload
+            elif kind == 'done':
+                self.breaker.record_success()
+                return True
+            else:
+                print(f"Error with Gemini API: {str(payload)}")
+                self._record_failure()
+                return False
+
+    def _record_failure(self):
+        if self.breaker.record_failure():
+            print(f"⚠️ Gemini circuit breaker opened after {self.breaker.threshold} consecutive failures")
+            self._start_recovery_probe()
+
+    def _start_recovery_probe(self):
+        if self._probe_thread is not None and self._probe_thread.is_alive():
+            return
+        self._probe_thread = threading.Thread(
+            target=self._recovery_probe, daemon=True, name='gemini-probe'
+        )
+        self._probe_thread.start()
+
+    def _recovery_probe(self):
+        """Background loop: wait, send a tiny request, close the breaker on success."""
+        delay = self.breaker.cooldown
+        while self.breaker.is_open:
+            time.sleep(delay)
+            try:
+                future = self._executor.submit(self._model.generate_content, "Reply with OK.")
+                future.result(timeout=self.timeout)
+                self.breaker.record_success()
+                print("✅ Gemini API recovered - circuit breaker closed")
+            except Exception as e:
+                print(f"Gemini recovery probe failed: {e}")
+                delay = min(delay * 2, 600)
+
+    def status(self):
+        """Limiter and breaker state for the health endpoint."""
+        return {
+            'model': self.model_name,
+            'circuit_breaker': self.breaker.status(),
+            'rate_limit_tokens': round(self.rate_limiter.available(), 2),
+            'requests_per_minute': GEMINI_REQUESTS_PER_MINUTE,
+            'max_concurrency': self.max_concurrency
+        }
+
+    def warm_up(self):
+        """Open the transport connection with a cheap token-count request."""
+        try:
+            self._model.count_tokens("ping")
+            print(f"✅ Gemini client warmed up ({self.model_name})")
+        except Exception as e:
+            print(f"⚠️ Gemini warm-up failed (will retry on first request): {e}")
+
+
+_client = None
+_client_key = None
+_client_lock = threading.Lock()
+
+
+def get_gemini_client():
+    """
+    Return the shared GeminiClient, creating it on first use.
+
+    Returns:
+        GeminiClient: Shared client, or None when no API key is set or the
+                      google-generativeai package is not installed
+    """
+    global _client, _client_key
+    api_key = os.environ.get('GEMINI_API_KEY')
+    if not api_key:
+        return None
+
+    if _client is not None and _client_key == api_key:
+        return _client
+
+    with _client_lock:
+        if _client is None or _client_key != api_key:
+            try:
+                _client = GeminiClient(api_key)
+                _client_key = api_key
+            except ImportError:
+                print("Gemini API not available. Install the package: pip install google-generativeai")
+                return None
+        return _client
+
+
+def warm_up_gemini():
+    """
+    Create the shared client and open its connection ahead of the first request.
+    Safe to call when Gemini is not configured (does nothing).
+    """
+    client = get_gemini_client()
+    if client is not None:
+        client.warm_up()
+
+
+def get_gemini_status():
+    """
+    Describe the shared client's state (breaker, rate limit) for /api/health.
+
+    Returns:
+        dict: Status fields; 'enabled' is False when Gemini isn't configured
+    """
+    client = get_gemini_client()
+    if client is None:
+        return {'enabled': False}
+    return {'enabled': True, **client.status()}
+
+
+def _extract_chunk_text(chunk):
+    """Text of one streamed response chunk ('' when the chunk carries none)."""
+    try:
+        return chunk.text
+    except Exception:
+        # .text raises for chunks without text parts (e.g. final safety metadata)
+        return ''
+
+
+def _extract_response_text(response):
+    """Pull plain text out of a generate_content response, or None if empty."""
+    if hasattr(response, 'text'):
+        return response.text.strip()
+    elif hasattr(response, 'candidates') and response.candidates:
+        return response.candidates[0].content.parts[0].text.strip()
+    return None
+
+
 def get_gemini_analysis(sensor_type, current_value, unit, status, historical_data=None):
     """
     Get AI analysis from Google Gemini API for greenhouse sensor data.
+    Same as get_gemini_analysis_result() without the source flag.
+    """
+    return get_gemini_analysis_result(sensor_type, current_value, unit, status, historical_data)[0]
+
+def get_gemini_analysis_result(sensor_type, current_value, unit, status, historical_data=None):
+    """
+    Get AI analysis from Google Gemini API, and whether Gemini produced it.
     
     Args:
         sensor_type (str): The type of sensor (temperature, humidity, etc.)
@@ -18,39 +377,65 @@ def get_gemini_analysis(sensor_type, current_value, unit, status, historical_dat
         historical_data (list, optional): List of historical readings
         
     Returns:
-        str: Analysis text from Gemini API or fallback analysis
+        tuple: (analysis text, True if it came from Gemini / False for the
+               fallback text used when Gemini is unconfigured, limited or failing)
     """
     try:
-        # Check if API key is available
-        api_key = os.environ.get('GEMINI_API_KEY')
-        if not api_key:
-            return _get_fallback_analysis(sensor_type, current_value, unit, status)
-        
-        # Import the Gemini API
-        try:
-            import google.generativeai as genai
-        except ImportError:
-            return "Gemini API not available. Install the package: pip install google-generativeai"
-        
-        # Configure the API
-        genai.configure(api_key=api_key)
-        
-        # Create historical data description if available
-        historical_context = ""
-        if historical_data and len(historical_data) > 0:
-            avg = sum(historical_data) / len(historical_data)
-            min_val = min(historical_data)
-            max_val = max(historical_data)
-            trend = "increasing" if historical_data[-1] > historical_data[0] else "decreasing"
-            change = abs(historical_data[-1] - historical_data[0]) / max(0.1, historical_data[0]) * 100
-            
-            historical_context = f"""
-            Historical data over 30 days shows an {trend} trend with {change:.1f}% change.
-            Average: {avg:.1f}{unit}, Minimum: {min_val:.1f}{unit}, Maximum: {max_val:.1f}{unit}
-            """
-        
-        # Create the prompt
-        prompt = f"""
+        # Shared client (configured once per worker); None without API key
+        client = get_gemini_client()
+        if client is not None:
+            prompt = _build_analysis_prompt(sensor_type, current_value, unit, status, historical_data)
+            # Call the Gemini API through the shared client (timeout + concurrency limit)
+            text = client.generate(prompt)
+            if text:
+                return text, True
+    except Exception as e:
+        print(f"Error with Gemini API: {str(e)}")
+    return _get_fallback_analysis(sensor_type, current_value, unit, status), False
+
+def stream_gemini_analysis(sensor_type, current_value, unit, status, historical_data=None):
+    """
+    Stream AI analysis text from Gemini as it is generated.
+    
+    Same inputs as get_gemini_analysis. Yields partial text chunks; when
+    Gemini is unavailable (no key, breaker open, rate limited, error before
+    any text arrived) the fallback analysis is yielded as a single chunk.
+    
+    Yields:
+        str: Successive pieces of the analysis text
+    
+    Returns:
+        bool: (generator return value) True only if Gemini finished the stream
+              normally, i.e. the text is a complete analysis worth caching
+    """
+    produced = False
+    try:
+        client = get_gemini_client()
+        if client is not None:
+            prompt = _build_analysis_prompt(sensor_type, current_value, unit, status, historical_data)
+            stream = client.stream(prompt)
+            while True:
+                try:
+                    chunk = next(stream)
+                except StopIteration as stop:
+                    if stop.value:
+                        return True
+                    break
+                produced = True
+                yield chunk
+    except Exception as e:
+        print(f"Error with Gemini streaming: {str(e)}")
+    
+    if not produced:
+        yield _get_fallback_analysis(sensor_type, current_value, unit, status)
+    return False
+
+def _build_analysis_prompt(sensor_type, current_value, unit, status, historical_data):
+    """Build the single-sensor analysis prompt used by the plain and streaming calls."""
+    # Create historical data description if available
+    historical_context = _build_historical_context(historical_data, unit)
+    
+    return f"""
         As a greenhouse management AI assistant, analyze this sensor data:
         
         Sensor: {sensor_type}
@@ -67,22 +452,104 @@ def get_gemini_analysis(sensor_type, current_value, unit, status, historical_dat
         Your analysis should be factual, practical, and focused on greenhouse management best practices.
         Format the response as plain text without any markdown formatting.
         """
+
+def _build_historical_context(historical_data, unit):
+    """Summarise a list of historical values (trend, average, min, max) for a prompt."""
+    if not historical_data:
+        return ""
+    avg = sum(historical_data) / len(historical_data)
+    min_val = min(historical_data)
+    max_val = max(historical_data)
+    trend = "increasing" if historical_data[-1] > historical_data[0] else "decreasing"
+    change = abs(historical_data[-1] - historical_data[0]) / max(0.1, historical_data[0]) * 100
+    
+    return f"""
+            Historical data over 30 days shows an {trend} trend with {change:.1f}% change.
+            Average: {avg:.1f}{unit}, Minimum: {min_val:.1f}{unit}, Maximum: {max_val:.1f}{unit}
+            """
+
+
+def get_gemini_batch_analysis(sensors):
+    """
+    Get AI analysis for several sensors with a single Gemini request.
+    
+    The prompt covers every sensor and asks for a JSON object keyed by sensor
+    type, so one generate_content call replaces one call per sensor card.
+    Sensors missing from (or unparseable in) the response get the fallback text.
+    
+    Args:
+        sensors (list): Dicts with sensor_type, current_value, unit, status and
+                        optional historical_data (same meaning as get_gemini_analysis)
         
-        # Call the Gemini API (using gemini-2.5-flash model)
-        model = genai.GenerativeModel('models/gemini-2.5-flash')
-        response = model.generate_content(prompt)
+    Returns:
+        tuple: (analysis text keyed by sensor_type, set of the sensor types
+               whose text came from Gemini rather than the fallback)
+    """
+    if not sensors:
+        return {}, set()
+    
+    results = {}
+    client = get_gemini_client()
+    if client is not None:
+        try:
+            sensor_blocks = []
+            for s in sensors:
+                sensor_blocks.append(f"""
+        Sensor: {s['sensor_type']}
+        Current Value: {s['current_value']}{s['unit']}
+        Current Status: {s['status']}
+        {_build_historical_context(s.get('historical_data'), s['unit'])}""")
+            
+            prompt = f"""
+        As a greenhouse management AI assistant, analyze the following sensor readings.
+        Date: {datetime.now().strftime('%Y-%m-%d')}
+        {''.join(sensor_blocks)}
         
-        # Return the response text
-        if hasattr(response, 'text'):
-            return response.text.strip()
-        elif hasattr(response, 'candidates') and response.candidates:
-            return response.candidates[0].content.parts[0].text.strip()
-        else:
-            return _get_fallback_analysis(sensor_type, current_value, unit, status)
+        For EACH sensor provide a concise analysis (3-4 sentences) explaining:
+        1. What this reading indicates about greenhouse conditions
+        2. Potential impacts on plant health and growth
+        3. Recommended actions if needed
         
-    except Exception as e:
-        print(f"Error with Gemini API: {str(e)}")
-        return _get_fallback_analysis(sensor_type, current_value, unit, status)
+        Respond with ONLY a JSON object whose keys are exactly these sensor names:
+        {json.dumps([s['sensor_type'] for s in sensors])}
+        and whose values are the plain-text analyses (no markdown).
+        """
+            
+            text = client.generate(prompt)
+            if text:
+                parsed = _parse_json_object(text)
+                for s in sensors:
+                    analysis = parsed.get(s['sensor_type'])
+                    if isinstance(analysis, str) and analysis.strip():
+                        results[s['sensor_type']] = analysis.strip()
+        except Exception as e:
+            print(f"Error with Gemini batch analysis: {str(e)}")
+    
+    generated = set(results)
+    for s in sensors:
+        if s['sensor_type'] not in results:
+            results[s['sensor_type']] = _get_fallback_analysis(
+                s['sensor_type'], s['current_value'], s['unit'], s['status']
+            )
+    return results, generated
+
+
+def _parse_json_object(text):
+    """Parse a JSON object from model output, tolerating ```json fences. Returns {} on failure."""
+    cleaned = text.strip()
+    if cleaned.startswith('```'):
+        cleaned = cleaned.split('\n', 1)[1] if '\n' in cleaned else ''
+        cleaned = cleaned.rsplit('```', 1)[0]
+    start = cleaned.find('{')
+    end = cleaned.rfind('}')
+    if start == -1 or end <= start:
+        return {}
+    try:
+        data = json.loads(cleaned[start:end + 1])
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
 
 def _get_fallback_analysis(sensor_type, current_value, unit, status):
     """
@@ -184,137 +651,34 @@ def _get_fallback_analysis(sensor_type, current_value, unit, status):
         return f"Current {sensor_type} reading is {current_value}{unit}, which is classified as {status}. Continue monitoring for any significant changes that might require attention."
 
 
-def get_gemini_recommendations(sensor_data):
+def get_gemini_recommendations(sensor_data, thresholds=None):
     """
     Get AI-powered recommendations from Gemini based on current APEX sensor readings.
     Uses fallback logic for speed - only calls Gemini for complex situations.
     
     Args:
         sensor_data (dict): Complete sensor data from APEX including all readings
+        thresholds (dict, optional): Current thresholds (thresholds.json); rule defaults when omitted
         
     Returns:
         list: List of recommendation dictionaries with title, description, and type
     """
-    # ALWAYS use fast fallback logic with hardcoded thresholds for speed
+    # ALWAYS use fast fallback logic for speed
     # Gemini AI is too slow for real-time recommendations
-    return _get_fallback_recommendations(sensor_data)
+    return _get_fallback_recommendations(sensor_data, thresholds)
 
 
-def _get_fallback_recommendations(sensor_data):
+def _get_fallback_recommendations(sensor_data, thresholds=None):
     """
     Generate fast, concise recommendations based on latest APEX data.
-    Uses hardcoded thresholds from system specifications.
-    
-    Thresholds:
-    - MQ135 (Air Quality): ≤200 ppm = Good, >500 ppm = Poor
-    - MQ2 (Flammable Gas): ≤300 ppm = Safe, >750 ppm = High
-    - MQ7 (Carbon Monoxide): ≤300 ppm = Safe, >750 ppm = High
+    Uses the shared threshold rules (rule_engine.py), so recommendations match
+    /api/alerts and the PDF alert summary for the same reading and thresholds.
     
     Args:
-        sensor_data (dict): Latest APEX sensor data
+        sensor_data (dict): Latest APEX sensor data (with derived fields)
+        thresholds (dict, optional): Current thresholds
         
     Returns:
-        list: Short, actionable recommendations
+        list: Short, actionable recommendations (at most 5, most critical first)
     """
-    recommendations = []
-    
-    # Get latest readings from APEX
-    avg_temp = (sensor_data.get('temperature_bmp280', 0) + sensor_data.get('temperature_dht22', 0)) / 2
-    humidity = sensor_data.get('humidity', 0)
-    mq135_drop = sensor_data.get('mq135_drop', 0)  # Air quality
-    mq2_drop = sensor_data.get('mq2_drop', 0)      # Flammable gas
-    mq7_drop = sensor_data.get('mq7_drop', 0)      # CO
-    flame_detected = sensor_data.get('flame_detected', 'No')
-    
-    # CRITICAL SAFETY ALERTS (using real thresholds)
-    if flame_detected == 'Yes':
-        recommendations.append({
-            "title": "🔥 Flame Detected",
-            "description": "Infrared source detected in greenhouse. Immediately inspect all heating equipment, electrical systems, and open flames. Ensure fire extinguisher is accessible.",
-            "type": "danger"
-        })
-    
-    if mq7_drop > 750:  # HIGH threshold
-        recommendations.append({
-            "title": "⚠️ CO High",
-            "description": f"Carbon monoxide at {mq7_drop:.0f} ppm exceeds safe levels (>750). Check all combustion equipment and increase ventilation immediately to prevent health hazards.",
-            "type": "danger"
-        })
-    elif mq7_drop > 300:  # ELEVATED threshold
-        recommendations.append({
-            "title": "CO Elevated",
-            "description": f"Carbon monoxide elevated at {mq7_drop:.0f} ppm. Monitor heating equipment closely and ensure proper ventilation is maintained.",
-            "type": "warning"
-        })
-    
-    if mq2_drop > 750:  # HIGH threshold
-        recommendations.append({
-            "title": "⚠️ Flammable Gas High",
-            "description": f"Flammable gas detected at {mq2_drop:.0f} ppm (>750 threshold). Inspect for gas leaks, check fuel lines, and increase ventilation to reduce fire risk.",
-            "type": "danger"
-        })
-    elif mq2_drop > 300:  # ELEVATED threshold
-        recommendations.append({
-            "title": "Gas Levels Elevated",
-            "description": f"Flammable gas at {mq2_drop:.0f} ppm. Increase air circulation and monitor levels. Check for any potential leak sources.",
-            "type": "warning"
-        })
-    
-    # AIR QUALITY (using real thresholds: 200, 500)
-    if mq135_drop > 500:  # POOR threshold
-        recommendations.append({
-            "title": "Poor Air Quality",
-            "description": f"Air quality reading at {mq135_drop:.0f} ppm indicates poor conditions (>500). Increase ventilation to improve air circulation and plant health.",
-            "type": "warning"
-        })
-    elif mq135_drop > 200:  # MODERATE threshold
-        recommendations.append({
-            "title": "Air Quality Moderate",
-            "description": f"Air quality at {mq135_drop:.0f} ppm is acceptable but could be improved. Consider increasing airflow for optimal plant growth conditions.",
-            "type": "co2"
-        })
-    
-    # TEMPERATURE (20-27°C optimal for greenhouse plants)
-    if avg_temp < 20:
-        recommendations.append({
-            "title": "Temperature Too Low",
-            "description": f"Current temperature is {avg_temp:.1f}°C. Increase heating to reach optimal range of 20-27°C for healthy plant metabolism and growth.",
-            "type": "temperature"
-        })
-    elif avg_temp > 27:
-        recommendations.append({
-            "title": "Temperature Too High", 
-            "description": f"Temperature at {avg_temp:.1f}°C exceeds optimal range. Improve cooling or increase ventilation to prevent heat stress on plants.",
-            "type": "temperature"
-        })
-    
-    # HUMIDITY (45-70% optimal)
-    if humidity < 45:
-        recommendations.append({
-            "title": "Humidity Too Dry",
-            "description": f"Humidity at {humidity}% is critically low. Too dry - add shading to reduce evaporation. Close vents to retain moisture.",
-            "type": "humidity"
-        })
-    elif humidity > 80:
-        recommendations.append({
-            "title": "Humidity Critical High",
-            "description": f"Humidity at {humidity}% is dangerously high. Risk of fungal growth - run all ventilation and open vents immediately!",
-            "type": "humidity"
-        })
-    elif humidity > 70 and humidity <= 80:
-        recommendations.append({
-            "title": "Humidity Above Optimal",
-            "description": f"Humidity at {humidity}% is above ideal range. Open vents and increase fan speed to improve air circulation.",
-            "type": "humidity"
-        })
-    
-    # If everything is good, return positive message
-    if not recommendations:
-        recommendations.append({
-            "title": "✓ All Systems Normal",
-            "description": "All sensor readings are within optimal ranges. Greenhouse conditions are ideal for plant growth. Continue monitoring regularly.",
-            "type": "info"
-        })
-    
-    # Limit to 5 recommendations max (most critical first)
-    return recommendations[:5]
\ No newline at end of file
+    return build_recommendations(evaluate_reading(sensor_data, thresholds or {}))
@@ -0,0 +1,13 @@
+"""
+Gunicorn settings for the EcoView backend (read from the working directory,
+next to the Procfile).
+
+The APEX poller, MQTT ingest and site pollers keep their state in the server
+process, so the app runs as one worker (see Procfile) and that worker starts
+them once it has loaded the app.
+"""
+
+
+def post_worker_init(worker):
+    from app import start_background_services
+    start_background_services()
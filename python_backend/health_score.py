@@ -0,0 +1,47 @@
+"""
+Greenhouse health score for greenhouse monitoring system.
+The score starts at 100 and each component loses points according to its
+status (same penalties the PDF report has always used). Each component
+also gets a 0-100 sub-score: the share of its maximum penalty it avoided.
+
+The ingestion pipeline scores every new reading and stores the result in
+the history store, so /api/health-score serves a ready-made time series.
+"""
+
+# Points lost per component status; unlisted statuses lose nothing
+PENALTIES = {
+    "temperature": {"Critical": 30, "Acceptable": 10},
+    "humidity": {"Critical": 30, "Acceptable": 10},
+    "air_quality": {"Poor": 20, "Moderate": 10},
+    "light": {"Dark Night": 15, "Low Light": 15, "Dim Indoor": 5},
+}
+
+HEALTH_COMPONENTS = tuple(PENALTIES)
+
+
+def score_statuses(statuses):
+    """
+    Health score for one set of component statuses.
+
+    Args:
+        statuses (dict): component -> status string (e.g. {'temperature': 'Optimal'})
+
+    Returns:
+        tuple: (score 0-100, {component: sub-score 0-100})
+    """
+    score = 100
+    sub_scores = {}
+    for component, penalties in PENALTIES.items():
+        penalty = penalties.get(statuses.get(component, ""), 0)
+        score -= penalty
+        sub_scores[component] = round(100 * (1 - penalty / max(penalties.values())))
+    return max(0, min(100, score)), sub_scores
+
+
+def health_label(score):
+    """Label shown next to the score."""
+    if score >= 80:
+        return "EXCELLENT"
+    if score >= 60:
+        return "GOOD"
+    return "NEEDS ATTENTION"
@@ -0,0 +1,136 @@
+"""
+Bulk export of stored history for greenhouse monitoring system.
+Each format is a generator of byte chunks fed by HistoryStore.iter_readings,
+so /api/export streams months of readings with chunked transfer encoding
+while holding only one batch in memory:
+- csv: header row, then one line per reading
+- ndjson: one JSON object per line
+- parquet: one row group per batch (requires pyarrow)
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+EXPORT_BATCH_SIZE = 2000
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def export_chunks(store, fmt, start, end, columns):
+    """
+    Encoded export of the readings in [start, end).
+
+    Args:
+        store (HistoryStore): Source of the readings
+        fmt (str): Key of EXPORT_FORMATS
+        start (float): Range start (epoch seconds)
+        end (float): Range end (epoch seconds)
+        columns (tuple): Reading columns to include
+
+    Returns:
+        generator: bytes chunks (one per batch)
+    """
+    batches = store.iter_readings(start, end, columns, batch_size=EXPORT_BATCH_SIZE)
+    if fmt == "csv":
+        return _csv_chunks(batches, columns)
+    if fmt == "ndjson":
+        return _ndjson_chunks(batches, columns)
+    if fmt == "parquet":
+        return _parquet_chunks(batches, columns)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts).isoformat(timespec="seconds")
+
+
+def _csv_chunks(batches, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(("ts", "time") + tuple(columns))
+    for rows in batches:
+        for row in rows:
+            writer.writerow((row[0], _iso(row[0])) + tuple("" if v is None else v for v in row[1:]))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _ndjson_chunks(batches, columns):
+    keys = ("ts",) + tuple(columns)
+    for rows in batches:
+        lines = []
+        for row in rows:
+            record = dict(zip(keys, row))
+            record["time"] = _iso(row[0])
+            lines.append(json.dumps(record))
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to the generator."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        # Parquet footers store absolute offsets, so report the total written
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_chunks(batches, columns):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([("ts", pa.float64()), ("time", pa.timestamp("s"))]
+                       + [(c, pa.float64()) for c in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for rows in batches:
+            data = [[row[0] for row in rows], [datetime.fromtimestamp(row[0]) for row in rows]]
+            data += [[row[i] for row in rows] for i in range(1, len(columns) + 1)]
+            writer.write_table(pa.Table.from_arrays([pa.array(d, type=f.type) for d, f in zip(data, schema)],
+                                                    schema=schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
@@ -0,0 +1,380 @@
+"""
+Local reading, alert and health score history for greenhouse monitoring system.
+The APEX endpoint only returns a short window of recent readings; every
+reading the poller ingests (with its health score) and every alert event is
+also written here so period reports (day / week / month) and trends can be
+computed from stored data.
+
+Aggregation runs inside SQLite (GROUP BY buckets, SUM(CASE ...) for time in
+range), so a month report streams over the rows in the database instead
+of loading every raw reading into Python.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from health_score import HEALTH_COMPONENTS
+from reading_buffer import reading_device
+
+HISTORY_DB_PATH = os.getenv('HISTORY_DB_PATH') or os.path.join(os.path.dirname(__file__), 'history.db')
+HISTORY_RETENTION_DAYS = int(os.getenv('HISTORY_RETENTION_DAYS', '90'))
+
+# Stored reading columns (derived values, as produced by build_derived_from_reading)
+READING_COLUMNS = (
+    "temperature", "humidity", "soil_moisture", "light", "co2_level",
+    "mq135_drop", "mq2_drop", "mq7_drop", "pressure", "flame_detected",
+)
+
+PERIOD_DAYS = {"day": 1, "week": 7, "month": 30}
+
+# SQLite strftime format per aggregation bucket (local time)
+BUCKET_FORMATS = {"hour": "%Y-%m-%d %H:00", "day": "%Y-%m-%d"}
+
+_PRUNE_EVERY = 500  # inserts between retention clean-ups
+ALERT_WRITER_QUEUE_SIZE = 1000
+
+
+class HistoryStore:
+    """SQLite store of derived readings, alert events and health scores."""
+
+    def __init__(self, path=HISTORY_DB_PATH, retention_days=HISTORY_RETENTION_DAYS):
+        self.path = path
+        self.retention_days = retention_days
+        self._connection = None
+        self._connect_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._inserts = 0
+
+    @property
+    def _conn(self):
+        """The database connection, opened (and the schema created) on first use."""
+        if self._connection is None:
+            with self._connect_lock:
+                if self._connection is None:
+                    self._connection = self._open()
+        return self._connection
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            existing = [row[1] for row in conn.execute("PRAGMA table_info(readings)")]
+            if existing and "device" not in existing:
+                # Tables from before readings were keyed by device: keep the rows
+                conn.execute("ALTER TABLE readings RENAME TO readings_by_ts")
+            columns = ", ".join(f"{c} REAL" for c in READING_COLUMNS)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS readings "
+                         f"(ts REAL NOT NULL, device TEXT NOT NULL DEFAULT '', {columns}, PRIMARY KEY (ts, device))")
+            if existing and "device" not in existing:
+                kept = ", ".join(c for c in READING_COLUMNS if c in existing)
+                conn.execute(f"INSERT INTO readings (ts, {kept}) SELECT ts, {kept} FROM readings_by_ts")
+                conn.execute("DROP TABLE readings_by_ts")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS alert_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ts REAL NOT NULL,
+                    event TEXT NOT NULL,
+                    rule_id TEXT,
+                    sensor_type TEXT,
+                    severity TEXT,
+                    title TEXT,
+                    value REAL,
+                    site_id TEXT
+                )
+            """)
+            if "site_id" not in [row[1] for row in conn.execute("PRAGMA table_info(alert_events)")]:
+                conn.execute("ALTER TABLE alert_events ADD COLUMN site_id TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS alert_events_ts ON alert_events (ts)")
+            health_columns = ", ".join(f"{c} REAL" for c in HEALTH_COMPONENTS)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS health_scores (ts REAL PRIMARY KEY, score REAL, {health_columns})")
+        return conn
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def add_readings(self, readings):
+        """
+        Store derived readings (dicts with a numeric 'timestamp'); readings
+        already stored for the same timestamp and device are ignored.
+        """
+        rows = []
+        for r in readings:
+            try:
+                ts = float(r.get("timestamp"))
+            except (TypeError, ValueError):
+                continue
+            rows.append((ts, reading_device(r)) + tuple(_as_float(r.get(c)) for c in READING_COLUMNS))
+        if not rows:
+            return 0
+        placeholders = ", ".join("?" * (len(READING_COLUMNS) + 2))
+        with self._lock, self._conn:
+            cursor = self._conn.executemany(
+                f"INSERT OR IGNORE INTO readings (ts, device, {', '.join(READING_COLUMNS)}) VALUES ({placeholders})", rows
+            )
+            self._inserts += len(rows)
+            if self._inserts >= _PRUNE_EVERY:
+                self._inserts = 0
+                self._prune()
+        return cursor.rowcount
+
+    def add_alert_event(self, event):
+        """Store one alert engine event (raised / changed / cleared; site events carry site_id)."""
+        self.add_alert_events([event])
+
+    def add_alert_events(self, events):
+        """Store alert engine events in one transaction."""
+        rows = []
+        for event in events:
+            ts = _as_float(event.get("timestamp"))
+            rows.append((ts if ts is not None else time.time(), event.get("event"), event.get("rule_id"),
+                         event.get("sensor_type"), event.get("severity"), event.get("title"),
+                         _as_float(event.get("value")), event.get("site_id")))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO alert_events (ts, event, rule_id, sensor_type, severity, title, value, site_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def add_health_scores(self, scores):
+        """
+        Store per-reading health scores.
+
+        Args:
+            scores (list): (timestamp, score, {component: sub-score}) tuples
+        """
+        rows = [(float(ts), score) + tuple(sub_scores.get(c) for c in HEALTH_COMPONENTS)
+                for ts, score, sub_scores in scores]
+        if not rows:
+            return
+        placeholders = ", ".join("?" * (len(HEALTH_COMPONENTS) + 2))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO health_scores (ts, score, {', '.join(HEALTH_COMPONENTS)}) VALUES ({placeholders})", rows
+            )
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_days * 86400
+        self._conn.execute("DELETE FROM readings WHERE ts < ?", (cutoff,))
+        self._conn.execute("DELETE FROM alert_events WHERE ts < ?", (cutoff,))
+        self._conn.execute("DELETE FROM health_scores WHERE ts < ?", (cutoff,))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def data_version(self, start, end):
+        """(row count, newest ts) for a range - changes whenever new data lands in it."""
+        with self._lock:
+            return tuple(self._conn.execute(
+                "SELECT COUNT(*), MAX(ts) FROM readings WHERE ts >= ? AND ts < ?", (start, end)
+            ).fetchone())
+
+    def aggregate(self, start, end, bucket="day", columns=("temperature", "humidity", "soil_moisture", "co2_level")):
+        """
+        Per-bucket count plus avg / min / max of each column.
+
+        Returns:
+            list: [{'bucket': '2025-10-30', 'count': n, 'temperature': {'avg', 'min', 'max'}, ...}]
+        """
+        fmt = BUCKET_FORMATS[bucket]
+        selects = ", ".join(f"AVG({c}), MIN({c}), MAX({c})" for c in columns)
+        sql = (f"SELECT strftime('{fmt}', ts, 'unixepoch', 'localtime') AS bucket, COUNT(*), {selects} "
+               f"FROM readings WHERE ts >= ? AND ts < ? GROUP BY bucket ORDER BY bucket")
+        with self._lock:
+            rows = self._conn.execute(sql, (start, end)).fetchall()
+        result = []
+        for row in rows:
+            entry = {"bucket": row[0], "count": row[1]}
+            for i, c in enumerate(columns):
+                avg, lo, hi = row[2 + 3 * i: 5 + 3 * i]
+                entry[c] = {"avg": avg, "min": lo, "max": hi}
+            result.append(entry)
+        return result
+
+    def iter_readings(self, start, end, columns=READING_COLUMNS, batch_size=1000):
+        """
+        Yield batches of (ts, *columns) rows, oldest first.
+
+        Batches are fetched by keyset ((ts, device) > last key) so the store
+        lock is only held per batch and memory stays constant however long the
+        range is.
+        """
+        unknown = [c for c in columns if c not in READING_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown history column(s): {', '.join(unknown)}")
+        sql = (f"SELECT ts, device, {', '.join(columns)} FROM readings "
+               f"WHERE (ts, device) > (?, ?) AND ts < ? ORDER BY ts, device LIMIT ?")
+        # First batch includes start itself
+        last = (start - 1e-6, "")
+        while True:
+            with self._lock:
+                rows = self._conn.execute(sql, last + (end, batch_size)).fetchall()
+            if not rows:
+                return
+            yield [(row[0],) + tuple(row[2:]) for row in rows]
+            if len(rows) < batch_size:
+                return
+            last = (rows[-1][0], rows[-1][1])
+
+    def series(self, start, end, column, max_points=120):
+        """
+        Downsampled (ts, value) series for one column: the range is split into
+        max_points equal slices and each slice is averaged in SQLite.
+
+        Returns:
+            list: (timestamp, value) pairs, oldest first
+        """
+        if column not in READING_COLUMNS:
+            raise ValueError(f"Unknown history column: {column}")
+        return self._downsampled("readings", (column,), start, end, max_points)
+
+    def health_series(self, start, end, max_points=120):
+        """
+        Downsampled health scores, averaged per slice like series().
+
+        Returns:
+            list: (timestamp, score, {component: sub-score}) tuples, oldest first
+        """
+        rows = self._downsampled("health_scores", ("score",) + HEALTH_COMPONENTS, start, end, max_points)
+        return [(row[0], row[1], dict(zip(HEALTH_COMPONENTS, row[2:]))) for row in rows]
+
+    def _downsampled(self, table, columns, start, end, max_points):
+        step = max((end - start) / max_points, 1.0)
+        averages = ", ".join(f"AVG({c})" for c in columns)
+        sql = (f"SELECT AVG(ts), {averages} FROM {table} "
+               f"WHERE ts >= ? AND ts < ? AND {columns[0]} IS NOT NULL "
+               f"GROUP BY CAST((ts - ?) / ? AS INTEGER) ORDER BY 1")
+        with self._lock:
+            return [tuple(row) for row in self._conn.execute(sql, (start, end, start, step)).fetchall()]
+
+    def time_in_range(self, start, end, ranges):
+        """
+        Share of readings inside each sensor's optimal and acceptable band.
+        Readings arrive at a fixed poll interval, so the share of readings
+        approximates the share of time.
+
+        Args:
+            ranges (dict): column -> (optimal_min, optimal_max, acceptable_min, acceptable_max)
+
+        Returns:
+            dict: column -> {'samples', 'optimal_pct', 'acceptable_pct', 'outside_pct'}
+        """
+        if not ranges:
+            return {}
+        selects, params = [], []
+        for column, (opt_lo, opt_hi, acc_lo, acc_hi) in ranges.items():
+            selects.append(f"COUNT({column})")
+            selects.append(f"SUM(CASE WHEN {column} BETWEEN ? AND ? THEN 1 ELSE 0 END)")
+            selects.append(f"SUM(CASE WHEN {column} BETWEEN ? AND ? THEN 1 ELSE 0 END)")
+            params += [opt_lo, opt_hi, acc_lo, acc_hi]
+        sql = f"SELECT {', '.join(selects)} FROM readings WHERE ts >= ? AND ts < ?"
+        with self._lock:
+            row = self._conn.execute(sql, params + [start, end]).fetchone()
+        result = {}
+        for i, column in enumerate(ranges):
+            samples, optimal, acceptable = row[3 * i: 3 * i + 3]
+            optimal, acceptable = optimal or 0, acceptable or 0
+            if not samples:
+                result[column] = {"samples": 0, "optimal_pct": None, "acceptable_pct": None, "outside_pct": None}
+                continue
+            result[column] = {
+                "samples": samples,
+                "optimal_pct": round(100.0 * optimal / samples, 1),
+                # Acceptable band includes the optimal band
+                "acceptable_pct": round(100.0 * (acceptable - optimal) / samples, 1),
+                "outside_pct": round(100.0 * (samples - acceptable) / samples, 1),
+            }
+        return result
+
+    def alert_counts(self, start, end, site_id=None):
+        """
+        Alerts raised in the range ('raised' events; severity changes of an
+        alert that is already active are not counted again) for one site
+        (None: the primary greenhouse).
+
+        Returns:
+            dict: {'total', 'by_severity': {...}, 'by_sensor': {...}}
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT severity, sensor_type, COUNT(*) FROM alert_events "
+                "WHERE ts >= ? AND ts < ? AND event = 'raised' AND site_id IS ? GROUP BY severity, sensor_type",
+                (start, end, site_id),
+            ).fetchall()
+        counts = {"total": 0, "by_severity": {}, "by_sensor": {}}
+        for severity, sensor_type, n in rows:
+            counts["total"] += n
+            counts["by_severity"][severity] = counts["by_severity"].get(severity, 0) + n
+            counts["by_sensor"][sensor_type] = counts["by_sensor"].get(sensor_type, 0) + n
+        return counts
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class AlertEventWriter:
+    """
+    Alert bus sink that stores events in a HistoryStore from its own writer
+    thread, so publishing never waits on SQLite. The thread starts with the
+    first event; events queued together are written in one transaction.
+    """
+
+    def __init__(self, store, queue_size=ALERT_WRITER_QUEUE_SIZE):
+        self.store = store
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def __call__(self, event):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._writer, name="alert-history", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            print(f"⚠️ Alert history queue full, dropping event {event.get('id')}")
+
+    def _writer(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.store.add_alert_events(batch)
+            except Exception as e:
+                print(f"❌ Alert history write failed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def join(self):
+        """Block until every queued event has been written."""
+        self._queue.join()
+
+
+def period_range(period, now=None):
+    """(start, end) epoch seconds for 'day' / 'week' / 'month' ending now."""
+    end = now if now is not None else time.time()
+    return end - PERIOD_DAYS[period] * 86400, end
+
+
+def _as_float(value):
+    if isinstance(value, bool):
+        return 1.0 if value else 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
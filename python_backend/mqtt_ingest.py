@@ -0,0 +1,152 @@
+"""
+Optional MQTT ingestion for greenhouse monitoring system.
+The ESP32 publishes readings to an MQTT broker; the bridge scripts forward
+them to APEX and the backend polls APEX back. With MQTT_INGEST_HOST set,
+the backend also subscribes to the broker itself and feeds each message
+straight into the reading pipeline (normalize -> derive -> cache -> alerts),
+skipping the cloud round trip. APEX stays the archival source and the
+poller keeps running alongside.
+
+A pushed reading is matched to its APEX copy by (timestamp, device), so the
+device must send its own timestamp (any field in TIMESTAMP_KEYS, ISO text
+or epoch seconds / milliseconds). Readings without one are skipped and
+counted as 'no_timestamp' in the status; they still arrive through APEX.
+
+handle_payload() is the broker-independent entry point, so the pipeline can
+be driven by tests or an in-process broker stand-in without paho-mqtt.
+"""
+
+import json
+import os
+import threading
+import time
+
+from reading_normalize import extract_items, normalize_item
+
+
+class MqttIngest:
+    """Subscribes to the sensor topic and hands normalized readings to a callback."""
+
+    def __init__(self, on_readings, host=None, port=1883, topic="greenhouse/sensor_data",
+                 username=None, password=None, client_id="greenhouse-backend-ingest"):
+        """
+        Args:
+            on_readings (callable): Called with a list of normalized readings,
+                newest first, for every message that carried at least one
+            host (str): Broker host (None: no broker, handle_payload only)
+        """
+        self.on_readings = on_readings
+        self.host = host
+        self.port = port
+        self.topic = topic
+        self.username = username
+        self.password = password
+        self.client_id = client_id
+        self._client = None
+        self._lock = threading.Lock()
+        self._stats = {"messages": 0, "readings": 0, "errors": 0, "no_timestamp": 0,
+                       "connected": False, "last_message_at": None}
+
+    def handle_payload(self, payload, topic=None):
+        """
+        Decode one MQTT payload (JSON object, list or {"items": [...]}) and
+        pass its readings to on_readings.
+
+        Returns:
+            list: Normalized readings, newest first (empty if the payload was unusable)
+        """
+        try:
+            if isinstance(payload, (bytes, bytearray)):
+                payload = payload.decode("utf-8")
+            data = json.loads(payload) if isinstance(payload, str) else payload
+            items = [item for item in extract_items(data) if isinstance(item, dict)]
+            readings = [normalize_item(item, require_timestamp=True) for item in items]
+        except (UnicodeDecodeError, ValueError) as e:
+            with self._lock:
+                self._stats["errors"] += 1
+            print(f"⚠️ MQTT ingest: bad payload on {topic or self.topic}: {e}")
+            return []
+
+        skipped = readings.count(None)
+        if skipped:
+            readings = [r for r in readings if r is not None]
+            print(f"⚠️ MQTT ingest: skipped {skipped} reading(s) without a timestamp on {topic or self.topic}")
+        readings.sort(key=lambda r: r["_ts_num"], reverse=True)
+        with self._lock:
+            self._stats["no_timestamp"] += skipped
+            self._stats["messages"] += 1
+            self._stats["readings"] += len(readings)
+            self._stats["last_message_at"] = time.time()
+        if readings:
+            try:
+                self.on_readings(readings)
+            except Exception as e:
+                with self._lock:
+                    self._stats["errors"] += 1
+                print(f"⚠️ MQTT ingest: pipeline error: {e}")
+        return readings
+
+    def start(self):
+        """Connect to the broker and process messages on paho's network thread."""
+        import paho.mqtt.client as mqtt
+
+        client = mqtt.Client(client_id=self.client_id)
+        if self.username:
+            client.username_pw_set(self.username, self.password)
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+        client.on_message = lambda _client, _userdata, msg: self.handle_payload(msg.payload, msg.topic)
+        # connect_async + loop_start: paho keeps retrying if the broker is down at startup
+        client.connect_async(self.host, self.port, keepalive=60)
+        client.loop_start()
+        self._client = client
+        print(f"📡 MQTT ingest: subscribing to {self.topic} on {self.host}:{self.port}")
+
+    def stop(self):
+        if self._client is not None:
+            self._client.loop_stop()
+            self._client.disconnect()
+            self._client = None
+
+    def _on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            client.subscribe(self.topic, qos=1)
+            with self._lock:
+                self._stats["connected"] = True
+        else:
+            print(f"⚠️ MQTT ingest: broker refused connection (rc={rc})")
+
+    def _on_disconnect(self, client, userdata, rc):
+        with self._lock:
+            self._stats["connected"] = False
+
+    def status(self):
+        """Message counters for /api/health."""
+        with self._lock:
+            return {"broker": f"{self.host}:{self.port}", "topic": self.topic, **self._stats}
+
+
+def create_mqtt_ingest(on_readings):
+    """
+    MQTT ingestion configured from environment variables (MQTT_INGEST_*).
+
+    Returns:
+        MqttIngest: Started subscriber, or None if not configured / paho-mqtt missing
+    """
+    host = os.getenv('MQTT_INGEST_HOST', '')
+    if not host:
+        return None
+    ingest = MqttIngest(
+        on_readings,
+        host=host,
+        port=int(os.getenv('MQTT_INGEST_PORT', '1883')),
+        topic=os.getenv('MQTT_INGEST_TOPIC', 'greenhouse/sensor_data'),
+        username=os.getenv('MQTT_INGEST_USERNAME') or None,
+        password=os.getenv('MQTT_INGEST_PASSWORD') or None,
+    )
+    try:
+        ingest.start()
+    except ImportError:
+        print("⚠️ MQTT_INGEST_HOST set but paho-mqtt is not installed - MQTT ingestion disabled")
+        return None
+    return ingest
@@ -0,0 +1,373 @@
+"""
+Outbound alert notifications for greenhouse monitoring system.
+Alert events from the alert bus are delivered to pluggable sinks
+(webhook, SMTP e-mail, MQTT topic, local file):
+
+- Events are first written to an on-disk SQLite outbox, so nothing is lost
+  if a sink is down or the server restarts
+- Bursts are coalesced: events arriving within NOTIFY_BATCH_WINDOW seconds
+  go out as one batch (one POST / one e-mail)
+- Each sink has its own worker thread; failed batches are retried with
+  exponential backoff up to NOTIFY_MAX_ATTEMPTS, so a slow sink never
+  blocks ingestion, request handling or the other sinks
+"""
+
+import json
+import os
+import queue
+import smtplib
+import sqlite3
+import threading
+import time
+from email.message import EmailMessage
+
+import requests
+
+NOTIFY_DB_PATH = os.getenv('NOTIFY_DB_PATH', os.path.join(os.path.dirname(__file__), 'notifier_outbox.db'))
+NOTIFY_BATCH_WINDOW = float(os.getenv('NOTIFY_BATCH_WINDOW', '2'))
+NOTIFY_MAX_BATCH = int(os.getenv('NOTIFY_MAX_BATCH', '50'))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv('NOTIFY_MAX_ATTEMPTS', '8'))
+NOTIFY_RETRY_BASE_SECONDS = float(os.getenv('NOTIFY_RETRY_BASE_SECONDS', '5'))
+NOTIFY_RETRY_MAX_SECONDS = float(os.getenv('NOTIFY_RETRY_MAX_SECONDS', '600'))
+NOTIFY_INCOMING_QUEUE_SIZE = 1000
+
+# ============================================================================
+# SINKS
+# ============================================================================
+# A sink has a unique `name` and send(events) which raises on failure.
+
+
+class WebhookSink:
+    """POST {"events": [...]} as JSON to a URL."""
+
+    def __init__(self, url, timeout=5, name="webhook"):
+        self.name = name
+        self.url = url
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def send(self, events):
+        response = self._session.post(self.url, json={"events": events}, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class SmtpSink:
+    """One e-mail per batch."""
+
+    def __init__(self, host, port, sender, recipients, username=None, password=None,
+                 use_tls=True, timeout=10, name="smtp"):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = recipients
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+    def send(self, events):
+        message = EmailMessage()
+        titles = ", ".join(dict.fromkeys(e.get("title", "Alert") for e in events))
+        message["Subject"] = f"[Greenhouse] {len(events)} alert update(s): {titles}"
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.recipients)
+        message.set_content("\n".join(
+            f"[{e.get('event', 'alert')}] {e.get('title')}: {e.get('message')}" for e in events
+        ))
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+
+
+class MqttSink:
+    """Publish each event as JSON to an MQTT topic (requires paho-mqtt)."""
+
+    def __init__(self, host, port, topic, username=None, password=None, name="mqtt"):
+        import paho.mqtt.publish  # noqa: F401 - fail at startup, not on first alert
+        self.name = name
+        self.host = host
+        self.port = port
+        self.topic = topic
+        self.auth = {"username": username, "password": password} if username else None
+
+    def send(self, events):
+        import paho.mqtt.publish as publish
+        publish.multiple(
+            [{"topic": self.topic, "payload": json.dumps(e, default=str), "qos": 1} for e in events],
+            hostname=self.host, port=self.port, auth=self.auth,
+        )
+
+
+class FileSink:
+    """Append events as JSON lines to a local file."""
+
+    def __init__(self, path, name="file"):
+        self.name = name
+        self.path = path
+
+    def send(self, events):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps(event, default=str) + "\n")
+
+# ============================================================================
+# PERSISTENT OUTBOX
+# ============================================================================
+
+
+class Outbox:
+    """SQLite-backed queue of (sink, event) rows awaiting delivery."""
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    sink TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt REAL NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (sink, next_attempt)")
+
+    def add(self, sink_names, events):
+        now = time.time()
+        rows = [(sink, json.dumps(event, default=str), now, now) for event in events for sink in sink_names]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO outbox (sink, payload, next_attempt, created_at) VALUES (?, ?, ?, ?)", rows
+            )
+
+    def due(self, sink, limit):
+        """Oldest rows for a sink whose retry time has come: [(id, attempts, event)]."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, attempts, payload FROM outbox WHERE sink = ? AND next_attempt <= ? ORDER BY id LIMIT ?",
+                (sink, time.time(), limit),
+            ).fetchall()
+        return [(row_id, attempts, json.loads(payload)) for row_id, attempts, payload in rows]
+
+    def next_due_time(self, sink):
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(next_attempt) FROM outbox WHERE sink = ?", (sink,)).fetchone()
+        return row[0]
+
+    def delete(self, ids):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+
+    def reschedule(self, retries):
+        """Record a failed attempt for each row: retries is [(id, attempts, delay)]."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE outbox SET attempts = ?, next_attempt = ? WHERE id = ?",
+                [(attempts, now + delay, i) for i, attempts, delay in retries],
+            )
+
+    def make_due(self, sink=None):
+        """Make waiting rows (of one sink, or all) due now, keeping their attempt counts."""
+        with self._lock, self._conn:
+            if sink is None:
+                self._conn.execute("UPDATE outbox SET next_attempt = ?", (time.time(),))
+            else:
+                self._conn.execute("UPDATE outbox SET next_attempt = ? WHERE sink = ?", (time.time(), sink))
+
+    def count(self, sink=None):
+        with self._lock:
+            if sink is None:
+                return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM outbox WHERE sink = ?", (sink,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# ============================================================================
+# NOTIFIER
+# ============================================================================
+
+
+class Notifier:
+    """
+    Alert bus sink that batches events into the outbox and delivers them
+    to every configured sink from per-sink worker threads.
+
+    Calling the notifier with an event (what AlertBus.publish does) only
+    puts it on an in-memory queue; everything else happens in background
+    threads.
+    """
+
+    def __init__(self, sinks, db_path=NOTIFY_DB_PATH, batch_window=NOTIFY_BATCH_WINDOW,
+                 max_batch=NOTIFY_MAX_BATCH, max_attempts=NOTIFY_MAX_ATTEMPTS,
+                 retry_base=NOTIFY_RETRY_BASE_SECONDS, retry_max=NOTIFY_RETRY_MAX_SECONDS):
+        self.sinks = {sink.name: sink for sink in sinks}
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.outbox = Outbox(db_path)
+        self._incoming = queue.Queue(maxsize=NOTIFY_INCOMING_QUEUE_SIZE)
+        self._wakeups = {name: threading.Event() for name in self.sinks}
+        self._stopping = threading.Event()
+        self._stats = {name: {"sent": 0, "failed": 0, "dropped": 0} for name in self.sinks}
+        self._stats_lock = threading.Lock()
+
+        self._threads = [threading.Thread(target=self._batcher, name="notify-batcher", daemon=True)]
+        for name in self.sinks:
+            self._threads.append(threading.Thread(target=self._worker, args=(name,), name=f"notify-{name}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def __call__(self, event):
+        try:
+            self._incoming.put_nowait(event)
+        except queue.Full:
+            print(f"⚠️ Notifier queue full, dropping event {event.get('id')}")
+
+    # Collect events for up to batch_window seconds, then persist them in one transaction
+    def _batcher(self):
+        while not self._stopping.is_set():
+            try:
+                first = self._incoming.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._incoming.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.outbox.add(list(self.sinks), batch)
+            except Exception as e:
+                print(f"❌ Notifier outbox write failed: {e}")
+                continue
+            for wakeup in self._wakeups.values():
+                wakeup.set()
+
+    def _worker(self, name):
+        sink = self.sinks[name]
+        wakeup = self._wakeups[name]
+        while not self._stopping.is_set():
+            rows = self.outbox.due(name, self.max_batch)
+            if not rows:
+                next_due = self.outbox.next_due_time(name)
+                timeout = 5.0 if next_due is None else min(5.0, max(0.05, next_due - time.time()))
+                wakeup.wait(timeout)
+                wakeup.clear()
+                continue
+
+            ids = [row_id for row_id, _, _ in rows]
+            try:
+                sink.send([event for _, _, event in rows])
+            except Exception as e:
+                # Each row keeps its own attempt count, so an event that joined
+                # a batch of old retries isn't dropped with them
+                self._count(name, "failed", len(rows))
+                exhausted = [row_id for row_id, attempts, _ in rows if attempts + 1 >= self.max_attempts]
+                retries = [(row_id, attempts + 1, self._retry_delay(attempts + 1))
+                           for row_id, attempts, _ in rows if attempts + 1 < self.max_attempts]
+                if retries:
+                    first_retry = min(attempts for _, attempts, _ in retries)
+                    print(f"⚠️ Notifier {name} failed ({e}); retry {first_retry} in {self._retry_delay(first_retry):.0f}s")
+                    self.outbox.reschedule(retries)
+                if exhausted:
+                    print(f"❌ Notifier {name}: giving up on {len(exhausted)} event(s) after {self.max_attempts} attempts: {e}")
+                    self.outbox.delete(exhausted)
+                    self._count(name, "dropped", len(exhausted))
+                continue
+            self.outbox.delete(ids)
+            self._count(name, "sent", len(rows))
+
+    def _retry_delay(self, attempts):
+        return min(self.retry_max, self.retry_base * (2 ** (attempts - 1)))
+
+    def retry_now(self, sink=None):
+        """Retry pending events (of one sink, or all) now instead of after their backoff."""
+        self.outbox.make_due(sink)
+        for name, wakeup in self._wakeups.items():
+            if sink is None or name == sink:
+                wakeup.set()
+
+    def _count(self, name, key, n):
+        with self._stats_lock:
+            self._stats[name][key] += n
+
+    def status(self):
+        """Per-sink delivery counters and backlog size."""
+        with self._stats_lock:
+            stats = {name: dict(values) for name, values in self._stats.items()}
+        for name in stats:
+            stats[name]["pending"] = self.outbox.count(name)
+        return stats
+
+    def stop(self, timeout=2.0):
+        """Stop the background threads (events still in the outbox are kept)."""
+        self._stopping.set()
+        for wakeup in self._wakeups.values():
+            wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self.outbox.close()
+
+
+def create_notifier():
+    """
+    Notifier for the sinks configured in the environment, or None when no
+    sink is configured:
+
+    - ALERT_WEBHOOK_URL
+    - NOTIFY_SMTP_HOST / _PORT / _USER / _PASSWORD / _FROM, NOTIFY_EMAIL_TO (comma separated)
+    - NOTIFY_MQTT_HOST / _PORT / _TOPIC
+    - NOTIFY_FILE
+    """
+    sinks = []
+    webhook_url = os.getenv('ALERT_WEBHOOK_URL', '')
+    if webhook_url:
+        sinks.append(WebhookSink(webhook_url, timeout=float(os.getenv('ALERT_WEBHOOK_TIMEOUT', '5'))))
+
+    smtp_host = os.getenv('NOTIFY_SMTP_HOST', '')
+    recipients = [r.strip() for r in os.getenv('NOTIFY_EMAIL_TO', '').split(',') if r.strip()]
+    if smtp_host and recipients:
+        sinks.append(SmtpSink(
+            smtp_host, int(os.getenv('NOTIFY_SMTP_PORT', '587')),
+            os.getenv('NOTIFY_SMTP_FROM', os.getenv('NOTIFY_SMTP_USER', 'greenhouse@localhost')),
+            recipients,
+            username=os.getenv('NOTIFY_SMTP_USER') or None,
+            password=os.getenv('NOTIFY_SMTP_PASSWORD') or None,
+            use_tls=os.getenv('NOTIFY_SMTP_TLS', 'true').lower() == 'true',
+        ))
+
+    mqtt_host = os.getenv('NOTIFY_MQTT_HOST', '')
+    if mqtt_host:
+        try:
+            sinks.append(MqttSink(mqtt_host, int(os.getenv('NOTIFY_MQTT_PORT', '1883')),
+                                  os.getenv('NOTIFY_MQTT_TOPIC', 'greenhouse/alerts'),
+                                  username=os.getenv('NOTIFY_MQTT_USER') or None,
+                                  password=os.getenv('NOTIFY_MQTT_PASSWORD') or None))
+        except ImportError:
+            print("⚠️ NOTIFY_MQTT_HOST set but paho-mqtt is not installed - MQTT notifications disabled")
+
+    file_path = os.getenv('NOTIFY_FILE', '')
+    if file_path:
+        sinks.append(FileSink(file_path))
+
+    if not sinks:
+        return None
+    print(f"📣 Alert notifier started: {', '.join(s.name for s in sinks)}")
+    return Notifier(sinks)
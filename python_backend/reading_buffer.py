@@ -0,0 +1,97 @@
+"""
+Deduplicating, time-ordered reading buffer for greenhouse monitoring system.
+Every ingestion path (APEX polls, MQTT pushes, retried bridge POSTs) merges
+into one buffer instead of replacing the cache wholesale:
+- readings are keyed by (timestamp, device); an exact duplicate is found by
+  binary search (O(log n)) and dropped
+- late readings are inserted at their sorted position, as long as they are
+  within the reorder window of the newest reading buffered before the merge
+  (a batch may backfill freely); older ones are dropped
+- the buffer keeps the newest max_size readings; evicted timestamps are not
+  accepted again, so a source re-sending its window can't duplicate them
+"""
+
+import threading
+from bisect import bisect_left
+
+# Fields that identify the sending device, in order of preference
+DEVICE_KEYS = ("device_id", "device", "node_id")
+
+READING_BUFFER_SIZE = 200
+REORDER_WINDOW_SECONDS = 300
+
+
+def reading_device(reading):
+    """Sending device of a reading ('' when it carries none)."""
+    for field in DEVICE_KEYS:
+        if reading.get(field) is not None:
+            return str(reading[field])
+    return ""
+
+
+def reading_key(reading):
+    """(timestamp, device) key of a normalized reading."""
+    return (float(reading.get("_ts_num", 0)), reading_device(reading))
+
+
+class ReadingBuffer:
+    """Sorted (oldest first) buffer of unique readings."""
+
+    def __init__(self, max_size=READING_BUFFER_SIZE, reorder_window=REORDER_WINDOW_SECONDS):
+        self.max_size = max_size
+        self.reorder_window = reorder_window
+        self._keys = []       # sorted reading keys
+        self._readings = []   # readings, same order as _keys
+        self._lock = threading.Lock()
+        self._evicted_until = float("-inf")   # newest evicted timestamp
+        self.stats = {"added": 0, "duplicates": 0, "too_late": 0}
+
+    def merge(self, readings):
+        """
+        Merge readings in any order.
+
+        Returns:
+            list: The readings that were new, newest first
+        """
+        added = []
+        with self._lock:
+            horizon = self._evicted_until
+            if self._keys:
+                horizon = max(horizon, self._keys[-1][0] - self.reorder_window)
+            for reading in readings:
+                key = reading_key(reading)
+                i = bisect_left(self._keys, key)
+                if i < len(self._keys) and self._keys[i] == key:
+                    self.stats["duplicates"] += 1
+                    continue
+                if key[0] <= horizon:
+                    self.stats["too_late"] += 1
+                    continue
+                self._keys.insert(i, key)
+                self._readings.insert(i, reading)
+                added.append(reading)
+            self.stats["added"] += len(added)
+            overflow = len(self._keys) - self.max_size
+            if overflow > 0:
+                evicted = {id(r) for r in self._readings[:overflow]}
+                self._evicted_until = max(self._evicted_until, self._keys[overflow - 1][0])
+                del self._keys[:overflow]
+                del self._readings[:overflow]
+                added = [r for r in added if id(r) not in evicted]
+        added.sort(key=lambda r: r.get("_ts_num", 0), reverse=True)
+        return added
+
+    def newest_first(self, limit=None):
+        """Snapshot of the buffered readings, newest first."""
+        with self._lock:
+            readings = self._readings[-limit:] if limit else self._readings[:]
+        readings.reverse()
+        return readings
+
+    def latest(self):
+        with self._lock:
+            return self._readings[-1] if self._readings else None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._readings)
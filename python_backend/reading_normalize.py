@@ -0,0 +1,101 @@
+"""
+Reading normalization for greenhouse monitoring system.
+Shared by every ingestion path (APEX polling in app.py, MQTT in
+mqtt_ingest.py) so a reading looks the same whichever way it arrived:
+- extract_items: accept {"items": [...]}, [...] or a single object
+- normalize_item: copy of the reading with a numeric 'timestamp' / '_ts_num'
+  parsed from whichever timestamp field the source uses
+"""
+
+import re
+import time
+from datetime import datetime
+
+# Timestamp fields used by the different APEX endpoints / device payloads, in order
+TIMESTAMP_KEYS = ("timestamp_reading", "corrected_created_at", "created_at", "ts", "time", "timestamp", "epoch")
+
+
+def extract_items(data):
+    """
+    List of reading dicts from a decoded JSON payload.
+
+    Returns:
+        list: Readings (empty for unsupported shapes)
+    """
+    if isinstance(data, dict) and "items" in data and isinstance(data["items"], list):
+        return data["items"]
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        # single-object payload -> wrap
+        return [data]
+    return []
+
+
+def parse_timestamp(value):
+    """
+    Epoch seconds from a source timestamp, or None if it can't be parsed.
+
+    Handles ISO style ("2025-10-29T15:21:22.971802Z", with or without
+    microseconds), the APEX groups style ("30-OCT-2025 15:02:22", possibly
+    split over lines), numeric epochs in seconds or milliseconds and strings
+    containing an epoch.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = float(value)
+        return value / 1000.0 if value > 1e11 else value
+    # Normalize whitespace/newlines produced by some HTML/JSON renderings
+    text = " ".join(str(value).split())
+    for fmt in ("%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S"):
+        try:
+            return datetime.strptime(text.replace('Z', ''), fmt).timestamp()
+        except ValueError:
+            pass
+    try:
+        # Month abbreviation must be upper-case (e.g. OCT); drop commas
+        return datetime.strptime(text.upper().replace(',', ''), "%d-%b-%Y %H:%M:%S").timestamp()
+    except ValueError:
+        pass
+    # Last resort: any integer-like epoch in the string
+    m = re.search(r"(1[0-9]{9}|2[0-9]{9})", text)
+    if m:
+        return float(m.group(0))
+    return None
+
+
+def normalize_item(item, idx=0, require_timestamp=False):
+    """
+    Normalized copy of one reading.
+
+    Args:
+        item (dict): Reading as received
+        idx (int): Position in its batch; readings without a usable
+            timestamp are spaced 10 s apart from the pull time by position
+        require_timestamp (bool): Return None instead for a reading without
+            a usable timestamp (a receive time would never match the same
+            reading arriving by another path, so it would be stored twice)
+
+    Returns:
+        dict: Copy with numeric 'timestamp', '_ts_num' and '_pull_time'
+    """
+    normalized = dict(item)
+    raw_ts = ""
+    for key in TIMESTAMP_KEYS:
+        raw_ts = item.get(key, "")
+        if raw_ts:
+            break
+
+    ts = None
+    if raw_ts:
+        ts = parse_timestamp(raw_ts)
+        if ts is None and not require_timestamp:
+            print(f"Failed to parse timestamp '{raw_ts}'; using pull-time fallback")
+    if ts is None:
+        if require_timestamp:
+            return None
+        ts = time.time() - (idx * 10)
+
+    normalized["timestamp"] = ts
+    normalized["_ts_num"] = ts
+    normalized["_pull_time"] = time.time()  # Track when we pulled this data
+    return normalized
@@ -0,0 +1,171 @@
+"""
+PDF report cache and background generation for greenhouse monitoring system.
+Reports are keyed by the data they are built from (latest reading +
+thresholds version), so every request for the same data version is served
+the same PDF bytes:
+
+- ReportCache: finished PDFs on disk with least-recently-used eviction
+- ReportJobs: bounded worker pool building reports in the background; a
+  second request for a report that is already being built joins that job
+  instead of starting another one
+"""
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+REPORT_CACHE_DIR = os.getenv('REPORT_CACHE_DIR') or os.path.join(os.path.dirname(__file__), 'report_cache')
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv('REPORT_CACHE_MAX_ENTRIES', '20'))
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', '2'))
+REPORT_JOB_RETENTION_SECONDS = 3600
+
+
+def report_key(*parts):
+    """Cache key (hex) for the given data version parts."""
+    payload = "|".join(str(p) for p in parts)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:20]
+
+
+class ReportCache:
+    """On-disk LRU of finished report PDFs (one file per key)."""
+
+    def __init__(self, directory=REPORT_CACHE_DIR, max_entries=REPORT_CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Rebuild recency order from file modification times; the directory
+        # itself is only created by the first put()
+        files = [f for f in os.listdir(directory) if f.endswith('.pdf')] if os.path.isdir(directory) else []
+        files.sort(key=lambda f: os.path.getmtime(os.path.join(directory, f)))
+        self._entries = OrderedDict((f[:-4], True) for f in files)
+        self._evict()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key):
+        """PDF bytes for key, or None. Marks the entry as recently used."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+            os.utime(self._path(key))
+            return data
+        except OSError:
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+
+    def put(self, key, data):
+        """Store PDF bytes (written atomically) and evict the oldest entries."""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self._path(key)}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._entries[key] = True
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+
+class ReportJobs:
+    """Background report builds, de-duplicated per cache key."""
+
+    def __init__(self, cache, max_workers=REPORT_WORKERS):
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report")
+        self._jobs = {}        # job id -> job dict
+        self._by_key = {}      # cache key -> job id of the pending/running build
+        self._lock = threading.Lock()
+
+    def submit(self, key, build):
+        """
+        Start building the report for key unless a build is already running.
+
+        Args:
+            key (str): Report cache key
+            build (callable): Returns the PDF bytes
+
+        Returns:
+            dict: Job snapshot (id, status, key, ...)
+        """
+        with self._lock:
+            self._prune()
+            job_id = self._by_key.get(key)
+            if job_id is not None:
+                return self._snapshot(self._jobs[job_id])
+            job_id = uuid.uuid4().hex[:12]
+            job = {"id": job_id, "key": key, "status": "pending", "error": None,
+                   "created_at": time.time(), "finished_at": None}
+            self._jobs[job_id] = job
+            self._by_key[key] = job_id
+            job["_future"] = self._executor.submit(self._run, job_id, build)
+            return self._snapshot(job)
+
+    def _run(self, job_id, build):
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = "running"
+        try:
+            data = build()
+            self.cache.put(job["key"], data)
+            status, error = "done", None
+        except Exception as e:
+            data, status, error = None, "failed", str(e)
+        with self._lock:
+            job["status"], job["error"], job["finished_at"] = status, error, time.time()
+            self._by_key.pop(job["key"], None)
+        return data
+
+    def get(self, job_id):
+        """Job snapshot or None."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def wait(self, job_id, timeout):
+        """
+        Wait for a job to finish.
+
+        Returns:
+            bytes: PDF bytes, or None if the job failed or is still running after timeout
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            future = job.get("_future") if job else None
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=timeout)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _snapshot(job):
+        return {k: v for k, v in job.items() if not k.startswith("_")}
+
+    def _prune(self):
+        cutoff = time.time() - REPORT_JOB_RETENTION_SECONDS
+        for job_id in [j for j, job in self._jobs.items()
+                       if job["finished_at"] is not None and job["finished_at"] < cutoff]:
+            del self._jobs[job_id]
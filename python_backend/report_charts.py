@@ -0,0 +1,149 @@
+"""
+Trend charts for greenhouse PDF reports.
+Charts are drawn with ReportLab's own graphics (LinePlot) from downsampled
+series, so a chart costs the same whether it covers 50 readings or a month
+of history:
+- downsample: bucket means of (timestamp, value) points, at most max_points
+- trend_chart: line plot with the optimal band, expanded to plain shapes once
+- ChartCache: finished drawings per (sensor, period, data version); reports
+  for the same data reuse them instead of redrawing
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from reportlab.graphics.charts.lineplots import LinePlot
+from reportlab.graphics.shapes import Drawing, Group, Rect, String, UserNode
+from reportlab.lib import colors
+
+CHART_MAX_POINTS = 120
+CHART_CACHE_MAX_ENTRIES = 64
+
+LINE_COLOR = colors.HexColor('#2E7D32')
+BAND_COLOR = colors.HexColor('#E8F5E9')
+GRID_COLOR = colors.HexColor('#E0E0E0')
+
+
+def downsample(points, max_points=CHART_MAX_POINTS):
+    """
+    Reduce (ts, value) points to at most max_points bucket means.
+
+    Args:
+        points (list): (timestamp, value) pairs; None values are skipped
+        max_points (int): Upper bound on returned points
+
+    Returns:
+        list: (timestamp, value) pairs sorted by timestamp
+    """
+    points = sorted((ts, v) for ts, v in points if ts is not None and v is not None)
+    if len(points) <= max_points:
+        return points
+    start, end = points[0][0], points[-1][0]
+    step = (end - start) / max_points or 1
+    buckets = OrderedDict()
+    for ts, v in points:
+        index = min(int((ts - start) / step), max_points - 1)
+        sums = buckets.setdefault(index, [0.0, 0.0, 0])
+        sums[0] += ts
+        sums[1] += v
+        sums[2] += 1
+    return [(ts_sum / n, v_sum / n) for ts_sum, v_sum, n in buckets.values()]
+
+
+def trend_chart(points, unit, band=None, time_format='%m/%d %H:%M', width=460, height=150):
+    """
+    Line chart of a downsampled series.
+
+    Args:
+        points (list): (timestamp, value) pairs, oldest first
+        unit (str): Y axis unit label
+        band (tuple): Optional (low, high) optimal band shaded behind the line
+        time_format (str): strftime format for X axis labels
+
+    Returns:
+        Drawing: Chart drawing (or a "no data" placeholder)
+    """
+    drawing = Drawing(width, height)
+    if len(points) < 2:
+        drawing.add(String(width / 2, height / 2, "Not enough data for a trend chart",
+                           textAnchor='middle', fontSize=9, fillColor=colors.grey))
+        return drawing
+
+    values = [v for _, v in points]
+    y_min, y_max = min(values), max(values)
+    if band is not None:
+        y_min, y_max = min(y_min, band[0]), max(y_max, band[1])
+    pad = (y_max - y_min) * 0.1 or 1
+    y_min, y_max = y_min - pad, y_max + pad
+
+    plot = LinePlot()
+    plot.x, plot.y = 45, 25
+    plot.width, plot.height = width - 60, height - 40
+    plot.data = [list(points)]
+    plot.lines[0].strokeColor = LINE_COLOR
+    plot.lines[0].strokeWidth = 1.5
+    plot.xValueAxis.valueMin = points[0][0]
+    plot.xValueAxis.valueMax = points[-1][0]
+    plot.xValueAxis.valueSteps = [points[0][0] + (points[-1][0] - points[0][0]) * i / 4 for i in range(5)]
+    plot.xValueAxis.labelTextFormat = lambda ts: datetime.fromtimestamp(ts).strftime(time_format)
+    plot.xValueAxis.labels.fontSize = 7
+    plot.yValueAxis.valueMin = y_min
+    plot.yValueAxis.valueMax = y_max
+    plot.yValueAxis.labels.fontSize = 7
+    plot.yValueAxis.visibleGrid = True
+    plot.yValueAxis.gridStrokeColor = GRID_COLOR
+
+    if band is not None:
+        scale = plot.height / (y_max - y_min)
+        drawing.add(Rect(plot.x, plot.y + (band[0] - y_min) * scale, plot.width,
+                         (band[1] - band[0]) * scale, fillColor=BAND_COLOR, strokeColor=None))
+    drawing.add(plot)
+    drawing.add(String(8, height - 10, unit, fontSize=7, fillColor=colors.grey))
+    # Expand the widgets to plain shapes once so cached charts render without
+    # re-running the axis/scale layout for every report
+    return _expand(drawing)
+
+
+def _expand(node):
+    """Replace widgets (user nodes) by the shapes they draw, recursively."""
+    while isinstance(node, UserNode):
+        node = node.provideNode()
+    if isinstance(node, Group):
+        node.contents = [_expand(child) for child in node.contents]
+    return node
+
+
+class ChartCache:
+    """LRU of finished chart drawings keyed by (sensor, period, data version)."""
+
+    def __init__(self, max_entries=CHART_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """
+        Cached drawing for key, building it with build() on a miss.
+
+        Returns:
+            Drawing: A per-document deep copy (the renderer attaches canvas and
+            parent state to every shape while drawing, so concurrent reports
+            must not share one)
+        """
+        with self._lock:
+            drawing = self._entries.get(key)
+            if drawing is not None:
+                self._entries.move_to_end(key)
+        if drawing is None:
+            drawing = build()
+            with self._lock:
+                self._entries[key] = drawing
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return copy.deepcopy(drawing)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
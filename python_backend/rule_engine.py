@@ -0,0 +1,572 @@
+"""
+Threshold rule engine for greenhouse monitoring system.
+Alerts (/api/alerts), fallback recommendations and the PDF alert summary
+are all produced from the same declarative rule table evaluated against
+the editable thresholds from thresholds.json.
+
+Rules are plain data. They are compiled once per thresholds version into a
+flat evaluation table (threshold values resolved, comparison chosen), and a
+reading is evaluated in one pass whose result is memoised, so the three
+consumers share a single evaluation per reading.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+# ============================================================================
+# RULE DEFINITIONS
+# ============================================================================
+# Rules are grouped by sensor; within a group the first matching rule wins
+# (most severe band first), so each sensor yields at most one result.
+#
+#   field      - key in the derived reading (build_derived_from_reading output)
+#   op         - '>' / '<' against `threshold`, or 'truthy'
+#   threshold  - path into thresholds.json plus the default used when missing
+#   severity   - alert severity (critical / high / medium / low)
+#   level      - PDF alert summary level (CRITICAL / WARNING / INFO)
+#   safety     - fire/gas rules that must be evaluated without delay
+#   alert / recommendation / summary - text templates; they may use {value},
+#     {threshold} and any resolved threshold name such as {temperature_optimal_min}
+
+RULES = [
+    # --- CRITICAL SAFETY ---
+    {
+        "id": "flame_detected", "group": "flame", "sensor_type": "flame",
+        "field": "flame_detected", "op": "truthy",
+        "severity": "critical", "level": "CRITICAL", "sound": True, "safety": True,
+        "unit": "raw", "value_field": "flame_raw",
+        "alert": {"title": "🔥 FIRE HAZARD",
+                  "message": "Flame or strong IR source detected. Inspect all heating equipment immediately!"},
+        "recommendation": {"title": "🔥 Flame Detected", "type": "danger",
+                           "description": "Infrared source detected in greenhouse. Immediately inspect all heating equipment, electrical systems, and open flames. Ensure fire extinguisher is accessible."},
+        "summary": {"type": "FIRE", "message": "⚠️ FIRE DETECTED"},
+    },
+    {
+        "id": "mq7_high", "group": "mq7", "sensor_type": "carbon_monoxide",
+        "field": "mq7_drop", "op": ">", "threshold": ("mq7", "high", 750),
+        "severity": "critical", "level": "CRITICAL", "sound": True, "safety": True, "unit": "ppm",
+        "alert": {"title": "⚠️ CO CRITICAL",
+                  "message": "Carbon monoxide at {value:.0f} ppm exceeds safe levels (>{threshold}). Ventilate immediately!"},
+        "recommendation": {"title": "⚠️ CO High", "type": "danger",
+                           "description": "Carbon monoxide at {value:.0f} ppm exceeds safe levels (>{threshold}). Check all combustion equipment and increase ventilation immediately to prevent health hazards."},
+        "summary": {"type": "Carbon Monoxide", "message": "High CO: {value:.0f} PPM"},
+    },
+    {
+        "id": "mq7_elevated", "group": "mq7", "sensor_type": "carbon_monoxide",
+        "field": "mq7_drop", "op": ">", "threshold": ("mq7", "safe", 300),
+        "severity": "high", "level": "WARNING", "sound": True, "safety": True, "unit": "ppm",
+        "alert": {"title": "CO Elevated",
+                  "message": "Carbon monoxide at {value:.0f} ppm. Monitor heating equipment closely."},
+        "recommendation": {"title": "CO Elevated", "type": "warning",
+                           "description": "Carbon monoxide elevated at {value:.0f} ppm. Monitor heating equipment closely and ensure proper ventilation is maintained."},
+        "summary": {"type": "Carbon Monoxide", "message": "Elevated CO: {value:.0f} PPM"},
+    },
+    {
+        "id": "mq2_high", "group": "mq2", "sensor_type": "flammable_gas",
+        "field": "mq2_drop", "op": ">", "threshold": ("mq2", "high", 750),
+        "severity": "critical", "level": "CRITICAL", "sound": True, "safety": True, "unit": "ppm",
+        "alert": {"title": "⚠️ GAS CRITICAL",
+                  "message": "Flammable gas at {value:.0f} ppm (>{threshold}). Check for leaks immediately!"},
+        "recommendation": {"title": "⚠️ Flammable Gas High", "type": "danger",
+                           "description": "Flammable gas detected at {value:.0f} ppm (>{threshold} threshold). Inspect for gas leaks, check fuel lines, and increase ventilation to reduce fire risk."},
+        "summary": {"type": "Flammable Gas", "message": "High gas level: {value:.0f} PPM"},
+    },
+    {
+        "id": "mq2_elevated", "group": "mq2", "sensor_type": "flammable_gas",
+        "field": "mq2_drop", "op": ">", "threshold": ("mq2", "safe", 300),
+        "severity": "high", "level": "WARNING", "sound": True, "safety": True, "unit": "ppm",
+        "alert": {"title": "Gas Elevated",
+                  "message": "Flammable gas at {value:.0f} ppm. Increase ventilation."},
+        "recommendation": {"title": "Gas Levels Elevated", "type": "warning",
+                           "description": "Flammable gas at {value:.0f} ppm. Increase air circulation and monitor levels. Check for any potential leak sources."},
+        "summary": {"type": "Flammable Gas", "message": "Elevated gas: {value:.0f} PPM"},
+    },
+    # --- ENVIRONMENTAL ---
+    {
+        "id": "temperature_critical_low", "group": "temperature", "sensor_type": "temperature",
+        "field": "temperature", "op": "<", "threshold": ("temperature.acceptable", "min", 18),
+        "severity": "high", "level": "CRITICAL", "sound": True, "unit": "°C",
+        "alert": {"title": "Temperature Critical Low",
+                  "message": "Temperature at {value:.1f}°C is critically low (<{threshold}°C). Plants may suffer cold damage."},
+        "recommendation": {"title": "Temperature Too Low", "type": "temperature",
+                           "description": "Current temperature is {value:.1f}°C. Increase heating to reach optimal range of {temperature_optimal_min}-{temperature_optimal_max}°C for healthy plant metabolism and growth."},
+        "summary": {"type": "Temperature", "message": "Temperature too low: {value:.1f}°C"},
+    },
+    {
+        "id": "temperature_critical_high", "group": "temperature", "sensor_type": "temperature",
+        "field": "temperature", "op": ">", "threshold": ("temperature.acceptable", "max", 30),
+        "severity": "high", "level": "CRITICAL", "sound": True, "unit": "°C",
+        "alert": {"title": "Temperature Critical High",
+                  "message": "Temperature at {value:.1f}°C is dangerously high (>{threshold}°C). Risk of heat stress."},
+        "recommendation": {"title": "Temperature Too High", "type": "temperature",
+                           "description": "Temperature at {value:.1f}°C exceeds optimal range. Improve cooling or increase ventilation to prevent heat stress on plants."},
+        "summary": {"type": "Temperature", "message": "Temperature too high: {value:.1f}°C"},
+    },
+    {
+        "id": "temperature_low", "group": "temperature", "sensor_type": "temperature",
+        "field": "temperature", "op": "<", "threshold": ("temperature.optimal", "min", 20),
+        "severity": "medium", "level": "WARNING", "sound": False, "unit": "°C",
+        "alert": {"title": "Temperature Outside Optimal",
+                  "message": "Temperature at {value:.1f}°C is outside optimal range ({temperature_optimal_min}-{temperature_optimal_max}°C)."},
+        "recommendation": {"title": "Temperature Too Low", "type": "temperature",
+                           "description": "Current temperature is {value:.1f}°C. Increase heating to reach optimal range of {temperature_optimal_min}-{temperature_optimal_max}°C for healthy plant metabolism and growth."},
+        "summary": {"type": "Temperature", "message": "Temperature suboptimal: {value:.1f}°C"},
+    },
+    {
+        "id": "temperature_high", "group": "temperature", "sensor_type": "temperature",
+        "field": "temperature", "op": ">", "threshold": ("temperature.optimal", "max", 27),
+        "severity": "medium", "level": "WARNING", "sound": False, "unit": "°C",
+        "alert": {"title": "Temperature Outside Optimal",
+                  "message": "Temperature at {value:.1f}°C is outside optimal range ({temperature_optimal_min}-{temperature_optimal_max}°C)."},
+        "recommendation": {"title": "Temperature Too High", "type": "temperature",
+                           "description": "Temperature at {value:.1f}°C exceeds optimal range. Improve cooling or increase ventilation to prevent heat stress on plants."},
+        "summary": {"type": "Temperature", "message": "Temperature suboptimal: {value:.1f}°C"},
+    },
+    {
+        "id": "humidity_critical_low", "group": "humidity", "sensor_type": "humidity",
+        "field": "humidity", "op": "<", "threshold": ("humidity.acceptable", "min", 40),
+        "severity": "high", "level": "CRITICAL", "sound": True, "unit": "%",
+        "alert": {"title": "Humidity Critical Low",
+                  "message": "Humidity at {value}% is critically low (<{threshold}%). Too dry - recommend shading to reduce evaporation."},
+        "recommendation": {"title": "Humidity Too Dry", "type": "humidity",
+                           "description": "Humidity at {value}% is critically low. Too dry - add shading to reduce evaporation. Close vents to retain moisture."},
+        "summary": {"type": "Humidity", "message": "Too dry: {value}% - Add shading"},
+    },
+    {
+        "id": "humidity_critical_high", "group": "humidity", "sensor_type": "humidity",
+        "field": "humidity", "op": ">", "threshold": ("humidity.acceptable", "max", 80),
+        "severity": "high", "level": "CRITICAL", "sound": True, "unit": "%",
+        "alert": {"title": "Humidity Critical High",
+                  "message": "Humidity at {value}% is dangerously high (>{threshold}%). Risk of fungal growth - run all ventilation and open vents!"},
+        "recommendation": {"title": "Humidity Critical High", "type": "humidity",
+                           "description": "Humidity at {value}% is dangerously high. Risk of fungal growth - run all ventilation and open vents immediately!"},
+        "summary": {"type": "Humidity", "message": "Too humid: {value}% - Run ventilation"},
+    },
+    {
+        "id": "humidity_low", "group": "humidity", "sensor_type": "humidity",
+        "field": "humidity", "op": "<", "threshold": ("humidity.optimal", "min", 45),
+        "severity": "medium", "level": "WARNING", "sound": False, "unit": "%",
+        "alert": {"title": "Humidity Outside Optimal",
+                  "message": "Humidity at {value}% is outside optimal range ({humidity_optimal_min}-{humidity_optimal_max}%). Adjust vents/fans."},
+        "recommendation": {"title": "Humidity Below Optimal", "type": "humidity",
+                           "description": "Humidity at {value}% is below ideal range. Too dry - add shading to reduce evaporation and close vents to retain moisture."},
+        "summary": {"type": "Humidity", "message": "Slightly low: {value}%"},
+    },
+    {
+        "id": "humidity_high", "group": "humidity", "sensor_type": "humidity",
+        "field": "humidity", "op": ">", "threshold": ("humidity.optimal", "max", 70),
+        "severity": "medium", "level": "WARNING", "sound": False, "unit": "%",
+        "alert": {"title": "Humidity Outside Optimal",
+                  "message": "Humidity at {value}% is outside optimal range ({humidity_optimal_min}-{humidity_optimal_max}%). Adjust vents/fans."},
+        "recommendation": {"title": "Humidity Above Optimal", "type": "humidity",
+                           "description": "Humidity at {value}% is above ideal range. Open vents and increase fan speed to improve air circulation."},
+        "summary": {"type": "Humidity", "message": "Slightly high: {value}%"},
+    },
+    {
+        "id": "air_quality_poor", "group": "mq135", "sensor_type": "air_quality",
+        "field": "mq135_drop", "op": ">", "threshold": ("mq135", "poor", 500),
+        "severity": "medium", "level": "WARNING", "sound": True, "unit": "ppm",
+        "alert": {"title": "Air Quality Poor",
+                  "message": "Air quality at {value:.0f} ppm indicates poor conditions (>{threshold}). Increase ventilation."},
+        "recommendation": {"title": "Poor Air Quality", "type": "warning",
+                           "description": "Air quality reading at {value:.0f} ppm indicates poor conditions (>{threshold}). Increase ventilation to improve air circulation and plant health."},
+        "summary": {"type": "Air Quality", "message": "Poor air quality: {value:.0f} PPM"},
+    },
+    {
+        "id": "air_quality_moderate", "group": "mq135", "sensor_type": "air_quality",
+        "field": "mq135_drop", "op": ">", "threshold": ("mq135", "good", 200),
+        "severity": "low", "level": "INFO", "sound": False, "unit": "ppm",
+        "alert": {"title": "Air Quality Moderate",
+                  "message": "Air quality at {value:.0f} ppm is outside optimal range (>{threshold})."},
+        "recommendation": {"title": "Air Quality Moderate", "type": "co2",
+                           "description": "Air quality at {value:.0f} ppm is acceptable but could be improved. Consider increasing airflow for optimal plant growth conditions."},
+        "summary": {"type": "Air Quality", "message": "Moderate air quality: {value:.0f} PPM"},
+    },
+]
+
+# --- ANOMALIES ---
+# anomaly.py sets '<sensor>_anomaly' (an online z-score) on ingested readings;
+# these rules flag unusual behaviour before the hard limits above trip. Each
+# sensor's anomaly rule is its own group, so it never hides a threshold alert.
+ANOMALY_SENSORS = [
+    # (anomaly name, sensor_type, label)
+    ("temperature", "temperature", "Temperature"),
+    ("humidity", "humidity", "Humidity"),
+    ("mq135", "air_quality", "Air quality"),
+    ("mq2", "flammable_gas", "Flammable gas"),
+    ("mq7", "carbon_monoxide", "Carbon monoxide"),
+    ("light", "light", "Light"),
+]
+
+RULES += [
+    {
+        "id": f"{name}_anomaly", "group": f"{name}_anomaly", "sensor_type": sensor_type,
+        "field": f"{name}_anomaly", "op": ">", "threshold": ("anomaly", "z", 4),
+        "severity": "low", "level": "INFO", "sound": False, "unit": "z",
+        "alert": {"title": f"{label} Unusual",
+                  "message": f"{label} is behaving unusually ({{value:.1f}} standard deviations from its recent and usual level). Check before it reaches a limit."},
+        "recommendation": {"title": f"{label} Unusual", "type": "info",
+                           "description": f"{label} readings are {{value:.1f}} standard deviations away from their recent and time-of-day pattern. Inspect equipment and sensors for this area."},
+        "summary": {"type": label, "message": f"Unusual {label.lower()} (score {{value:.1f}})"},
+    }
+    for name, sensor_type, label in ANOMALY_SENSORS
+]
+
+# --- DAILY CYCLE ---
+# diurnal.py sets '<field>_diurnal' on ingested readings: how far the value is
+# outside the usual p10-p90 band for that hour of the day, in band widths
+# (0 inside). Raw light rises as it gets darker, so a positive light position
+# catches a dark greenhouse at an hour that is normally bright.
+RULES += [
+    {
+        "id": "light_darker_than_usual", "group": "light_diurnal", "sensor_type": "light",
+        "field": "light_diurnal", "op": ">", "threshold": ("diurnal", "band_widths", 1),
+        "severity": "low", "level": "INFO", "sound": False, "unit": "band widths",
+        "alert": {"title": "Light Lower Than Usual",
+                  "message": "The greenhouse is darker than usual for this time of day ({value:.1f} band widths past the usual range). Check grow lights, shading and the light sensor."},
+        "recommendation": {"title": "Light Lower Than Usual", "type": "info",
+                           "description": "Light is well below what this hour normally gets. Check that grow lights are on and shade screens are open."},
+        "summary": {"type": "Light", "message": "Darker than usual for this hour ({value:.1f} band widths)"},
+    },
+]
+
+# ----------------------------------------------------------------------------
+# WINDOWED RULES
+# ----------------------------------------------------------------------------
+# Evaluated by the stateful alert engine over a sliding window of recent
+# readings (see sliding_window.py) rather than the newest point only. Each
+# rule is its own group.
+#
+#   window     - window length in seconds
+#   kind       - 'sustained_above' / 'sustained_below': every reading in the
+#                window is past the threshold (window min / max), and the
+#                history covers the whole window
+#                'rate_above': rise across the full window in units per minute
+#   hysteresis - sensor group whose deadband applies when clearing
+
+SUSTAINED_WINDOW_SECONDS = 300
+RATE_WINDOW_SECONDS = 60
+
+WINDOW_RULES = [
+    {
+        "id": "temperature_sustained_high", "group": "temperature_sustained_high", "sensor_type": "temperature",
+        "field": "temperature", "kind": "sustained_above", "window": SUSTAINED_WINDOW_SECONDS,
+        "threshold": ("temperature.acceptable", "max", 30), "hysteresis": "temperature",
+        "severity": "high", "sound": True, "unit": "°C",
+        "alert": {"title": "Temperature High (Sustained)",
+                  "message": f"Temperature has stayed above {{threshold}}°C for {SUSTAINED_WINDOW_SECONDS // 60} minutes (lowest {{value:.1f}}°C). Open vents and check cooling."},
+    },
+    {
+        "id": "temperature_sustained_low", "group": "temperature_sustained_low", "sensor_type": "temperature",
+        "field": "temperature", "kind": "sustained_below", "window": SUSTAINED_WINDOW_SECONDS,
+        "threshold": ("temperature.acceptable", "min", 18), "hysteresis": "temperature",
+        "severity": "high", "sound": True, "unit": "°C",
+        "alert": {"title": "Temperature Low (Sustained)",
+                  "message": f"Temperature has stayed below {{threshold}}°C for {SUSTAINED_WINDOW_SECONDS // 60} minutes (highest {{value:.1f}}°C). Check heating."},
+    },
+    {
+        "id": "humidity_sustained_high", "group": "humidity_sustained_high", "sensor_type": "humidity",
+        "field": "humidity", "kind": "sustained_above", "window": SUSTAINED_WINDOW_SECONDS,
+        "threshold": ("humidity.acceptable", "max", 80), "hysteresis": "humidity",
+        "severity": "medium", "sound": False, "unit": "%",
+        "alert": {"title": "Humidity High (Sustained)",
+                  "message": f"Humidity has stayed above {{threshold}}% for {SUSTAINED_WINDOW_SECONDS // 60} minutes (lowest {{value:.1f}}%). Mold risk - increase ventilation."},
+    },
+    {
+        "id": "mq2_rising", "group": "mq2_rising", "sensor_type": "flammable_gas",
+        "field": "mq2_drop", "kind": "rate_above", "window": RATE_WINDOW_SECONDS,
+        "threshold": ("mq2", "rise_per_min", 100), "hysteresis": "mq2",
+        "severity": "high", "sound": True, "safety": True, "unit": "ppm/min",
+        "alert": {"title": "Gas Rising Fast",
+                  "message": "Flammable gas rising at {value:.0f} ppm/min (>{threshold}). Check for leaks before it reaches the alarm level."},
+    },
+    {
+        "id": "mq7_rising", "group": "mq7_rising", "sensor_type": "carbon_monoxide",
+        "field": "mq7_drop", "kind": "rate_above", "window": RATE_WINDOW_SECONDS,
+        "threshold": ("mq7", "rise_per_min", 100), "hysteresis": "mq7",
+        "severity": "high", "sound": True, "safety": True, "unit": "ppm/min",
+        "alert": {"title": "CO Rising Fast",
+                  "message": "Carbon monoxide rising at {value:.0f} ppm/min (>{threshold}). Check heaters and ventilate."},
+    },
+]
+
+# Recommendation shown when no rule matches
+ALL_NORMAL_RECOMMENDATION = {
+    "title": "✓ All Systems Normal",
+    "description": "All sensor readings are within optimal ranges. Greenhouse conditions are ideal for plant growth. Continue monitoring regularly.",
+    "type": "info"
+}
+
+# Threshold names exposed to message templates: name -> (section path, key, default)
+TEMPLATE_THRESHOLDS = {
+    "temperature_optimal_min": ("temperature.optimal", "min", 20),
+    "temperature_optimal_max": ("temperature.optimal", "max", 27),
+    "temperature_acceptable_min": ("temperature.acceptable", "min", 18),
+    "temperature_acceptable_max": ("temperature.acceptable", "max", 30),
+    "humidity_optimal_min": ("humidity.optimal", "min", 45),
+    "humidity_optimal_max": ("humidity.optimal", "max", 70),
+    "humidity_acceptable_min": ("humidity.acceptable", "min", 40),
+    "humidity_acceptable_max": ("humidity.acceptable", "max", 80),
+}
+
+SEVERITY_RANK = {"critical": 4, "high": 3, "medium": 2, "low": 1}
+
+# Sensor groups evaluated on the safety fast path (fire / gas)
+SAFETY_GROUPS = frozenset(r["group"] for r in RULES + WINDOW_RULES if r.get("safety"))
+
+# ============================================================================
+# COMPILATION
+# ============================================================================
+
+_compiled_cache = OrderedDict()
+_evaluation_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_MAX_COMPILED = 64  # one threshold set per site (site_registry.py), plus edits
+_MAX_EVALUATIONS = 256
+
+
+def thresholds_version(thresholds):
+    """
+    Stable fingerprint of a thresholds dict; changes whenever any value changes.
+
+    Args:
+        thresholds (dict): Thresholds as returned by load_thresholds()
+
+    Returns:
+        str: Short hex digest
+    """
+    payload = json.dumps(thresholds or {}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def _resolve(thresholds, path, key, default):
+    """Look up thresholds[path...][key], falling back to default."""
+    node = thresholds or {}
+    for part in path.split('.'):
+        node = node.get(part, {}) if isinstance(node, dict) else {}
+    value = node.get(key, default) if isinstance(node, dict) else default
+    try:
+        return float(value) if not isinstance(value, (int, float)) else value
+    except (TypeError, ValueError):
+        return default
+
+
+class CompiledRules:
+    """
+    Flat evaluation table for one thresholds version.
+
+    Each entry is (group_index, field, op, threshold, rule) with the threshold
+    value already resolved, so evaluating a reading is a single loop with no
+    dictionary walking.
+    """
+
+    def __init__(self, thresholds, rules=RULES, window_rules=WINDOW_RULES):
+        self.version = thresholds_version(thresholds)
+        self.params = {name: _resolve(thresholds, *spec) for name, spec in TEMPLATE_THRESHOLDS.items()}
+        groups = []
+        table = []
+        for rule in rules:
+            if rule["group"] not in groups:
+                groups.append(rule["group"])
+            threshold = None
+            if "threshold" in rule:
+                threshold = _resolve(thresholds, *rule["threshold"])
+            table.append((groups.index(rule["group"]), rule["field"], rule["op"], threshold, rule))
+        self.groups = groups
+        self.table = table
+        # Same entries bucketed per sensor group (used by the stateful alert engine)
+        self.group_entries = {group: [e for e in table if e[0] == i] for i, group in enumerate(groups)}
+        self.fields = tuple(sorted({entry[1] for entry in table} | {r.get("value_field") for r in rules if r.get("value_field")}))
+        # Windowed rules: (field, window, kind, threshold, rule)
+        self.window_table = [
+            (rule["field"], rule["window"], rule["kind"], _resolve(thresholds, *rule["threshold"]), rule)
+            for rule in window_rules
+        ]
+
+    def evaluate(self, sensor_data, safety_only=False):
+        """
+        Evaluate one derived reading against the table.
+
+        Args:
+            sensor_data (dict): Derived reading (build_derived_from_reading output merged with raw)
+            safety_only (bool): Only evaluate fire/gas rules
+
+        Returns:
+            list: One match dict per sensor group that triggered, in rule order
+        """
+        matches = []
+        matched_groups = set()
+        for group_index, field, op, threshold, rule in self.table:
+            if group_index in matched_groups:
+                continue
+            if safety_only and not rule.get("safety"):
+                continue
+            value = sensor_data.get(field)
+            if value is None:
+                continue
+            if op == "truthy":
+                hit = str(value).lower() in ("true", "yes", "1")
+            else:
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    continue
+                hit = value > threshold if op == ">" else value < threshold
+            if hit:
+                matched_groups.add(group_index)
+                if rule.get("value_field"):
+                    value = sensor_data.get(rule["value_field"], 0)
+                matches.append({"rule": rule, "value": value, "threshold": threshold})
+        return matches
+
+
+def compile_rules(thresholds):
+    """
+    Return the CompiledRules for these thresholds, compiling only when the
+    thresholds version hasn't been seen before.
+    """
+    version = thresholds_version(thresholds)
+    with _cache_lock:
+        compiled = _compiled_cache.get(version)
+        if compiled is not None:
+            _compiled_cache.move_to_end(version)
+            return compiled
+    compiled = CompiledRules(thresholds)
+    with _cache_lock:
+        _compiled_cache[version] = compiled
+        while len(_compiled_cache) > _MAX_COMPILED:
+            _compiled_cache.popitem(last=False)
+    return compiled
+
+
+def evaluate_reading(sensor_data, thresholds):
+    """
+    Evaluate a reading once per (reading values, thresholds version).
+
+    Repeated calls for the same reading (alerts, recommendations and the PDF
+    alert summary during one export) return the memoised result.
+
+    Args:
+        sensor_data (dict): Derived reading
+        thresholds (dict): Current thresholds
+
+    Returns:
+        dict: {'version': str, 'timestamp': float, 'matches': list}
+    """
+    compiled = compile_rules(thresholds)
+    key = (compiled.version,) + tuple(_hashable(sensor_data.get(f)) for f in compiled.fields)
+    with _cache_lock:
+        cached = _evaluation_cache.get(key)
+        if cached is not None:
+            _evaluation_cache.move_to_end(key)
+            return cached
+    evaluation = {
+        "version": compiled.version,
+        "timestamp": sensor_data.get("timestamp"),
+        "params": compiled.params,
+        "matches": compiled.evaluate(sensor_data),
+    }
+    with _cache_lock:
+        _evaluation_cache[key] = evaluation
+        while len(_evaluation_cache) > _MAX_EVALUATIONS:
+            _evaluation_cache.popitem(last=False)
+    return evaluation
+
+
+def _hashable(value):
+    return value if isinstance(value, (int, float, str, bool, type(None))) else str(value)
+
+# ============================================================================
+# CONSUMER VIEWS
+# ============================================================================
+
+
+def _format(template, match, params):
+    return template.format(value=match["value"], threshold=_fmt_number(match["threshold"]), **params)
+
+
+def _fmt_number(value):
+    """Render thresholds like the config file does (750, not 750.0)."""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def format_alert(match, params, timestamp):
+    """
+    One alert dict in the /api/alerts format for a rule match.
+
+    Args:
+        match (dict): {'rule', 'value', 'threshold'} as produced by CompiledRules.evaluate
+        params (dict): Resolved template thresholds (CompiledRules.params)
+        timestamp (float): Reading timestamp
+
+    Returns:
+        dict: title, message, timestamp, sensor_type, severity, value, unit, sound, rule_id
+    """
+    rule = match["rule"]
+    params = {k: _fmt_number(v) for k, v in params.items()}
+    return {
+        "title": rule["alert"]["title"],
+        "message": _format(rule["alert"]["message"], match, params),
+        "timestamp": timestamp,
+        "sensor_type": rule["sensor_type"],
+        "severity": rule["severity"],
+        "value": match["value"],
+        "unit": rule["unit"],
+        "sound": rule["sound"],
+        "rule_id": rule["id"],
+    }
+
+
+def build_alerts(evaluation, timestamp=None):
+    """
+    Alert dicts in the /api/alerts format.
+
+    Returns:
+        list: title, message, timestamp, sensor_type, severity, value, unit, sound
+    """
+    ts = timestamp if timestamp is not None else evaluation.get("timestamp")
+    return [format_alert(match, evaluation["params"], ts) for match in evaluation["matches"]]
+
+
+def build_recommendations(evaluation, limit=5):
+    """
+    Recommendation dicts (title, description, type), most critical first.
+    Returns the 'All Systems Normal' item when nothing matched.
+    """
+    params = {k: _fmt_number(v) for k, v in evaluation["params"].items()}
+    recommendations = []
+    for match in evaluation["matches"]:
+        rec = match["rule"]["recommendation"]
+        recommendations.append({
+            "title": rec["title"],
+            "description": _format(rec["description"], match, params),
+            "type": rec["type"],
+        })
+    if not recommendations:
+        recommendations.append(dict(ALL_NORMAL_RECOMMENDATION))
+    return recommendations[:limit]
+
+
+def build_alert_summary(evaluation):
+    """
+    PDF alert summary: counts plus level/type/message per alert.
+    """
+    params = {k: _fmt_number(v) for k, v in evaluation["params"].items()}
+    alerts = []
+    for match in evaluation["matches"]:
+        rule = match["rule"]
+        alerts.append({
+            "level": rule["level"],
+            "type": rule["summary"]["type"],
+            "message": _format(rule["summary"]["message"], match, params),
+        })
+    return {
+        "total_alerts": len(alerts),
+        "critical_count": sum(1 for a in alerts if a["level"] == "CRITICAL"),
+        "warning_count": sum(1 for a in alerts if a["level"] == "WARNING"),
+        "alerts": alerts,
+    }
@@ -0,0 +1,278 @@
+"""
+Multi-site registry for greenhouse monitoring system.
+Each greenhouse (site) is configured in sites.json with its own APEX
+endpoints and threshold overrides:
+
+    {"north": {"name": "North House", "apex_url": "...", "soil_url": "...",
+               "thresholds": {"temperature": {...}}}}
+
+A site's runtime state (reading ring buffer, soil buffer, alert engine,
+data quality monitor, anomaly models, derived cache) is created the first time the site is requested and kept in
+a least-recently-used table. Sites not requested for SITE_IDLE_SECONDS, or
+beyond MAX_ACTIVE_SITES, are evicted: their poller stops and their buffers
+are dropped, so memory is bounded by the number of sites in use rather
+than the number configured. Every lookup is a dict access, and sites share
+no locks, so one site's polling never waits on another's.
+
+sites.json is re-read when its modification time changes (checked at most every
+SITES_RELOAD_SECONDS), so threshold overrides saved by another process are
+picked up. Site pollers and alert engines live in the process that
+activated the site, though, so the app must run as a single process (one
+gunicorn worker, several threads) for sites to be polled once and for alert
+event ids to be consistent.
+"""
+
+import copy
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from alert_engine import AlertEngine
+from anomaly import AnomalyDetector
+from data_quality import DataQualityMonitor
+from reading_buffer import ReadingBuffer, READING_BUFFER_SIZE, REORDER_WINDOW_SECONDS
+
+SITES_FILE = os.getenv('SITES_FILE') or os.path.join(os.path.dirname(__file__), 'sites.json')
+MAX_ACTIVE_SITES = int(os.getenv('MAX_ACTIVE_SITES', '32'))
+SITE_IDLE_SECONDS = float(os.getenv('SITE_IDLE_SECONDS', '3600'))
+# Seconds between checks of sites.json for changes
+SITES_RELOAD_SECONDS = float(os.getenv('SITES_RELOAD_SECONDS', '5'))
+
+SITE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def merge_thresholds(base, overrides):
+    """Copy of base with each section updated from overrides (one level deep)."""
+    merged = copy.deepcopy(base)
+    for key, value in (overrides or {}).items():
+        if isinstance(merged.get(key), dict) and isinstance(value, dict):
+            merged[key].update(copy.deepcopy(value))
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+class SiteState:
+    """Runtime state of one active site."""
+
+    def __init__(self, site_id, config, buffer_size=READING_BUFFER_SIZE,
+                 reorder_window=REORDER_WINDOW_SECONDS):
+        self.site_id = site_id
+        self.config = config
+        self.readings = ReadingBuffer(max_size=buffer_size, reorder_window=reorder_window)
+        self.soil = ReadingBuffer(max_size=buffer_size, reorder_window=float('inf'))
+        self.alert_engine = AlertEngine()
+        self.quality = DataQualityMonitor()
+        self.anomaly = AnomalyDetector()
+        # Derived view of the newest reading, rebuilt only when it changes
+        self.latest = None
+        self.updated_at = None
+        self.last_access = time.monotonic()
+        self.stopped = threading.Event()
+
+    @property
+    def poll_interval(self):
+        return float(self.config.get('poll_interval', 3))
+
+
+class SiteRegistry:
+    """Site configurations plus an LRU table of active site states."""
+
+    def __init__(self, path=SITES_FILE, base_thresholds=None, max_active=MAX_ACTIVE_SITES,
+                 idle_seconds=SITE_IDLE_SECONDS, on_activate=None, on_evict=None,
+                 buffer_size=READING_BUFFER_SIZE, reorder_window=REORDER_WINDOW_SECONDS,
+                 reload_interval=SITES_RELOAD_SECONDS):
+        """
+        Args:
+            path (str): sites.json location (a missing file means no sites)
+            base_thresholds (callable): Returns the global thresholds that
+                site overrides are applied to
+            on_activate (callable): Called with a new SiteState, outside the
+                registry lock (starts the site's poller)
+            on_evict (callable): Called with each evicted SiteState, after
+                its poller was told to stop
+            reload_interval (float): Seconds between checks of sites.json
+                for changes (0 checks on every call)
+        """
+        self.path = path
+        self.base_thresholds = base_thresholds or dict
+        self.max_active = max_active
+        self.idle_seconds = idle_seconds
+        self.on_activate = on_activate
+        self.on_evict = on_evict
+        self.buffer_size = buffer_size
+        self.reorder_window = reorder_window
+        self.reload_interval = reload_interval
+        self._checked_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._active = OrderedDict()   # site_id -> SiteState, least recently used first
+        self._mtime = self._file_mtime()
+        self._configs = self._load()
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Failed to load sites file {self.path}: {e}")
+            return {}
+        configs = {}
+        for site_id, config in (data.items() if isinstance(data, dict) else []):
+            if not SITE_ID_PATTERN.match(site_id) or not isinstance(config, dict) or not config.get('apex_url'):
+                print(f"⚠️ Ignoring site '{site_id}': needs an id of letters, digits, '-' or '_' and an apex_url")
+                continue
+            configs[site_id] = config
+        return configs
+
+    def _save(self):
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._configs, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._mtime = self._file_mtime()
+
+    def _refresh_locked(self, force=False):
+        """Re-read sites.json if it changed on disk since it was last read."""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        mtime = self._file_mtime()
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        self._configs = self._load()
+        for site_id, state in self._active.items():
+            if site_id in self._configs:
+                state.config = self._configs[site_id]
+
+    def site_ids(self):
+        with self._lock:
+            self._refresh_locked()
+            return list(self._configs)
+
+    def config(self, site_id):
+        with self._lock:
+            self._refresh_locked()
+            return self._configs.get(site_id)
+
+    def is_active(self, site_id):
+        with self._lock:
+            return site_id in self._active
+
+    def get(self, site_id):
+        """
+        Runtime state of a site, activating it if needed. Counts as an access
+        for LRU / idle eviction.
+
+        Returns:
+            SiteState: None if the site is not configured
+        """
+        now = time.monotonic()
+        created = None
+        with self._lock:
+            self._refresh_locked()
+            config = self._configs.get(site_id)
+            if config is None:
+                return None
+            state = self._active.get(site_id)
+            if state is None:
+                state = created = SiteState(site_id, config, self.buffer_size, self.reorder_window)
+                self._active[site_id] = state
+            else:
+                self._active.move_to_end(site_id)
+            state.last_access = now
+            evicted = self._evict_locked(now)
+        self._stop(evicted)
+        if created is not None and self.on_activate:
+            self.on_activate(created)
+        return state
+
+    def touch_all(self):
+        """
+        Count an access to every configured site (fleet overview): active
+        sites are refreshed and inactive ones activated while there is room
+        below max_active; nothing is evicted to make room.
+        """
+        now = time.monotonic()
+        created = []
+        with self._lock:
+            self._refresh_locked()
+            for site_id, config in self._configs.items():
+                state = self._active.get(site_id)
+                if state is None:
+                    if len(self._active) >= self.max_active:
+                        continue
+                    state = SiteState(site_id, config, self.buffer_size, self.reorder_window)
+                    self._active[site_id] = state
+                    created.append(state)
+                state.last_access = now
+        if self.on_activate:
+            for state in created:
+                self.on_activate(state)
+
+    def _evict_locked(self, now):
+        # Sites removed from sites.json first
+        evicted = [self._active.pop(site_id) for site_id in
+                   [site_id for site_id in self._active if site_id not in self._configs]]
+        while self._active:
+            site_id, state = next(iter(self._active.items()))
+            if len(self._active) <= self.max_active and now - state.last_access <= self.idle_seconds:
+                break
+            del self._active[site_id]
+            evicted.append(state)
+        return evicted
+
+    def evict_idle(self):
+        """Evict sites idle for longer than idle_seconds (or no longer configured); returns their ids."""
+        with self._lock:
+            self._refresh_locked()
+            evicted = self._evict_locked(time.monotonic())
+        self._stop(evicted)
+        return [state.site_id for state in evicted]
+
+    def _stop(self, evicted):
+        for state in evicted:
+            state.stopped.set()
+            print(f"💤 Site '{state.site_id}' evicted (inactive)")
+            if self.on_evict:
+                self.on_evict(state)
+
+    def thresholds(self, site_id):
+        """Global thresholds with the site's overrides applied."""
+        with self._lock:
+            self._refresh_locked()
+            overrides = (self._configs.get(site_id) or {}).get('thresholds')
+        return merge_thresholds(self.base_thresholds(), overrides)
+
+    def save_thresholds(self, site_id, thresholds):
+        """
+        Replace a site's threshold overrides and persist sites.json.
+
+        Returns:
+            bool: False if the site is not configured
+        """
+        with self._lock:
+            # Start from the file as it is now, so other sites' saved changes are kept
+            self._refresh_locked(force=True)
+            config = self._configs.get(site_id)
+            if config is None:
+                return False
+            self._configs[site_id] = {**config, 'thresholds': thresholds}
+            state = self._active.get(site_id)
+            if state is not None:
+                state.config = self._configs[site_id]
+            self._save()
+        return True
@@ -0,0 +1,93 @@
+"""
+Time-based sliding window for greenhouse sensor streams.
+Keeps the readings of the last `duration` seconds for one field and answers
+mean / min / max / rate-of-change in O(1), with O(1) amortised work per new
+reading regardless of how long the window is:
+- mean: running sum over the samples in the window
+- min / max: monotonic deques (each sample enters and leaves once)
+- rate: newest vs. oldest sample
+"""
+
+from collections import deque
+
+
+class SlidingWindow:
+    """
+    Sliding window over (timestamp, value) samples.
+
+    The oldest retained sample is the newest one at or before the window
+    start, so the window always describes the full `duration` once enough
+    history exists (see covers_duration).
+    """
+
+    def __init__(self, duration):
+        self.duration = float(duration)
+        self._samples = deque()   # (ts, value), oldest first
+        self._min = deque()       # (ts, value), values increasing
+        self._max = deque()       # (ts, value), values decreasing
+        self._sum = 0.0
+
+    def push(self, ts, value):
+        """
+        Add a sample and evict those that fell out of the window.
+
+        Args:
+            ts (float): Reading timestamp (seconds)
+            value (float): Reading value
+
+        Returns:
+            bool: False if the sample was ignored (not newer than the last one)
+        """
+        if self._samples and ts <= self._samples[-1][0]:
+            return False
+        value = float(value)
+        self._samples.append((ts, value))
+        self._sum += value
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((ts, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((ts, value))
+
+        start = ts - self.duration
+        while len(self._samples) > 1 and self._samples[1][0] <= start:
+            _, old_value = self._samples.popleft()
+            self._sum -= old_value
+        oldest_ts = self._samples[0][0]
+        while self._min[0][0] < oldest_ts:
+            self._min.popleft()
+        while self._max[0][0] < oldest_ts:
+            self._max.popleft()
+        return True
+
+    def __len__(self):
+        return len(self._samples)
+
+    @property
+    def covers_duration(self):
+        """True once the window holds a sample at or before its start."""
+        return bool(self._samples) and self._samples[-1][0] - self._samples[0][0] >= self.duration
+
+    @property
+    def latest(self):
+        return self._samples[-1][1] if self._samples else None
+
+    def mean(self):
+        return self._sum / len(self._samples) if self._samples else None
+
+    def min(self):
+        return self._min[0][1] if self._min else None
+
+    def max(self):
+        return self._max[0][1] if self._max else None
+
+    def rate_per_minute(self):
+        """Change from the oldest to the newest sample, per minute."""
+        if len(self._samples) < 2:
+            return None
+        (first_ts, first), (last_ts, last) = self._samples[0], self._samples[-1]
+        elapsed = last_ts - first_ts
+        if elapsed <= 0:
+            return None
+        return (last - first) * 60.0 / elapsed
@@ -0,0 +1,36 @@
+"""
+Time alignment of sensor streams for greenhouse monitoring system.
+Soil readings come from their own APEX endpoint at their own pace. An as-of
+join pairs every greenhouse reading with the latest soil reading taken at
+or before it (within a tolerance), walking both sorted streams once with
+two pointers: O(len(left) + len(right)) for the whole history.
+"""
+
+
+def _default_key(reading):
+    return reading.get("_ts_num", 0)
+
+
+def asof_join(left, right, tolerance, key=_default_key):
+    """
+    Pair each item of left with the newest item of right at or before it.
+
+    Args:
+        left (list): Items sorted oldest first
+        right (list): Items sorted oldest first
+        tolerance (float): Maximum age (seconds) of the right item
+        key (callable): Item -> timestamp
+
+    Yields:
+        tuple: (left item, matching right item or None)
+    """
+    j = -1
+    n = len(right)
+    for item in left:
+        ts = key(item)
+        while j + 1 < n and key(right[j + 1]) <= ts:
+            j += 1
+        if j >= 0 and ts - key(right[j]) <= tolerance:
+            yield item, right[j]
+        else:
+            yield item, None
@@ -0,0 +1,167 @@
+"""
+Test the batched and streaming AI analysis endpoints and the per-sensor AI cache.
+Runs without a Gemini key, so analyses come from the fallback text.
+"""
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.pop('GEMINI_API_KEY', None)
+
+import app as backend
+import gemini_service
+from gemini_service import _parse_json_object
+
+
+def _load_cache():
+    reading = {
+        "temperature_bmp280": 23.0, "temperature_dht22": 24.0, "humidity": 55.0,
+        "moisture": 50, "light_raw": 400, "mq135_drop": 150, "mq2_drop": 100,
+        "mq7_drop": 100, "pressure": 1012.0, "flame_detected": 0, "timestamp": 1700000000
+    }
+    with backend._smart_cache_lock:
+        backend._smart_cache['data'] = [reading]
+        backend._smart_cache['timestamp'] = datetime.now()
+    with backend._ai_analysis_cache_lock:
+        backend._ai_analysis_cache.clear()
+
+
+def test_parse_json_object_with_fences():
+    text = '```json\n{"temperature": "Warm enough."}\n```'
+    assert _parse_json_object(text) == {"temperature": "Warm enough."}
+    assert _parse_json_object("not json") == {}
+
+
+class _FakeClient:
+    """Stand-in for the shared GeminiClient that answers every batch prompt."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt):
+        self.calls += 1
+        return json.dumps({"temperature": "Warm enough.", "humidity": "Fine."})
+
+    def stream(self, prompt):
+        self.calls += 1
+        yield "Humid "
+        yield "but fine."
+        return self.complete
+
+    complete = True
+
+
+def test_batch_fills_cache():
+    _load_cache()
+    client = backend.app.test_client()
+    fake = _FakeClient()
+    original = gemini_service.get_gemini_client
+    gemini_service.get_gemini_client = lambda: fake
+    try:
+        res = client.get('/api/sensor-analysis/ai/batch?sensors=temperature,humidity')
+        assert res.status_code == 200
+        body = res.get_json()
+        assert body['analyses'] == {'temperature': 'Warm enough.', 'humidity': 'Fine.'}
+        assert body['generated'] == ['temperature', 'humidity']
+
+        # Single-sensor call is now served from the cache
+        res = client.get('/api/sensor-analysis/temperature/ai')
+        assert res.get_json()['cached'] is True
+        assert res.get_json()['analysis'] == 'Warm enough.'
+
+        # Second batch call generates nothing
+        res = client.get('/api/sensor-analysis/ai/batch?sensors=temperature,humidity')
+        assert res.get_json()['generated'] == []
+        assert fake.calls == 1
+    finally:
+        gemini_service.get_gemini_client = original
+
+
+def test_fallback_text_is_not_cached():
+    _load_cache()
+    client = backend.app.test_client()
+
+    # No Gemini key: the fallback text is served but not cached
+    res = client.get('/api/sensor-analysis/ai/batch?sensors=temperature')
+    assert res.get_json()['analyses']['temperature']
+    res = client.get('/api/sensor-analysis/temperature/ai')
+    assert res.get_json()['cached'] is False
+    res = client.get('/api/sensor-analysis/temperature/ai')
+    assert res.get_json()['cached'] is False
+
+
+def test_stream_emits_chunks_then_done():
+    _load_cache()
+    client = backend.app.test_client()
+
+    with client.get('/api/sensor-analysis/humidity/ai/stream') as res:
+        assert res.status_code == 200
+        assert res.mimetype == 'text/event-stream'
+        body = res.get_data(as_text=True)
+    assert body.index('event: chunk') < body.index('event: done')
+
+    # Without Gemini the stream carries the fallback text, which isn't cached
+    res = client.get('/api/sensor-analysis/humidity/ai')
+    assert res.get_json()['cached'] is False
+
+
+def test_only_finished_streams_are_cached():
+    _load_cache()
+    client = backend.app.test_client()
+    fake = _FakeClient()
+    original = gemini_service.get_gemini_client
+    gemini_service.get_gemini_client = lambda: fake
+    try:
+        # Stream broken off after some text: shown, but not cached
+        fake.complete = False
+        with client.get('/api/sensor-analysis/humidity/ai/stream') as res:
+            body = res.get_data(as_text=True)
+        assert '"analysis": "Humid but fine."' in body
+        with backend._ai_analysis_cache_lock:
+            assert 'humidity' not in backend._ai_analysis_cache
+
+        fake.complete = True
+        with client.get('/api/sensor-analysis/humidity/ai/stream') as res:
+            res.get_data(as_text=True)
+        res = client.get('/api/sensor-analysis/humidity/ai')
+        assert res.get_json()['cached'] is True and res.get_json()['analysis'] == 'Humid but fine.'
+    finally:
+        gemini_service.get_gemini_client = original
+
+
+def test_stream_cap_points_to_polling_fallback():
+    _load_cache()
+    client = backend.app.test_client()
+    original = backend._stream_slots
+    backend._stream_slots = threading.BoundedSemaphore(1)
+    try:
+        open_stream = client.get('/api/sensor-analysis/humidity/ai/stream')
+        assert open_stream.status_code == 200
+
+        res = client.get('/api/sensor-analysis/humidity/ai/stream')
+        assert res.status_code == 503
+        assert res.get_json()['fallback'] == '/api/sensor-analysis/humidity/ai'
+        res = client.get('/api/alerts/stream')
+        assert res.status_code == 503
+        assert res.get_json()['fallback'].startswith('/api/alerts?since=')
+
+        # Closing the open stream frees its slot
+        open_stream.close()
+        res = client.get('/api/sensor-analysis/humidity/ai/stream')
+        assert res.status_code == 200
+        res.close()
+    finally:
+        backend._stream_slots = original
+
+
+if __name__ == "__main__":
+    test_parse_json_object_with_fences()
+    test_batch_fills_cache()
+    test_fallback_text_is_not_cached()
+    test_stream_emits_chunks_then_done()
+    test_only_finished_streams_are_cached()
+    test_stream_cap_points_to_polling_fallback()
+    print("✅ All batch AI tests passed!")
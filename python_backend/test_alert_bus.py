@@ -0,0 +1,73 @@
+"""
+Test the alert bus fan-out and the safety fast path hand-off to the
+regular alert pass.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from alert_bus import AlertBus
+from alert_engine import AlertEngine
+from rule_engine import SAFETY_GROUPS
+
+
+def test_publish_fans_out_and_drops_oldest():
+    bus = AlertBus()
+    seen = []
+    bus.add_sink(seen.append)
+    slow = bus.subscribe(maxsize=2)
+    for i in range(1, 4):
+        bus.publish({"id": i})
+    assert [e["id"] for e in seen] == [1, 2, 3]
+    assert [slow.get_nowait()["id"] for _ in range(2)] == [2, 3]
+    bus.unsubscribe(slow)
+    assert bus.subscriber_count == 0
+
+
+def test_events_get_bus_ids_and_can_be_replayed():
+    bus = AlertBus(max_events=3)
+    q = bus.subscribe()
+    assert bus.events_since(0) == ([], 0)
+    bus.publish({"id": 7, "event": "raised"})
+    bus.publish({"id": 1, "event": "raised", "site_id": "north"})
+    bus.publish({"id": 8, "event": "cleared"})
+    bus.publish({"id": 2, "event": "cleared", "site_id": "north"})
+    # One id sequence across engines, delivered in order
+    assert [q.get_nowait()["id"] for _ in range(4)] == [1, 2, 3, 4]
+    assert bus.latest_event_id == 4
+    # The oldest event left the log
+    events, latest_id = bus.events_since(0)
+    assert [e["id"] for e in events] == [2, 3, 4] and latest_id == 4
+    events, latest_id = bus.events_since(2, limit=1)
+    assert [e["id"] for e in events] == [3] and latest_id == 3
+    assert bus.events_since(4) == ([], 4)
+
+
+def test_failing_sink_does_not_stop_delivery():
+    bus = AlertBus()
+    bus.add_sink(lambda event: 1 / 0)
+    q = bus.subscribe()
+    bus.publish({"id": 1})
+    assert q.get_nowait()["id"] == 1
+
+
+def test_fast_path_reading_not_counted_twice():
+    engine = AlertEngine()
+    reading = {"flame_detected": True, "flame_raw": 900, "temperature": 23.0, "humidity": 55.0,
+               "mq135_drop": 100, "mq2_drop": 400, "mq7_drop": 50, "timestamp": 10, "_ts_num": 10}
+    fast = engine.process_reading(reading, {}, groups=SAFETY_GROUPS)
+    assert [e["rule_id"] for e in fast] == ["flame_detected"]
+    # Regular pass over the same reading: fire not repeated, mq2 debounce counted once
+    regular = engine.process_reading(reading, {})
+    assert regular == []
+    regular = engine.process_reading(dict(reading, timestamp=11, _ts_num=11), {})
+    assert [e["rule_id"] for e in regular] == ["mq2_elevated"]
+
+
+if __name__ == "__main__":
+    test_publish_fans_out_and_drops_oldest()
+    test_events_get_bus_ids_and_can_be_replayed()
+    test_failing_sink_does_not_stop_delivery()
+    test_fast_path_reading_not_counted_twice()
+    print("✅ All alert bus tests passed!")
@@ -0,0 +1,120 @@
+"""
+Test the stateful alert engine: hysteresis, debounce and the event log.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from alert_engine import AlertEngine
+
+THRESHOLDS = {"mq7": {"safe": 300, "high": 750}}
+
+
+def _reading(mq7, ts):
+    return {"temperature": 23.0, "humidity": 55.0, "mq135_drop": 100, "mq2_drop": 50,
+            "mq7_drop": mq7, "flame_detected": False, "timestamp": ts}
+
+
+def test_debounce_then_raise():
+    engine = AlertEngine()
+    assert engine.process_reading(_reading(320, 1), THRESHOLDS) == []
+    events = engine.process_reading(_reading(330, 2), THRESHOLDS)
+    assert [(e["event"], e["rule_id"]) for e in events] == [("raised", "mq7_elevated")]
+    assert engine.active_alerts()[0]["rule_id"] == "mq7_elevated"
+
+
+def test_oscillation_inside_deadband_does_not_flap():
+    engine = AlertEngine()
+    engine.process_reading(_reading(320, 1), THRESHOLDS)
+    engine.process_reading(_reading(320, 2), THRESHOLDS)
+    before = engine.latest_event_id
+    # Toggling around mq7.safe (300) stays above the 275 clear level
+    for i, value in enumerate([290, 310, 295, 305, 290, 290]):
+        engine.process_reading(_reading(value, 3 + i), THRESHOLDS)
+    assert engine.latest_event_id == before
+    # Really dropping clears it (after debounce)
+    engine.process_reading(_reading(200, 20), THRESHOLDS)
+    events = engine.process_reading(_reading(200, 21), THRESHOLDS)
+    assert [e["event"] for e in events] == ["cleared"]
+    assert engine.active_alerts() == []
+
+
+def test_flame_raises_immediately():
+    engine = AlertEngine()
+    reading = dict(_reading(100, 1), flame_detected=True, flame_raw=800)
+    events = engine.process_reading(reading, THRESHOLDS)
+    assert [e["rule_id"] for e in events] == ["flame_detected"]
+
+
+def test_events_since_and_bounded_log():
+    engine = AlertEngine(max_events=3, debounce={"mq7": 1})
+    for i in range(6):
+        value = 800 if i % 2 == 0 else 100
+        engine.process_reading(_reading(value, i), THRESHOLDS)
+    assert engine.latest_event_id == 6
+    events, latest_id = engine.events_since(0)
+    assert [e["id"] for e in events] == [4, 5, 6] and latest_id == 6
+    assert [e["id"] for e in engine.events_since(5)[0]] == [6]
+    assert engine.events_since(6) == ([], 6)
+    # With a limit, the id to resume from is the last event returned
+    events, latest_id = engine.events_since(0, limit=2)
+    assert [e["id"] for e in events] == [4, 5] and latest_id == 5
+
+
+def _derived(ts, temperature=23.0, mq2=50):
+    return dict(_reading(100, ts), temperature=temperature, mq2_drop=mq2, _ts_num=ts)
+
+
+def test_sustained_temperature_window():
+    engine = AlertEngine()
+    thresholds = {"temperature": {"acceptable": {"min": 18, "max": 30}, "optimal": {"min": 20, "max": 27}}}
+    raised = []
+    # 31°C every 30 s: only alerts once the whole 5 minute window is above 30°C
+    for i in range(12):
+        events = engine.process_reading(_derived(i * 30, temperature=31.0), thresholds)
+        raised += [(i, e["rule_id"]) for e in events if e["rule_id"] == "temperature_sustained_high"]
+    assert raised == [(10, "temperature_sustained_high")]
+    # A single dip inside the window clears it (with deadband 0.5)
+    events = engine.process_reading(_derived(360, temperature=29.0), thresholds)
+    assert "temperature_sustained_high" in [e["rule_id"] for e in events if e["event"] == "cleared"]
+
+
+def test_gas_rate_of_change():
+    engine = AlertEngine()
+    events = []
+    for i, value in enumerate([50, 60, 70, 80]):
+        events += engine.process_reading(_derived(i * 20, mq2=value), THRESHOLDS)
+    assert "mq2_rising" not in [e["rule_id"] for e in events]
+    # +150 ppm in 20 s is well over 100 ppm/min
+    events = engine.process_reading(_derived(80, mq2=230), THRESHOLDS)
+    assert [e["rule_id"] for e in events if e["event"] == "raised"] == ["mq2_rising"]
+
+
+def test_first_poll_backlog_warms_windows_without_replaying_alerts():
+    from app import _run_alert_engine
+    engine = AlertEngine()
+    thresholds = {"temperature": {"acceptable": {"min": 18, "max": 30}, "optimal": {"min": 20, "max": 27}}}
+    # Six minutes of 31°C already buffered when the backend restarts
+    derived = [_derived(i * 30, temperature=31.0) for i in range(13)]
+    published = []
+    _run_alert_engine(engine, derived, thresholds, True, published.append)
+    groups = [e["group"] for e in published]
+    assert "temperature_sustained_high" in groups
+    assert len(groups) == len(set(groups))
+    assert all(e["event"] != "cleared" for e in published)
+    # The next reading continues the warm window instead of starting over
+    published = []
+    _run_alert_engine(engine, [_derived(390, temperature=31.0)], thresholds, False, published.append)
+    assert published == []
+
+
+if __name__ == "__main__":
+    test_debounce_then_raise()
+    test_oscillation_inside_deadband_does_not_flap()
+    test_flame_raises_immediately()
+    test_events_since_and_bounded_log()
+    test_sustained_temperature_window()
+    test_gas_rate_of_change()
+    test_first_poll_backlog_warms_windows_without_replaying_alerts()
+    print("✅ All alert engine tests passed!")
@@ -0,0 +1,68 @@
+"""
+Test the streaming anomaly scores and the anomaly alert rules.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from alert_engine import AlertEngine
+from anomaly import AnomalyDetector, anomaly_name
+
+START = 1_699_999_200  # on the hour
+
+
+def _reading(ts, temperature, light=1000):
+    return {"temperature": temperature, "humidity": 55.0, "mq135_drop": 100, "mq2_drop": 50,
+            "mq7_drop": 40, "light": light, "flame_detected": False, "timestamp": ts, "_ts_num": ts}
+
+
+def test_scores_after_warmup_and_sudden_change():
+    detector = AnomalyDetector(warmup=30)
+    for i in range(30):
+        assert detector.observe(_reading(START + i * 60, 22 + (i % 2) * 0.2)) == {}
+    scores = detector.observe(_reading(START + 30 * 60, 22.1))
+    assert set(scores) == {"temperature_anomaly", "humidity_anomaly", "mq135_anomaly",
+                           "mq2_anomaly", "mq7_anomaly", "light_anomaly"}
+    assert scores["temperature_anomaly"] < 1
+    # Well inside the 18-30 °C limits, but far from the recent level
+    jump = detector.observe(_reading(START + 31 * 60, 26.5))
+    assert jump["temperature_anomaly"] > 4
+    details = detector.details("temperature")
+    assert details["status"] == "anomalous" and details["expected_this_hour"] is None
+    # Older readings are not scored and don't move the models
+    assert detector.observe(_reading(START, 40)) == {}
+
+
+def test_hourly_baseline_accepts_the_daily_cycle():
+    detector = AnomalyDetector(warmup=5, hourly_warmup=3)
+    # Three days: dark except one bright hour per day
+    for day in range(3):
+        for minute in range(0, 24 * 60, 20):
+            ts = START + day * 86400 + minute * 60
+            detector.observe(_reading(ts, 22, light=3000 if (minute // 60) == 12 else 0))
+    # The bright hour on day four is far from the recent (dark) level, but
+    # normal for this hour of the day
+    scores = detector.observe(_reading(START + 3 * 86400 + 12 * 3600, 22, light=3000))
+    details = detector.details("light")
+    assert details["z_recent"] > 4
+    assert scores["light_anomaly"] < 1
+    assert anomaly_name("co2_level") == "mq135"
+    assert anomaly_name("light") == "light"
+
+
+def test_anomaly_rule_raises_low_severity_alert():
+    engine = AlertEngine()
+    thresholds = {"anomaly": {"z": 4}}
+    base = _reading(1, 22)
+    assert engine.process_reading({**base, "temperature_anomaly": 6.0}, thresholds) == []
+    events = engine.process_reading({**base, "timestamp": 2, "_ts_num": 2, "temperature_anomaly": 5.5}, thresholds)
+    assert [(e["rule_id"], e["severity"]) for e in events] == [("temperature_anomaly", "low")]
+    assert not events[0]["sound"]
+
+
+if __name__ == "__main__":
+    test_scores_after_warmup_and_sudden_change()
+    test_hourly_baseline_accepts_the_daily_cycle()
+    test_anomaly_rule_raises_low_severity_alert()
+    print("✅ Anomaly tests passed")
@@ -0,0 +1,61 @@
+"""
+Test the data quality monitor: flatline, disagreement, out-of-range and
+spike flags, staleness and the report.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_quality import DataQualityMonitor
+
+
+def _r(ts, **fields):
+    return {"_ts_num": float(ts), **fields}
+
+
+def _checks(flags):
+    return {(f["check"], f["sensor"]) for f in flags}
+
+
+def test_flatline_needs_duration_and_readings():
+    monitor = DataQualityMonitor(flatline_seconds=600, flatline_min_readings=5)
+    flags = [monitor.observe(_r(i * 60, humidity=55.0, light_raw=0)) for i in range(12)]
+    assert not any(flags[:10])                      # 9 minutes: not yet
+    assert _checks(flags[11]) == {("flatline", "humidity")}   # light at 0 is allowed
+    assert ("flatline", "humidity") in _checks(monitor.current_flags(now=11 * 60))
+    # Any change ends the run
+    assert monitor.observe(_r(12 * 60, humidity=55.1)) == []
+    assert monitor.current_flags(now=12 * 60) == []
+
+
+def test_disagreement_range_and_spike():
+    monitor = DataQualityMonitor()
+    assert _checks(monitor.observe(_r(0, temperature_dht22=20, temperature_bmp280=31))) == {("disagreement", "temperature")}
+    assert _checks(monitor.observe(_r(1, humidity=140))) == {("out_of_range", "humidity")}
+
+    for i in range(30):
+        assert monitor.observe(_r(10 + i, temperature_dht22=22 + (i % 3) * 0.2)) == []
+    assert _checks(monitor.observe(_r(50, temperature_dht22=35))) == {("spike", "temperature_dht22")}
+    report = monitor.report(now=50)
+    assert report["status"] == "degraded"
+    assert report["sensors"]["temperature_dht22"]["spikes"] == 1
+    assert report["sensors"]["humidity"]["out_of_range"] == 1
+    assert report["disagreement"]["temperature"]["mean_difference"] == 11
+
+
+def test_stale_source_and_late_readings():
+    monitor = DataQualityMonitor(stale_seconds=300)
+    monitor.observe(_r(1000, humidity=50))
+    monitor.observe(_r(900, humidity=51))          # late: checked only
+    assert monitor.report(now=1000)["sensors"]["humidity"]["last_value"] == 50
+    assert monitor.report(now=1100)["status"] == "ok"
+    stale = _checks(monitor.current_flags(now=1400))
+    assert stale == {("stale", "source"), ("stale", "humidity")}
+
+
+if __name__ == "__main__":
+    test_flatline_needs_duration_and_readings()
+    test_disagreement_range_and_spike()
+    test_stale_source_and_late_readings()
+    print("✅ Data quality tests passed")
@@ -0,0 +1,93 @@
+"""
+Test the hour-of-day baselines: percentiles per hour, the sliding window of
+days, comparisons with the usual band and the light rule.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from diurnal import DiurnalProfiles, band_position
+from rule_engine import evaluate_reading
+
+# Local midnight, so hours below are local hours of day
+MIDNIGHT = time.mktime((2024, 3, 4, 0, 0, 0, 0, 0, -1))
+
+
+def _at(day, hour, minute=0):
+    return MIDNIGHT + day * 86400 + hour * 3600 + minute * 60
+
+
+def _fill(profiles, days, light_at):
+    for day in range(days):
+        for hour in range(24):
+            for minute in range(0, 60, 6):
+                profiles.observe({"timestamp": _at(day, hour, minute), "light": light_at(hour) + minute,
+                                  "temperature": 20 + hour * 0.5})
+
+
+def test_profile_per_hour():
+    profiles = DiurnalProfiles(days=7, min_days=2)
+    _fill(profiles, 3, lambda hour: 200 if 8 <= hour < 18 else 3000)
+    profile = profiles.profile("light")
+    noon, night = profile[12], profile[2]
+    assert (noon["days"], noon["samples"]) == (3, 30)
+    assert 200 <= noon["p10"] < noon["mean"] < noon["p90"] <= 270
+    assert night["p10"] >= 3000
+    assert profiles.profile("temperature")[10]["mean"] == 25
+    assert profiles.profile("humidity") == [None] * 24
+
+
+def test_compare_with_usual_band():
+    profiles = DiurnalProfiles(days=7, min_days=2)
+    _fill(profiles, 1, lambda hour: 200 if 8 <= hour < 18 else 3000)
+    # One day of history isn't enough
+    assert profiles.compare("light", 3000, _at(1, 12)) is None
+    _fill(profiles, 2, lambda hour: 200 if 8 <= hour < 18 else 3000)
+    # Dark at noon is unusual, the same reading at night is not
+    noon = profiles.compare("light", 3000, _at(2, 12))
+    assert noon["status"] == "darker than usual" and noon["position"] > 10
+    assert profiles.compare("light", 3030, _at(2, 2))["status"] == "usual"
+    assert profiles.positions({"timestamp": _at(2, 12), "light": 3000, "temperature": 25})["temperature_diurnal"] < 0
+    assert band_position(5, {"p10": 0, "p90": 10}) == 0
+    assert band_position(15, {"p10": 0, "p90": 10}) == 0.5
+
+
+def test_old_days_leave_the_window():
+    profiles = DiurnalProfiles(days=2, min_days=1)
+    profiles.observe({"timestamp": _at(0, 12), "temperature": 10})
+    profiles.observe({"timestamp": _at(1, 12), "temperature": 20})
+    assert profiles.profile("temperature")[12]["samples"] == 2
+    profiles.observe({"timestamp": _at(2, 12), "temperature": 30})
+    entry = profiles.profile("temperature")[12]
+    assert (entry["samples"], entry["mean"]) == (2, 25)
+    # Too old for the window: ignored
+    profiles.observe({"timestamp": _at(0, 13), "temperature": 10})
+    assert profiles.profile("temperature")[13] is None
+
+
+def test_rebuilds_are_throttled_within_an_hour():
+    profiles = DiurnalProfiles(days=7, min_days=1, rebuild_interval=3600)
+    profiles.observe({"timestamp": _at(0, 12), "temperature": 20})
+    assert profiles.profile("temperature")[12]["samples"] == 1
+    profiles.observe({"timestamp": _at(0, 12, 30), "temperature": 22})
+    assert profiles.profile("temperature")[12]["samples"] == 1
+    # The next hour starting brings the finished one up to date
+    profiles.observe({"timestamp": _at(0, 13), "temperature": 24})
+    assert profiles.profile("temperature")[12]["samples"] == 2
+
+
+def test_darker_than_usual_rule():
+    matches = evaluate_reading({"light": 3000, "light_diurnal": 12.0}, {})["matches"]
+    assert [m["rule"]["id"] for m in matches] == ["light_darker_than_usual"]
+    assert evaluate_reading({"light": 3000, "light_diurnal": 0.0}, {})["matches"] == []
+
+
+if __name__ == "__main__":
+    test_profile_per_hour()
+    test_compare_with_usual_band()
+    test_old_days_leave_the_window()
+    test_rebuilds_are_throttled_within_an_hour()
+    test_darker_than_usual_rule()
+    print("✅ Diurnal profile tests passed")
@@ -0,0 +1,60 @@
+"""
+Test the fleet summary table: row updates, worst severity, freshness and
+the cached overview body.
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fleet_summary import FleetSummary, freshness, worst_severity
+
+
+def test_rows_and_overview():
+    fleet = FleetSummary(max_age=0)
+    fleet.register("primary", "Main greenhouse", active=True)
+    fleet.register("north", "North")
+    fleet.register("north", "Renamed")   # existing row is kept
+    now = time.time()
+    fleet.update("primary", {"temperature": 24.5, "humidity": 55, "timestamp": now - 5, "pressure": 1000}, [])
+    fleet.update("north", {"temperature": 33, "timestamp": now - 120},
+                 [{"severity": "high"}, {"severity": "critical"}, {"severity": "low"}])
+    fleet.update("unknown", {"temperature": 1, "timestamp": now}, [])
+
+    body = json.loads(fleet.body())
+    assert body["site_count"] == 2
+    assert body["alerting_sites"] == 1
+    assert body["worst_severity"] == "critical"
+    primary, north = body["sites"]
+    assert primary["values"] == {"temperature": 24.5, "humidity": 55}
+    assert primary["freshness"] == "live" and primary["active"]
+    assert north["name"] == "North" and not north["active"]
+    assert north["worst_severity"] == "critical" and north["active_alerts"] == 3
+    assert north["freshness"] == "stale"
+
+
+def test_overview_is_cached_between_builds():
+    fleet = FleetSummary(max_age=60)
+    fleet.register("a", "A")
+    first = fleet.body()
+    fleet.update("a", {"temperature": 20, "timestamp": time.time()}, [])
+    assert fleet.body() is first
+    fleet.max_age = 0
+    assert json.loads(fleet.body())["sites"][0]["values"] == {"temperature": 20}
+
+
+def test_helpers():
+    assert worst_severity([]) is None
+    assert worst_severity([None, "medium", "low"]) == "medium"
+    assert freshness(None) == "no_data"
+    assert freshness(10) == "live"
+    assert freshness(10 ** 6) == "offline"
+
+
+if __name__ == "__main__":
+    test_rows_and_overview()
+    test_overview_is_cached_between_builds()
+    test_helpers()
+    print("✅ Fleet summary tests passed")
@@ -0,0 +1,74 @@
+"""
+Test the Holt-Winters forecasts: trend following, incremental refits from
+the history store and threshold crossings.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from forecast import ForecastCache, HoltWinters, first_crossing
+from history_store import HistoryStore
+
+NOW = 1_700_000_100.0
+STEP = 300
+
+
+def test_follows_a_rising_trend():
+    model = HoltWinters(STEP)
+    assert model.forecast(3) == []
+    for i in range(200):
+        model.update(i * STEP, 20 + 0.05 * i)
+    points = model.forecast(12)
+    assert [ts for ts, _, _ in points[:2]] == [200 * STEP, 201 * STEP]
+    # Still rising, damped, and the interval widens with the horizon
+    assert 29.9 < points[0][1] < points[-1][1] < 30 + 0.05 * 13
+    assert points[0][2] <= points[-1][2]
+
+
+def test_stale_model_is_detected():
+    model = HoltWinters(STEP)
+    assert model.is_stale(NOW)
+    model.update(NOW // STEP * STEP - STEP, 21.0)
+    # The bucket still filling is never folded in, so one step behind is fresh
+    assert not model.is_stale(NOW)
+    assert not model.is_stale(NOW + 3 * STEP)
+    assert model.is_stale(NOW + 5 * STEP)
+
+
+def test_crossing_reports_first_point_outside_band():
+    points = [(0, 24.0, 0.1), (300, 26.5, 0.1), (600, 27.5, 0.1), (900, 15.0, 0.1)]
+    assert first_crossing(points, 18, 27) == {"timestamp": 600, "value": 27.5, "bound": "max", "threshold": 27}
+    assert first_crossing(points, 16, None) == {"timestamp": 900, "value": 15.0, "bound": "min", "threshold": 16}
+    assert first_crossing(points, 10, 30) is None
+
+
+def test_cache_folds_only_new_buckets():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, "history.db"))
+        start = NOW - 6 * 3600
+        store.add_readings([{"timestamp": start + i * 60, "temperature": 22 + (i % 5) * 0.1}
+                            for i in range(6 * 60)])
+        cache = ForecastCache(store, step=STEP, history_days=1)
+        assert cache.model("humidity", now=NOW).level is None
+
+        model = cache.model("temperature", now=NOW)
+        # The bucket still filling at NOW is left out
+        assert model.last_ts == NOW // STEP * STEP - STEP
+        count = model.count
+        assert 70 <= count <= 73
+        assert cache.model("temperature", now=NOW + 10) is model and model.count == count
+
+        store.add_readings([{"timestamp": NOW + i * 60, "temperature": 23} for i in range(10)])
+        model = cache.model("temperature", now=NOW + 600)
+        assert model.count == count + 2
+        store.close()
+
+
+if __name__ == "__main__":
+    test_follows_a_rising_trend()
+    test_stale_model_is_detected()
+    test_crossing_reports_first_point_outside_band()
+    test_cache_folds_only_new_buckets()
+    print("✅ Forecast tests passed")
@@ -0,0 +1,162 @@
+"""
+Test the shared Gemini client: timeout and concurrency limit.
+Uses a stand-in model so no API key or network access is needed.
+"""
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from gemini_service import GeminiClient, TokenBucket, CircuitBreaker
+
+
+class _FailingModel:
+    """Stand-in for GenerativeModel that always raises."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        raise RuntimeError("429 quota exceeded")
+
+
+class _SlowModel:
+    """Stand-in for GenerativeModel that sleeps before answering."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        time.sleep(self.delay)
+
+        class _Response:
+            text = f"  analysis for: {prompt}  "
+        return _Response()
+
+
+class _StreamingModel:
+    """Stand-in for GenerativeModel streaming chunks with a pause between them."""
+
+    def __init__(self, chunks, delay, fail_after=None):
+        self.chunks = chunks
+        self.delay = delay
+        self.fail_after = fail_after
+
+    def generate_content(self, prompt, stream=False):
+        for i, text in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise RuntimeError("connection reset")
+            time.sleep(self.delay)
+
+            class _Chunk:
+                pass
+            chunk = _Chunk()
+            chunk.text = text
+            yield chunk
+
+
+def _drain(stream):
+    """All chunks of a generator and its return value."""
+    chunks = []
+    while True:
+        try:
+            chunks.append(next(stream))
+        except StopIteration as stop:
+            return chunks, stop.value
+
+
+def _make_client(delay, timeout=1.0, max_concurrency=2):
+    client = GeminiClient('test-key', timeout=timeout, max_concurrency=max_concurrency)
+    client._model = _SlowModel(delay)
+    return client
+
+
+def test_generate_returns_stripped_text():
+    client = _make_client(delay=0)
+    assert client.generate("temperature") == "analysis for: temperature"
+
+
+def test_generate_times_out():
+    client = _make_client(delay=0.5, timeout=0.1)
+    started = time.time()
+    assert client.generate("slow") is None
+    assert time.time() - started < 0.4
+
+
+def test_concurrency_limit():
+    client = _make_client(delay=0.3, timeout=0.1, max_concurrency=1)
+    results = []
+    first = threading.Thread(target=lambda: results.append(client.generate("a", timeout=1.0)))
+    first.start()
+    time.sleep(0.05)
+    # Only slot is busy for longer than this call is willing to wait
+    assert client.generate("b") is None
+    first.join()
+    assert results == ["analysis for: a"]
+    assert client._model.calls == 1
+
+
+def test_token_bucket_limits_burst():
+    bucket = TokenBucket(rate_per_minute=0, capacity=2)
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(threshold=2, cooldown=30)
+    assert breaker.record_failure() is False
+    breaker.record_success()
+    assert breaker.record_failure() is False
+    assert breaker.record_failure() is True
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.allow_request()
+
+
+def test_open_breaker_rejects_instantly():
+    client = _make_client(delay=0)
+    client._model = _FailingModel()
+    client.breaker = CircuitBreaker(threshold=2, cooldown=60)
+    assert client.generate("a") is None
+    assert client.generate("b") is None
+    assert client.breaker.is_open
+    started = time.time()
+    assert client.generate("c") is None
+    assert time.time() - started < 0.05
+    # Third request never reached the model
+    assert client._model.calls == 2
+
+
+def test_stream_timeout_is_per_chunk():
+    client = _make_client(delay=0, timeout=0.2)
+    # Whole stream takes longer than the timeout, but no gap does
+    client._model = _StreamingModel(["a", "b", "c", "d", "e"], delay=0.08)
+    assert _drain(client.stream("long")) == (["a", "b", "c", "d", "e"], True)
+    assert client.breaker.status()["consecutive_failures"] == 0
+
+    client._model = _StreamingModel(["a", "b"], delay=0.5)
+    assert _drain(client.stream("stalled")) == ([], False)
+
+
+def test_stream_error_midway_is_not_complete():
+    client = _make_client(delay=0)
+    client._model = _StreamingModel(["a", "b", "c"], delay=0, fail_after=2)
+    assert _drain(client.stream("broken")) == (["a", "b"], False)
+
+
+if __name__ == "__main__":
+    test_generate_returns_stripped_text()
+    test_generate_times_out()
+    test_concurrency_limit()
+    test_token_bucket_limits_burst()
+    test_breaker_opens_after_consecutive_failures()
+    test_open_breaker_rejects_instantly()
+    test_stream_timeout_is_per_chunk()
+    test_stream_error_midway_is_not_complete()
+    print("✅ All Gemini client tests passed!")
@@ -0,0 +1,45 @@
+"""
+Test the health score (same penalties as the PDF report, plus sub-scores)
+and its stored time series.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from health_score import health_label, score_statuses
+from history_store import HistoryStore
+
+
+def test_score_and_sub_scores():
+    assert score_statuses({"temperature": "Optimal", "humidity": "Optimal",
+                           "air_quality": "Good", "light": "Bright"}) == (
+        100, {"temperature": 100, "humidity": 100, "air_quality": 100, "light": 100})
+    score, sub_scores = score_statuses({"temperature": "Critical", "humidity": "Acceptable",
+                                        "air_quality": "Poor", "light": "Dim Indoor"})
+    assert score == 100 - 30 - 10 - 20 - 5
+    assert sub_scores == {"temperature": 0, "humidity": 67, "air_quality": 0, "light": 67}
+    assert health_label(score) == "NEEDS ATTENTION"
+    assert health_label(85) == "EXCELLENT"
+
+
+def test_health_series_is_downsampled():
+    now = float(int(time.time()))
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, "history.db"))
+        store.add_health_scores([(now - i * 60, 100 if i % 2 else 80, {"temperature": 100, "light": 50})
+                                 for i in range(120)])
+        series = store.health_series(now - 7200, now + 1, max_points=4)
+        assert len(series) == 4
+        assert all(80 < score < 100 for _, score, _ in series)
+        assert series[0][2]["light"] == 50
+        assert series[0][2]["humidity"] is None
+        store.close()
+
+
+if __name__ == "__main__":
+    test_score_and_sub_scores()
+    test_health_series_is_downsampled()
+    print("✅ Health score tests passed")
@@ -0,0 +1,65 @@
+"""
+Test the streamed history export: batching (constant memory), CSV / NDJSON
+encoding and Parquet when pyarrow is installed.
+"""
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import history_export
+from history_export import export_chunks, parquet_available
+from history_store import HistoryStore
+
+NOW = float(int(time.time()) - 86400)  # recent, so retention pruning keeps it
+
+
+def _store(tmp, n):
+    store = HistoryStore(os.path.join(tmp, "history.db"))
+    store.add_readings([{"timestamp": NOW + i, "temperature": 20 + i % 5, "humidity": None if i % 2 else 55}
+                        for i in range(n)])
+    return store
+
+
+def test_csv_and_ndjson_stream_in_batches():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp, 250)
+        history_export.EXPORT_BATCH_SIZE, original = 100, history_export.EXPORT_BATCH_SIZE
+        try:
+            chunks = list(export_chunks(store, "csv", NOW, NOW + 1000, ("temperature", "humidity")))
+            assert len(chunks) == 3                       # one chunk per batch of 100
+            rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+            assert rows[0] == ["ts", "time", "temperature", "humidity"]
+            assert len(rows) == 251
+            assert rows[2][3] == ""                       # missing values stay empty
+            records = [json.loads(line) for line in
+                       b"".join(export_chunks(store, "ndjson", NOW + 10, NOW + 20, ("temperature",))).splitlines()]
+            assert [r["ts"] for r in records] == [NOW + i for i in range(10, 20)]
+            assert set(records[0]) == {"ts", "time", "temperature"}
+        finally:
+            history_export.EXPORT_BATCH_SIZE = original
+        store.close()
+
+
+def test_parquet_export():
+    if not parquet_available():
+        return  # optional dependency
+    import pyarrow.parquet as pq
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp, 5000)
+        data = b"".join(export_chunks(store, "parquet", NOW, NOW + 10000, ("temperature",)))
+        table = pq.read_table(io.BytesIO(data))
+        assert table.num_rows == 5000
+        assert table.column_names == ["ts", "time", "temperature"]
+        store.close()
+
+
+if __name__ == "__main__":
+    test_csv_and_ndjson_stream_in_batches()
+    test_parquet_export()
+    print("✅ History export tests passed")
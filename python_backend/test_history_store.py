@@ -0,0 +1,126 @@
+"""
+Test the local history store behind period reports: bucketed aggregates,
+time-in-range shares and alert counts.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from history_store import AlertEventWriter, HistoryStore, period_range
+
+NOW = 1700000000.0
+
+
+def _store(tmp):
+    return HistoryStore(os.path.join(tmp, "history.db"))
+
+
+def test_aggregate_and_dedupe():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        readings = [{"timestamp": NOW - i * 3600, "temperature": 20 + i % 4, "humidity": 50}
+                    for i in range(48)]
+        assert store.add_readings(readings) == 48
+        # Same timestamps again (APEX returns overlapping windows) are ignored
+        assert store.add_readings(readings[:10]) == 0
+        start, end = period_range("week", now=NOW + 1)
+        assert store.data_version(start, end) == (48, NOW)
+        days = store.aggregate(start, end, bucket="day")
+        assert sum(d["count"] for d in days) == 48
+        assert min(d["temperature"]["min"] for d in days) == 20
+        assert max(d["temperature"]["max"] for d in days) == 23
+        hours = store.aggregate(start, end, bucket="hour")
+        assert len(hours) == 48
+        store.close()
+
+
+def test_readings_keyed_by_timestamp_and_device():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.db")
+        store = HistoryStore(path)
+        # Nothing is created until the store is first used
+        assert not os.path.exists(path)
+        readings = [{"timestamp": NOW + i // 2, "device_id": f"node-{i % 2}", "temperature": 20 + i}
+                    for i in range(6)]
+        assert store.add_readings(readings) == 6
+        assert store.add_readings(readings[:2]) == 0
+        # Keyset batches don't skip rows sharing a timestamp
+        rows = [row for batch in store.iter_readings(NOW, NOW + 10, columns=("temperature",), batch_size=1)
+                for row in batch]
+        assert rows == [(NOW + i // 2, 20.0 + i) for i in range(6)]
+        store.close()
+
+
+def test_migrates_timestamp_keyed_readings():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE readings (ts REAL PRIMARY KEY, temperature REAL, humidity REAL)")
+        conn.execute("INSERT INTO readings VALUES (?, 21.5, 60)", (NOW,))
+        conn.commit()
+        conn.close()
+        store = HistoryStore(path)
+        assert store.add_readings([{"timestamp": NOW, "device_id": "node-1", "temperature": 22}]) == 1
+        rows = [row for batch in store.iter_readings(NOW, NOW + 1, columns=("temperature", "humidity"))
+                for row in batch]
+        assert rows == [(NOW, 21.5, 60.0), (NOW, 22.0, None)]
+        store.close()
+
+
+def test_time_in_range():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        # 6 optimal, 2 acceptable, 2 outside; missing values are not samples
+        values = [22, 23, 24, 25, 21, 26, 19, 29, 35, 10]
+        store.add_readings([{"timestamp": NOW + i, "temperature": v} for i, v in enumerate(values)]
+                           + [{"timestamp": NOW + 100, "temperature": None}])
+        result = store.time_in_range(NOW, NOW + 200, {"temperature": (20, 27, 18, 30), "humidity": (45, 70, 40, 80)})
+        assert result["temperature"] == {"samples": 10, "optimal_pct": 60.0, "acceptable_pct": 20.0, "outside_pct": 20.0}
+        assert result["humidity"]["samples"] == 0
+        store.close()
+
+
+def test_alert_counts():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        events = [("raised", "temperature", "high"), ("changed", "temperature", "critical"),
+                  ("cleared", "temperature", "critical"), ("raised", "mq2", "critical")]
+        for i, (event, sensor, severity) in enumerate(events):
+            store.add_alert_event({"timestamp": NOW + i, "event": event, "sensor_type": sensor,
+                                   "severity": severity, "rule_id": f"{sensor}_rule", "value": 1})
+        counts = store.alert_counts(NOW, NOW + 10)
+        # Only raised events count; a severity change is the same alert
+        assert counts["total"] == 2
+        assert counts["by_severity"] == {"high": 1, "critical": 1}
+        assert counts["by_sensor"] == {"temperature": 1, "mq2": 1}
+        # Site alerts are counted per site, not in the primary report
+        store.add_alert_event({"timestamp": NOW + 5, "event": "raised", "sensor_type": "mq2",
+                               "severity": "high", "site_id": "north"})
+        assert store.alert_counts(NOW, NOW + 10)["total"] == 2
+        assert store.alert_counts(NOW, NOW + 10, site_id="north")["by_sensor"] == {"mq2": 1}
+        store.close()
+
+
+def test_alert_event_writer():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        writer = AlertEventWriter(store)
+        # Publishing only queues the event; the writer thread stores it
+        for i in range(3):
+            writer({"timestamp": NOW + i, "event": "raised", "sensor_type": "mq7", "severity": "high"})
+        writer.join()
+        assert store.alert_counts(NOW, NOW + 10)["by_sensor"] == {"mq7": 3}
+        store.close()
+
+
+if __name__ == "__main__":
+    test_aggregate_and_dedupe()
+    test_readings_keyed_by_timestamp_and_device()
+    test_migrates_timestamp_keyed_readings()
+    test_time_in_range()
+    test_alert_counts()
+    test_alert_event_writer()
+    print("✅ History store tests passed")
@@ -0,0 +1,86 @@
+"""
+Test MQTT ingestion without a broker: payloads are handed to
+MqttIngest.handle_payload the way paho's on_message would, and the shared
+normalization is checked against the timestamp formats APEX uses.
+"""
+import json
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mqtt_ingest import MqttIngest
+from reading_buffer import ReadingBuffer
+from reading_normalize import normalize_item, parse_timestamp
+
+
+def test_parse_timestamp_formats():
+    expected = datetime(2025, 10, 30, 15, 2, 22).timestamp()
+    assert parse_timestamp("2025-10-30T15:02:22Z") == expected
+    assert parse_timestamp("2025-10-30T15:02:22.500000Z") == expected + 0.5
+    assert parse_timestamp("30-Oct-2025\n15:02:22") == expected
+    assert parse_timestamp(1761836542) == 1761836542.0
+    assert parse_timestamp(1761836542500) == 1761836542.5
+    assert parse_timestamp("not a time") is None
+
+
+def test_handle_payload_feeds_pipeline():
+    received = []
+    ingest = MqttIngest(received.append)
+    device = {"temperature_bmp280": 24.5, "humidity": 60, "timestamp_reading": "2025-10-30T15:02:22Z"}
+
+    readings = ingest.handle_payload(json.dumps(device).encode("utf-8"), "greenhouse/sensor_data")
+    assert len(readings) == 1 and readings[0]["_ts_num"] == parse_timestamp("2025-10-30T15:02:22Z")
+    assert readings[0]["temperature_bmp280"] == 24.5
+
+    # Batched payloads are delivered newest first
+    batch = {"items": [dict(device, timestamp_reading="2025-10-30T15:02:20Z"),
+                       dict(device, timestamp_reading="2025-10-30T15:02:24Z")]}
+    ingest.handle_payload(json.dumps(batch))
+    assert [r["timestamp_reading"] for r in received[1]] == ["2025-10-30T15:02:24Z", "2025-10-30T15:02:20Z"]
+
+    # Bad payloads are counted, not raised
+    assert ingest.handle_payload(b"\xff\xfe") == []
+    assert ingest.handle_payload("{oops") == []
+    status = ingest.status()
+    assert status["messages"] == 2 and status["readings"] == 3 and status["errors"] == 2
+    assert len(received) == 2
+
+
+def test_reading_without_timestamp_uses_receive_time():
+    reading = normalize_item({"humidity": 55})
+    assert abs(reading["timestamp"] - reading["_pull_time"]) < 1
+    assert normalize_item({"humidity": 55}, require_timestamp=True) is None
+
+
+def test_mqtt_reading_without_timestamp_is_skipped():
+    received = []
+    ingest = MqttIngest(received.append)
+    batch = [{"humidity": 55}, {"humidity": 56, "timestamp": 1761836542}]
+    readings = ingest.handle_payload(json.dumps(batch))
+    assert [r["humidity"] for r in readings] == [56]
+    assert ingest.handle_payload(json.dumps({"humidity": 57})) == []
+    assert len(received) == 1
+    status = ingest.status()
+    assert status["no_timestamp"] == 2 and status["readings"] == 1
+
+
+def test_mqtt_copy_with_epoch_timestamp_merges_with_apex_copy():
+    ts = datetime(2025, 10, 30, 15, 2, 22).timestamp()
+    mqtt = normalize_item({"device_id": "gh-1", "humidity": 60, "timestamp": ts})
+    apex = normalize_item({"device_id": "gh-1", "humidity": 60, "timestamp_reading": "2025-10-30T15:02:22Z"})
+    assert mqtt["_ts_num"] == apex["_ts_num"] == ts
+    buffer = ReadingBuffer(max_size=10, reorder_window=60)
+    assert len(buffer.merge([mqtt])) == 1
+    assert buffer.merge([apex]) == []
+    assert len(buffer) == 1 and buffer.stats["duplicates"] == 1
+
+
+if __name__ == "__main__":
+    test_parse_timestamp_formats()
+    test_handle_payload_feeds_pipeline()
+    test_reading_without_timestamp_uses_receive_time()
+    test_mqtt_reading_without_timestamp_is_skipped()
+    test_mqtt_copy_with_epoch_timestamp_merges_with_apex_copy()
+    print("✅ MQTT ingest tests passed")
@@ -0,0 +1,67 @@
+"""
+Test the reading buffer: duplicate drop, out-of-order insertion within the
+reorder window, and size bound.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from reading_buffer import ReadingBuffer
+
+
+def _r(ts, device=None, **fields):
+    reading = {"_ts_num": float(ts), **fields}
+    if device is not None:
+        reading["device_id"] = device
+    return reading
+
+
+def test_overlapping_polls_keep_only_new_readings():
+    buffer = ReadingBuffer(max_size=100, reorder_window=60)
+    assert [r["_ts_num"] for r in buffer.merge([_r(30), _r(20), _r(10)])] == [30, 20, 10]
+    # Next poll overlaps the previous window; the MQTT copy of 40 arrived first
+    assert buffer.merge([_r(40, source="mqtt")]) != []
+    new = buffer.merge([_r(50), _r(40), _r(30), _r(20)])
+    assert [r["_ts_num"] for r in new] == [50]
+    assert [r["_ts_num"] for r in buffer.newest_first()] == [50, 40, 30, 20, 10]
+    assert buffer.newest_first()[1]["source"] == "mqtt"
+    assert buffer.stats["duplicates"] == 3
+    # Same timestamp from another device is a different reading
+    assert len(buffer.merge([_r(50, device="house-2")])) == 1
+
+
+def test_late_readings_inside_window_are_slotted_in():
+    buffer = ReadingBuffer(max_size=100, reorder_window=60)
+    buffer.merge([_r(100), _r(160)])
+    assert len(buffer.merge([_r(130)])) == 1        # late but within the window
+    assert buffer.merge([_r(90)]) == []             # older than newest - window
+    assert buffer.stats["too_late"] == 1
+    assert [r["_ts_num"] for r in buffer.newest_first()] == [160, 130, 100]
+    assert buffer.latest()["_ts_num"] == 160
+
+
+def test_first_batch_backfills_beyond_window():
+    buffer = ReadingBuffer(max_size=100, reorder_window=60)
+    # One poll spanning more than the reorder window is accepted whole
+    assert len(buffer.merge([_r(ts) for ts in range(1000, 0, -100)])) == 10
+    assert buffer.merge([_r(900 - 30)]) == []       # later, a reading older than newest - window is not
+
+
+def test_size_bound_evicts_oldest():
+    buffer = ReadingBuffer(max_size=5, reorder_window=1000)
+    added = buffer.merge([_r(ts) for ts in range(10)])
+    assert len(buffer) == 5
+    assert [r["_ts_num"] for r in buffer.newest_first()] == [9, 8, 7, 6, 5]
+    assert [r["_ts_num"] for r in added] == [9, 8, 7, 6, 5]
+    assert [r["_ts_num"] for r in buffer.newest_first(limit=2)] == [9, 8]
+    # A source re-sending its window can't bring evicted readings back
+    assert buffer.merge([_r(ts) for ts in range(10)]) == []
+
+
+if __name__ == "__main__":
+    test_overlapping_polls_keep_only_new_readings()
+    test_late_readings_inside_window_are_slotted_in()
+    test_first_batch_backfills_beyond_window()
+    test_size_bound_evicts_oldest()
+    print("✅ Reading buffer tests passed")
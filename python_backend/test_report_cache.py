@@ -0,0 +1,79 @@
+"""
+Test the on-disk report cache (LRU eviction) and de-duplicated background
+report builds.
+"""
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from report_cache import ReportCache, ReportJobs, report_key
+
+
+def test_lru_eviction_and_reload():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ReportCache(tmp, max_entries=2)
+        cache.put("a", b"A")
+        cache.put("b", b"B")
+        assert cache.get("a") == b"A"      # a is now most recently used
+        cache.put("c", b"C")
+        assert cache.get("b") is None
+        assert sorted(f for f in os.listdir(tmp)) == ["a.pdf", "c.pdf"]
+        # A new process picks up what is on disk
+        reloaded = ReportCache(tmp, max_entries=2)
+        assert reloaded.get("c") == b"C"
+
+
+def test_directory_is_created_on_first_put():
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, "report_cache")
+        cache = ReportCache(directory)
+        assert not os.path.exists(directory)
+        assert cache.get("a") is None
+        cache.put("a", b"%PDF-a")
+        assert cache.get("a") == b"%PDF-a"
+
+
+def test_concurrent_requests_share_one_build():
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs = ReportJobs(ReportCache(tmp), max_workers=2)
+        release = threading.Event()
+        builds = []
+
+        def build():
+            builds.append(1)
+            release.wait(5)
+            return b"%PDF-1.4"
+
+        key = report_key(1700000000.0, 45, 24, "abc")
+        first = jobs.submit(key, build)
+        second = jobs.submit(key, build)
+        assert first["id"] == second["id"]
+        release.set()
+        assert jobs.wait(first["id"], 5) == b"%PDF-1.4"
+        assert len(builds) == 1
+        assert jobs.get(first["id"])["status"] == "done"
+        assert jobs.cache.get(key) == b"%PDF-1.4"
+
+
+def test_failed_build_is_reported():
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs = ReportJobs(ReportCache(tmp))
+
+        def build():
+            raise ValueError("no data")
+
+        job = jobs.submit("k", build)
+        assert jobs.wait(job["id"], 5) is None
+        assert jobs.get(job["id"])["status"] == "failed"
+        assert jobs.get(job["id"])["error"] == "no data"
+
+
+if __name__ == "__main__":
+    test_lru_eviction_and_reload()
+    test_directory_is_created_on_first_put()
+    test_concurrent_requests_share_one_build()
+    test_failed_build_is_reported()
+    print("✅ All report cache tests passed!")
@@ -0,0 +1,48 @@
+"""
+Test report trend charts: downsampling, chart drawing and the per data
+version drawing cache.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from reportlab.graphics.shapes import Drawing
+
+from report_charts import ChartCache, downsample, trend_chart
+
+
+def test_downsample_keeps_shape():
+    points = [(1700000000 + i * 60, float(i % 10)) for i in range(1000)] + [(1700000000 + 5, None)]
+    reduced = downsample(points, max_points=50)
+    assert len(reduced) <= 50
+    assert reduced == sorted(reduced)
+    assert all(0 <= v <= 9 for _, v in reduced)
+    # Short series are returned unchanged (sorted, None dropped)
+    assert downsample([(3, 1.0), (1, 2.0), (2, None)]) == [(1, 2.0), (3, 1.0)]
+
+
+def test_chart_cache_builds_once_and_copies():
+    cache = ChartCache(max_entries=2)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return trend_chart([(1700000000, 20.0), (1700003600, 24.0)], "°C", band=(20, 27))
+
+    first = cache.get_or_build(("temperature", "week", (10, 1700003600)), build)
+    second = cache.get_or_build(("temperature", "week", (10, 1700003600)), build)
+    assert isinstance(first, Drawing)
+    assert first is not second          # each document gets its own copy
+    assert len(builds) == 1
+    cache.get_or_build(("humidity", "week", 1), build)
+    cache.get_or_build(("humidity", "week", 2), build)
+    assert len(cache) == 2
+    # Too little data draws a placeholder instead of failing
+    assert isinstance(trend_chart([], "%"), Drawing)
+
+
+if __name__ == "__main__":
+    test_downsample_keeps_shape()
+    test_chart_cache_builds_once_and_copies()
+    print("✅ Report chart tests passed")
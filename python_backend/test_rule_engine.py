@@ -0,0 +1,67 @@
+"""
+Test the shared threshold rule engine used by alerts, recommendations and
+the PDF alert summary.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from rule_engine import (
+    compile_rules, evaluate_reading, build_alerts, build_recommendations,
+    build_alert_summary, thresholds_version
+)
+
+THRESHOLDS = {
+    "temperature": {"optimal": {"min": 20, "max": 27}, "acceptable": {"min": 18, "max": 30}},
+    "humidity": {"optimal": {"min": 45, "max": 70}, "acceptable": {"min": 40, "max": 80}},
+    "mq135": {"good": 200, "poor": 500},
+    "mq2": {"safe": 300, "high": 750},
+    "mq7": {"safe": 300, "high": 750},
+}
+
+NORMAL = {"temperature": 23.0, "humidity": 55.0, "mq135_drop": 100, "mq2_drop": 50,
+          "mq7_drop": 50, "flame_detected": False, "timestamp": 1700000000}
+
+
+def test_normal_reading_has_no_alerts():
+    evaluation = evaluate_reading(NORMAL, THRESHOLDS)
+    assert build_alerts(evaluation) == []
+    assert build_recommendations(evaluation)[0]["title"] == "✓ All Systems Normal"
+    assert build_alert_summary(evaluation)["total_alerts"] == 0
+
+
+def test_most_severe_band_wins_per_sensor():
+    reading = dict(NORMAL, mq7_drop=800, humidity=75.0)
+    alerts = build_alerts(evaluate_reading(reading, THRESHOLDS))
+    assert [a["rule_id"] for a in alerts] == ["mq7_high", "humidity_high"]
+    assert alerts[0]["severity"] == "critical"
+    assert ">750" in alerts[0]["message"]
+
+
+def test_thresholds_drive_all_consumers():
+    custom = dict(THRESHOLDS, mq2={"safe": 100, "high": 200})
+    reading = dict(NORMAL, mq2_drop=150)
+    evaluation = evaluate_reading(reading, custom)
+    assert [a["rule_id"] for a in build_alerts(evaluation)] == ["mq2_elevated"]
+    assert build_recommendations(evaluation)[0]["title"] == "Gas Levels Elevated"
+    assert build_alert_summary(evaluation)["warning_count"] == 1
+    # Default thresholds don't flag the same reading
+    assert build_alerts(evaluate_reading(reading, THRESHOLDS)) == []
+
+
+def test_compiled_once_per_version_and_evaluation_shared():
+    assert compile_rules(THRESHOLDS) is compile_rules(dict(THRESHOLDS))
+    assert thresholds_version(THRESHOLDS) != thresholds_version(dict(THRESHOLDS, mq2={"safe": 1, "high": 2}))
+    reading = dict(NORMAL, flame_detected=True, flame_raw=900)
+    assert evaluate_reading(reading, THRESHOLDS) is evaluate_reading(dict(reading), THRESHOLDS)
+    alert = build_alerts(evaluate_reading(reading, THRESHOLDS))[0]
+    assert alert["sensor_type"] == "flame" and alert["value"] == 900
+
+
+if __name__ == "__main__":
+    test_normal_reading_has_no_alerts()
+    test_most_severe_band_wins_per_sensor()
+    test_thresholds_drive_all_consumers()
+    test_compiled_once_per_version_and_evaluation_shared()
+    print("✅ All rule engine tests passed!")
@@ -0,0 +1,119 @@
+"""
+Test the site registry: sites.json loading, lazy activation, LRU / idle
+eviction and per-site threshold overrides.
+"""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from site_registry import SiteRegistry
+
+BASE = {
+    "temperature": {"optimal": {"min": 20, "max": 27}, "acceptable": {"min": 18, "max": 30}},
+    "mq2": {"safe": 300, "high": 750},
+}
+
+
+def _registry(tmp, sites, **kwargs):
+    path = os.path.join(tmp, "sites.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(sites, f)
+    return SiteRegistry(path, base_thresholds=lambda: BASE, **kwargs)
+
+
+def test_sites_are_activated_on_demand_and_evicted_lru():
+    with tempfile.TemporaryDirectory() as tmp:
+        sites = {f"house-{i}": {"apex_url": f"http://apex/{i}"} for i in range(4)}
+        sites["bad id!"] = {"apex_url": "http://apex/x"}
+        sites["no-url"] = {"name": "Missing URL"}
+        activated = []
+        registry = _registry(tmp, sites, max_active=2, on_activate=lambda s: activated.append(s.site_id))
+        assert registry.site_ids() == ["house-0", "house-1", "house-2", "house-3"]
+        assert registry.get("unknown") is None
+
+        first = registry.get("house-0")
+        assert registry.get("house-0") is first
+        registry.get("house-1")
+        registry.get("house-0")          # house-1 is now least recently used
+        registry.get("house-2")
+        assert not registry.is_active("house-1")
+        assert registry.is_active("house-0") and registry.is_active("house-2")
+        assert activated == ["house-0", "house-1", "house-2"]
+        assert not first.stopped.is_set()
+
+        # Re-activating an evicted site starts from fresh state
+        again = registry.get("house-1")
+        assert activated[-1] == "house-1" and again.latest is None
+        assert first.stopped.is_set()    # house-0 was least recently used
+
+
+def test_idle_sites_are_evicted():
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = _registry(tmp, {"a": {"apex_url": "http://a"}, "b": {"apex_url": "http://b"}},
+                             idle_seconds=60)
+        a = registry.get("a")
+        registry.get("b")
+        a.last_access -= 120
+        assert registry.evict_idle() == ["a"]
+        assert a.stopped.is_set() and registry.is_active("b")
+
+
+def test_touch_all_activates_up_to_capacity_without_evicting():
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = _registry(tmp, {f"s{i}": {"apex_url": f"http://{i}"} for i in range(3)}, max_active=2)
+        activated = []
+        registry.on_activate = lambda s: activated.append(s.site_id)
+        s2 = registry.get("s2")
+        registry.touch_all()
+        assert activated == ["s2", "s0"]
+        assert registry.is_active("s2") and not s2.stopped.is_set()
+        assert not registry.is_active("s1")
+
+
+def test_site_thresholds_override_global_and_persist():
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = _registry(tmp, {"north": {"apex_url": "http://n", "thresholds": {"mq2": {"safe": 200}}},
+                                   "south": {"apex_url": "http://s"}})
+        north = registry.thresholds("north")
+        assert north["mq2"] == {"safe": 200, "high": 750}
+        assert north["temperature"] == BASE["temperature"]
+        assert registry.thresholds("south") == BASE
+        assert BASE["mq2"]["safe"] == 300   # base is never mutated
+
+        assert registry.save_thresholds("south", {"temperature": {"optimal": {"min": 15, "max": 22}}})
+        assert not registry.save_thresholds("unknown", {})
+        reloaded = SiteRegistry(registry.path, base_thresholds=lambda: BASE)
+        assert reloaded.thresholds("south")["temperature"]["optimal"] == {"min": 15, "max": 22}
+        assert reloaded.thresholds("north")["mq2"]["safe"] == 200
+
+
+def test_changes_to_sites_file_are_picked_up():
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = _registry(tmp, {"north": {"apex_url": "http://n"}, "south": {"apex_url": "http://s"}},
+                             reload_interval=0)
+        south = registry.get("south")
+        # Another process (a second worker) saves north's thresholds
+        other = SiteRegistry(registry.path, base_thresholds=lambda: BASE)
+        assert other.save_thresholds("north", {"mq2": {"safe": 100}})
+        os.utime(registry.path, ns=(0, os.stat(registry.path).st_mtime_ns + 1))
+        assert registry.thresholds("north")["mq2"]["safe"] == 100
+        # ...and removes south: it is no longer served and its poller stops
+        north = other.config("north")
+        with open(registry.path, "w", encoding="utf-8") as f:
+            json.dump({"north": north}, f)
+        os.utime(registry.path, ns=(0, os.stat(registry.path).st_mtime_ns + 2))
+        assert registry.get("south") is None
+        assert registry.evict_idle() == ["south"] and south.stopped.is_set()
+        assert registry.site_ids() == ["north"]
+
+
+if __name__ == "__main__":
+    test_sites_are_activated_on_demand_and_evicted_lru()
+    test_idle_sites_are_evicted()
+    test_touch_all_activates_up_to_capacity_without_evicting()
+    test_site_thresholds_override_global_and_persist()
+    test_changes_to_sites_file_are_picked_up()
+    print("✅ Site registry tests passed")
@@ -0,0 +1,51 @@
+"""
+Test the O(1) sliding window used by windowed alert rules.
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sliding_window import SlidingWindow
+
+
+def test_matches_brute_force():
+    rng = random.Random(7)
+    window = SlidingWindow(60)
+    history = []
+    ts = 0.0
+    for _ in range(500):
+        ts += rng.choice([3, 5, 10, 20])
+        value = rng.uniform(0, 100)
+        window.push(ts, value)
+        history.append((ts, value))
+        # Expected contents: the samples inside the window plus the one anchoring its start
+        inside = [(t, v) for t, v in history if t > ts - 60]
+        anchor = [(t, v) for t, v in history if t <= ts - 60][-1:]
+        expected = [v for _, v in anchor + inside]
+        assert len(window) == len(expected)
+        assert window.min() == min(expected)
+        assert window.max() == max(expected)
+        assert abs(window.mean() - sum(expected) / len(expected)) < 1e-6
+
+
+def test_rate_and_coverage():
+    window = SlidingWindow(60)
+    window.push(0, 100)
+    assert window.rate_per_minute() is None
+    window.push(30, 150)
+    assert not window.covers_duration
+    assert window.rate_per_minute() == 100
+    window.push(60, 200)
+    assert window.covers_duration
+    assert window.rate_per_minute() == 100
+    # Older / duplicate timestamps are ignored
+    assert window.push(60, 999) is False
+    assert window.max() == 200
+
+
+if __name__ == "__main__":
+    test_matches_brute_force()
+    test_rate_and_coverage()
+    print("✅ All sliding window tests passed!")
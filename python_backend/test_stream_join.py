@@ -0,0 +1,39 @@
+"""
+Test the as-of join used to align soil readings with greenhouse readings.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stream_join import asof_join
+
+
+def test_asof_join_latest_at_or_before_within_tolerance():
+    greenhouse = [{"_ts_num": t} for t in (5, 10, 15, 31, 100)]
+    soil = [{"_ts_num": t, "moisture": m} for t, m in ((10, 40), (12, 41), (30, 42))]
+    pairs = list(asof_join(greenhouse, soil, tolerance=20))
+    assert [s["moisture"] if s else None for _, s in pairs] == [None, 40, 41, 42, None]
+    # Exact timestamp match counts as "at or before"
+    assert pairs[1][1]["_ts_num"] == 10
+
+
+def test_asof_join_is_linear_over_long_streams():
+    greenhouse = [{"_ts_num": t} for t in range(0, 100000, 3)]
+    soil = [{"_ts_num": t} for t in range(0, 100000, 60)]
+    calls = []
+
+    def key(item):
+        calls.append(1)
+        return item["_ts_num"]
+
+    pairs = list(asof_join(greenhouse, soil, tolerance=60, key=key))
+    assert all(s is not None and g["_ts_num"] - s["_ts_num"] < 60 for g, s in pairs)
+    # Each item's key is read a bounded number of times (two pointers, no search)
+    assert len(calls) <= 3 * (len(greenhouse) + len(soil))
+
+
+if __name__ == "__main__":
+    test_asof_join_latest_at_or_before_within_tolerance()
+    test_asof_join_is_linear_over_long_streams()
+    print("✅ Stream join tests passed")
@@ -4,11 +4,25 @@
 # This script subscribes to an MQTT topic, listens for incoming JSON data
 # from the ESP32 greenhouse monitor, and forwards it to an Oracle APEX
 # RESTful Service endpoint via an HTTP POST request.
+#
+# Two modes (BRIDGE_MODE below, or the first command-line argument):
+# - "batched" (default): on_message only queues the reading, so the MQTT
+#   network loop never waits on APEX. Sender threads POST batches over
+#   keep-alive connections, retry with exponential backoff, and spool to a
+#   local SQLite file while APEX is slow or down (or the queue is full).
+#   Spooled readings are sent once APEX answers again, interleaved with
+#   queued ones, and only leave the spool once APEX accepted them.
+# - "direct": the original behaviour, one blocking POST per message.
 # ==============================================================================
 
 import paho.mqtt.client as mqtt
 import requests
 import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
 import time
 # --- CONFIGURATION - YOU MUST EDIT THESE VALUES ---
 
@@ -22,8 +36,31 @@ MQTT_TOPIC = "greenhouse/sensor_data"
 # It will look something like: 'https://<your_server>/ords/<your_schema>/<module>/<template>'
 APEX_URL = "https://oracleapex.com/ords/at2/greenhouse/sensor"
 
+# "batched" or "direct"
+BRIDGE_MODE = "batched"
+
+# Batched mode tuning
+QUEUE_MAX = 10000            # readings held in memory before spooling to disk
+SENDER_THREADS = 4           # parallel POSTs to APEX
+BATCH_MAX = 50               # readings per batch
+BATCH_WAIT = 0.5             # seconds to wait for a batch to fill
+SPOOL_EVERY = 4              # every Nth batch comes from the spool while it has readings
+# Set to True only if the APEX handler accepts a JSON array in one POST;
+# otherwise each reading of a batch is POSTed on the sender's kept-alive connection
+APEX_ACCEPTS_BATCH = False
+RETRY_BASE = 1.0             # first backoff delay (seconds)
+RETRY_MAX = 60.0             # backoff cap (seconds)
+SPOOL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bridge_spool.db")
+STATS_INTERVAL = 30          # seconds between status lines
+
 # --- END OF CONFIGURATION ---
 
+HEADERS = {
+    'Content-Type': 'application/json',
+    'Accept': 'application/json',
+    'User-Agent': 'Mozilla/5.0'
+}
+
 
 def send_to_apex(payload_dict):
     """
@@ -36,16 +73,10 @@ def send_to_apex(payload_dict):
         print("❌ ERROR: APEX_URL is not configured. Please edit the script.")
         return
 
-    headers = {
-        'Content-Type': 'application/json',
-        'Accept': 'application/json',
-        'User-Agent': 'Mozilla/5.0'
-    }
-
     try:
         # The 'json' parameter in requests automatically serializes the dict
         # and sets the correct headers.
-        response = requests.post(APEX_URL, json=payload_dict, headers=headers, timeout=10)
+        response = requests.post(APEX_URL, json=payload_dict, headers=HEADERS, timeout=10)
 
         # Check the response from the server
         if 200 <= response.status_code < 300:
@@ -58,6 +89,249 @@ def send_to_apex(payload_dict):
         print(f"❌ An error occurred while trying to connect to APEX: {e}")
 
 
+# ------------------------------------------------------------------------------
+# Batched mode
+# ------------------------------------------------------------------------------
+
+class Spool:
+    """Disk-backed FIFO of readings (SQLite) for APEX outages and queue overflow."""
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._claimed = set()      # ids handed to a sender and not yet acked / released
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS spool (id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL)")
+
+    def put(self, readings):
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO spool (payload) VALUES (?)",
+                                   [(json.dumps(r),) for r in readings])
+
+    def claim(self, limit):
+        """
+        Up to limit of the oldest readings no other sender is working on, as
+        (ids, readings). The rows stay in the spool until ack() - a crash or
+        failed POST never loses them.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT id, payload FROM spool ORDER BY id LIMIT ?",
+                                      (limit + len(self._claimed),)).fetchall()
+            rows = [row for row in rows if row[0] not in self._claimed][:limit]
+            self._claimed.update(row_id for row_id, _ in rows)
+        return [row_id for row_id, _ in rows], [json.loads(payload) for _, payload in rows]
+
+    def ack(self, ids):
+        """Delete readings APEX accepted (or refused for good)."""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM spool WHERE id = ?", [(row_id,) for row_id in ids])
+            self._claimed.difference_update(ids)
+
+    def release(self, ids):
+        """Make unsent readings available to claim() again."""
+        with self._lock:
+            self._claimed.difference_update(ids)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+
+class RetryableError(Exception):
+    """APEX is unreachable, overloaded or failing - keep the readings and retry."""
+
+
+class BatchedBridge:
+    """Bounded queue + sender threads + SQLite spool between MQTT and APEX."""
+
+    def __init__(self, apex_url=APEX_URL, queue_max=QUEUE_MAX, senders=SENDER_THREADS,
+                 batch_max=BATCH_MAX, batch_wait=BATCH_WAIT, accepts_batch=APEX_ACCEPTS_BATCH,
+                 spool_path=SPOOL_PATH, retry_base=RETRY_BASE, retry_max=RETRY_MAX,
+                 spool_every=SPOOL_EVERY):
+        self.apex_url = apex_url
+        self.batch_max = batch_max
+        self.batch_wait = batch_wait
+        self.spool_every = spool_every
+        self.accepts_batch = accepts_batch
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.queue = queue.Queue(maxsize=queue_max)
+        self.spool = Spool(spool_path)
+        self._senders = senders
+        self._threads = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._batches = 0          # batches handed out, for spool interleaving
+        self._retry_at = 0.0       # no sends before this time (backoff after a failure)
+        self._delay = 0.0
+        self.stats = {"received": 0, "sent": 0, "spooled": 0, "rejected": 0, "failures": 0}
+
+    # -- MQTT side (never blocks) ------------------------------------------
+
+    def submit(self, reading):
+        """Queue one reading; spool it if the queue is full."""
+        self._count("received")
+        try:
+            self.queue.put_nowait(reading)
+        except queue.Full:
+            self.spool.put([reading])
+            self._count("spooled")
+
+    # -- Sender side -----------------------------------------------------------
+
+    def start(self):
+        for i in range(self._senders):
+            thread = threading.Thread(target=self._sender_loop, name=f"apex-sender-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=10):
+        """
+        Stop the senders - each finishes (or spools) the reading it is
+        POSTing and spools the rest of its batch - then spool whatever is
+        still queued.
+        """
+        self._stop.set()
+        deadline = time.time() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.time()))
+        busy = [thread.name for thread in self._threads if thread.is_alive()]
+        if busy:
+            print(f"⚠️ Sender(s) still waiting on APEX at exit: {', '.join(busy)}")
+        leftover = []
+        while True:
+            try:
+                leftover.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if leftover:
+            self.spool.put(leftover)
+            self._count("spooled", len(leftover))
+
+    def _sender_loop(self):
+        session = requests.Session()   # one kept-alive connection per sender
+        while not self._stop.is_set():
+            wait = self._retry_at - time.time()
+            if wait > 0:
+                self._stop.wait(min(wait, 1.0))
+                continue
+            batch, spool_ids = self._next_batch()
+            if not batch:
+                continue
+            try:
+                sent, error = self._post(session, batch)
+            except Exception as e:
+                # Anything unexpected: keep the readings and keep this sender alive
+                sent, error = 0, e
+            self._count("sent", sent)
+            if spool_ids is not None:
+                self.spool.ack(spool_ids[:sent])
+                self.spool.release(spool_ids[sent:])
+            elif sent < len(batch):
+                self.spool.put(batch[sent:])
+                self._count("spooled", len(batch) - sent)
+            if error is None:
+                self._succeeded()
+            else:
+                self._failed(error)
+
+    def _next_batch(self):
+        """
+        Queued readings, except that every spool_every-th batch comes from the
+        spool (so it drains under sustained load too), and the spool is
+        drained whenever the queue is empty.
+
+        Returns:
+            tuple: (readings, their spool ids, or None for queued readings)
+        """
+        with self._lock:
+            self._batches += 1
+            spool_turn = self._batches % self.spool_every == 0
+        if spool_turn:
+            ids, batch = self.spool.claim(self.batch_max)
+            if batch:
+                return batch, ids
+        batch = []
+        try:
+            batch.append(self.queue.get(timeout=self.batch_wait))
+        except queue.Empty:
+            ids, batch = self.spool.claim(self.batch_max)
+            return batch, ids
+        deadline = time.time() + self.batch_wait
+        while len(batch) < self.batch_max:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch, None
+
+    def _post(self, session, batch):
+        """
+        POST a batch.
+
+        Returns:
+            tuple: (readings delivered from the start of the batch, the
+                   RetryableError that stopped it or None)
+        """
+        if self.accepts_batch:
+            try:
+                self._post_one(session, batch, len(batch))
+            except RetryableError as e:
+                return 0, e
+            return len(batch), None
+        for i, reading in enumerate(batch):
+            if self._stop.is_set():
+                # Stopping: the unsent tail is spooled, not POSTed
+                return i, None
+            try:
+                self._post_one(session, reading, 1)
+            except RetryableError as e:
+                return i, e
+        return len(batch), None
+
+    def _post_one(self, session, payload, count):
+        try:
+            response = session.post(self.apex_url, json=payload, headers=HEADERS, timeout=10)
+        except requests.exceptions.RequestException as e:
+            raise RetryableError(str(e))
+        if response.status_code == 429 or response.status_code >= 500:
+            raise RetryableError(f"HTTP {response.status_code}")
+        if not 200 <= response.status_code < 300:
+            # The payload itself was refused; retrying would never succeed
+            self._count("rejected", count)
+            print(f"❌ APEX rejected {count} reading(s): HTTP {response.status_code} {response.text[:200]}")
+
+    def _succeeded(self):
+        with self._lock:
+            self._delay = 0.0
+
+    def _failed(self, error):
+        with self._lock:
+            self.stats["failures"] += 1
+            self._delay = min(self.retry_max, self._delay * 2 if self._delay else self.retry_base)
+            self._retry_at = time.time() + self._delay
+            delay = self._delay
+        print(f"⚠️ APEX send failed ({error}); spooled, retrying in {delay:.0f}s")
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def status_line(self):
+        with self._lock:
+            stats = dict(self.stats)
+        return (f"📊 received={stats['received']} sent={stats['sent']} queued={self.queue.qsize()} "
+                f"spool={len(self.spool)} rejected={stats['rejected']} failures={stats['failures']}")
+
+
+# ------------------------------------------------------------------------------
+# MQTT callbacks
+# ------------------------------------------------------------------------------
+
 def on_connect(client, userdata, flags, rc):
     """The callback for when the client receives a CONNACK response from the server."""
     if rc == 0:
@@ -69,9 +343,9 @@ def on_connect(client, userdata, flags, rc):
 
 
 def on_message(client, userdata, msg):
-    """The callback for when a PUBLISH message is received from the server."""
+    """The callback for when a PUBLISH message is received from the server (direct mode)."""
     print(f"--- Message Received on Topic: {msg.topic} ---")
-    
+
     try:
         # Decode the payload from bytes to a string
         payload_str = msg.payload.decode("utf-8")
@@ -91,11 +365,33 @@ def on_message(client, userdata, msg):
         print("------------------------------------------------\n")
 
 
+def on_message_batched(client, bridge, msg):
+    """Batched mode: parse and queue only - sending happens on the sender threads."""
+    try:
+        bridge.submit(json.loads(msg.payload.decode("utf-8")))
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        print(f"❌ Skipping non-JSON payload on {msg.topic}")
+
+
 def main():
     """Main function to set up and run the MQTT client."""
-    client = mqtt.Client(client_id="apex-bridge-client-001")
+    mode = sys.argv[1] if len(sys.argv) > 1 else BRIDGE_MODE
+    if not APEX_URL or "your-apex-instance" in APEX_URL:
+        print("❌ ERROR: APEX_URL is not configured. Please edit the script.")
+        return
+
+    bridge = None
+    if mode == "batched":
+        bridge = BatchedBridge()
+        bridge.start()
+        print(f"🚀 Batched bridge: {SENDER_THREADS} senders, batches of {BATCH_MAX}, "
+              f"{len(bridge.spool)} spooled reading(s) pending")
+        client = mqtt.Client(client_id="apex-bridge-client-001", userdata=bridge)
+        client.on_message = on_message_batched
+    else:
+        client = mqtt.Client(client_id="apex-bridge-client-001")
+        client.on_message = on_message
     client.on_connect = on_connect
-    client.on_message = on_message
 
     print("Attempting to connect to MQTT broker...")
     try:
@@ -107,10 +403,26 @@ def main():
         print(f"\n❌ OS ERROR: Could not connect to {MQTT_BROKER_HOST}. Check the IP address. Error: {e}")
         return
 
-    # Blocking call that processes network traffic, dispatches callbacks,
-    # and handles reconnecting.
-    client.loop_forever()
+    if bridge is None:
+        # Blocking call that processes network traffic, dispatches callbacks,
+        # and handles reconnecting.
+        client.loop_forever()
+        return
+
+    # Network loop on its own thread; this thread reports progress
+    client.loop_start()
+    try:
+        while True:
+            time.sleep(STATS_INTERVAL)
+            print(bridge.status_line())
+    except KeyboardInterrupt:
+        print("\nStopping bridge...")
+    finally:
+        client.loop_stop()
+        client.disconnect()
+        bridge.stop()
+        print(bridge.status_line())
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()